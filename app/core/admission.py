@@ -0,0 +1,242 @@
+"""
+app/core/admission.py
+Admission control and priority load shedding for expensive routes.
+
+Every admitted request holds a slot until it finishes.  A request may
+start when all three of these limits have room:
+
+* ``ADMISSION_MAX_INFLIGHT`` – all routes together
+* the route's own limit (``CHAT_MAX_INFLIGHT`` / ``UPLOAD_MAX_INFLIGHT`` /
+  ``CHAT_BATCH_MAX_INFLIGHT``)
+* ``ADMISSION_TENANT_MAX_INFLIGHT`` per tenant (the space), so that one
+  class can't take every slot from the others
+
+Anything else waits in one bounded queue (``ADMISSION_QUEUE_SIZE``),
+ordered by route priority (interactive chat, then uploads, then batch
+chat), then by arrival.  ``POST /chat/batch`` is admitted per LLM call,
+not per request, so one batch can't fan out past the limits; a shed
+question comes back as an item with ``error``.  When the queue is full,
+a newcomer evicts the newest waiter of a lower priority, or is shed
+itself.  A request is shed at once when its estimated wait would exceed
+the route's ``*_MAX_WAIT_SECONDS``.  The estimate is the queue ahead of
+it × the route's recent service time ÷ its requests in flight.  A
+waiter whose wait runs past that limit is also shed.
+Shed requests get a 503 with ``Retry-After`` immediately, instead of a
+slow answer or a 429 cascade from Gemini.
+
+Limits are per API process.  ``ADMISSION_CONTROL=0`` disables it all.
+The upload body is already received when the endpoint runs, so this
+bounds the storage / DB / ingest work behind uploads, not the bandwidth.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import itertools
+import math
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List
+
+from fastapi import HTTPException
+
+from app.core.metrics import Counter, Gauge, Histogram
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", 40))
+ADMISSION_TENANT_MAX_INFLIGHT = int(os.getenv("ADMISSION_TENANT_MAX_INFLIGHT", 24))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 200))
+SERVICE_TIME_ALPHA = 0.2  # EWMA weight of the newest request's service time
+
+INFLIGHT = Gauge("spaces_admission_inflight", "Admitted requests in flight", ("route",))
+WAITING = Gauge("spaces_admission_waiting", "Requests waiting for admission", ("route",))
+DECISIONS = Counter(
+    "spaces_admission_total",
+    "Admission decisions (admitted, queued, shed_full, shed_deadline, evicted, timeout)",
+    ("route", "result"),
+)
+WAIT_SECONDS = Histogram("spaces_admission_wait_seconds", "Time admitted requests spent queued", ("route",))
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    priority: int  # lower runs first
+    max_inflight: int
+    max_wait: float  # seconds a request may queue before a 503 is the better answer
+
+
+ROUTES: Dict[str, RoutePolicy] = {
+    "chat": RoutePolicy(
+        priority=0,
+        max_inflight=int(os.getenv("CHAT_MAX_INFLIGHT", 32)),
+        max_wait=float(os.getenv("CHAT_MAX_WAIT_SECONDS", 2)),
+    ),
+    "upload": RoutePolicy(
+        priority=1,
+        max_inflight=int(os.getenv("UPLOAD_MAX_INFLIGHT", 8)),
+        max_wait=float(os.getenv("UPLOAD_MAX_WAIT_SECONDS", 30)),
+    ),
+    "chat_batch": RoutePolicy(
+        priority=2,
+        max_inflight=int(os.getenv("CHAT_BATCH_MAX_INFLIGHT", 16)),
+        max_wait=float(os.getenv("CHAT_BATCH_MAX_WAIT_SECONDS", 30)),
+    ),
+}
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    route: str = field(compare=False)
+    tenant: str = field(compare=False)
+    granted: asyncio.Future = field(compare=False)
+
+
+def _shed(retry_after: float, detail: str) -> HTTPException:
+    return HTTPException(503, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        routes: Dict[str, RoutePolicy] = ROUTES,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        tenant_max_inflight: int = ADMISSION_TENANT_MAX_INFLIGHT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+    ) -> None:
+        self.routes = routes
+        self.max_inflight, self.tenant_max_inflight = max_inflight, tenant_max_inflight
+        self.queue_size = queue_size
+        self._inflight = 0
+        self._by_route: Dict[str, int] = defaultdict(int)
+        self._by_tenant: Dict[str, int] = defaultdict(int)
+        self._queue: List[_Waiter] = []  # kept sorted: priority, then arrival
+        self._seq = itertools.count()
+        self._service: Dict[str, float] = {}  # route → EWMA service time (s)
+
+    # ── public API ──────────────────────────────────────────────────
+    @asynccontextmanager
+    async def admit(self, route: str, tenant: str) -> AsyncIterator[None]:
+        """Hold a slot of *route* for *tenant* for the duration of the block."""
+        if not ADMISSION_CONTROL:
+            yield
+            return
+        await self._acquire(route, tenant)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe(route, time.monotonic() - start)
+            self._release(route, tenant)
+
+    def estimated_wait(self, route: str, ahead: int) -> float:
+        # while requests queue, whichever limit binds, the route's requests
+        # in flight are its effective parallelism; before the first sample,
+        # assume a request takes a second
+        slots = max(1, self._by_route[route])
+        return (ahead + 1) * self._service.get(route, 1.0) / slots
+
+    # ── slots ───────────────────────────────────────────────────────
+    def _can_start(self, route: str, tenant: str) -> bool:
+        return (
+            self._inflight < self.max_inflight
+            and self._by_route[route] < self.routes[route].max_inflight
+            and self._by_tenant[tenant] < self.tenant_max_inflight
+        )
+
+    def _take(self, route: str, tenant: str) -> None:
+        self._inflight += 1
+        self._by_route[route] += 1
+        self._by_tenant[tenant] += 1
+        INFLIGHT.inc(route)
+
+    def _release(self, route: str, tenant: str) -> None:
+        self._inflight -= 1
+        self._by_route[route] -= 1
+        self._by_tenant[tenant] -= 1
+        if not self._by_tenant[tenant]:
+            del self._by_tenant[tenant]
+        INFLIGHT.dec(route)
+        self._dispatch()
+
+    def _observe(self, route: str, seconds: float) -> None:
+        prev = self._service.get(route)
+        self._service[route] = seconds if prev is None else prev + SERVICE_TIME_ALPHA * (seconds - prev)
+
+    # ── queue ───────────────────────────────────────────────────────
+    async def _acquire(self, route: str, tenant: str) -> None:
+        policy = self.routes[route]
+        # waiters left in the queue are blocked by some limit, so a newcomer
+        # that fits now takes nothing away from them
+        if self._can_start(route, tenant):
+            self._take(route, tenant)
+            DECISIONS.inc(route, "admitted")
+            return
+
+        ahead = bisect.bisect_right([w.priority for w in self._queue], policy.priority)
+        wait = self.estimated_wait(route, ahead)
+        if wait > policy.max_wait:
+            DECISIONS.inc(route, "shed_deadline")
+            raise _shed(wait, f"Overloaded: {route} queue wait ~{wait:.1f}s exceeds {policy.max_wait:g}s")
+        if len(self._queue) >= self.queue_size:
+            victim = self._queue[-1]
+            if victim.priority <= policy.priority:
+                DECISIONS.inc(route, "shed_full")
+                raise _shed(wait, f"Overloaded: admission queue full ({self.queue_size})")
+            self._remove(victim)
+            DECISIONS.inc(victim.route, "evicted")
+            retry = self.estimated_wait(victim.route, len(self._queue))
+            victim.granted.set_exception(_shed(retry, "Overloaded: displaced by higher priority work"))
+
+        granted = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(policy.priority, next(self._seq), route, tenant, granted)
+        bisect.insort(self._queue, waiter)
+        WAITING.inc(route)
+        DECISIONS.inc(route, "queued")
+        start = time.monotonic()
+        try:
+            await asyncio.wait({waiter.granted}, timeout=policy.max_wait)
+        except asyncio.CancelledError:
+            # the client went away while queued – hand a granted slot straight back
+            if waiter.granted.done() and not waiter.granted.exception():
+                self._release(route, tenant)
+            else:
+                self._remove(waiter)
+                waiter.granted.cancel()
+            raise
+        if not waiter.granted.done():
+            self._remove(waiter)
+            waiter.granted.cancel()
+            DECISIONS.inc(route, "timeout")
+            retry = self.estimated_wait(route, len(self._queue))
+            raise _shed(retry, f"Overloaded: no {route} slot within {policy.max_wait:g}s")
+        waiter.granted.result()  # raises if evicted
+        DECISIONS.inc(route, "admitted")
+        WAIT_SECONDS.observe(time.monotonic() - start, route)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        i = bisect.bisect_left(self._queue, waiter)
+        if i < len(self._queue) and self._queue[i] is waiter:
+            del self._queue[i]
+            WAITING.dec(waiter.route)
+
+    def _dispatch(self) -> None:
+        """Start every queued request that fits, best priority first."""
+        i = 0
+        while i < len(self._queue) and self._inflight < self.max_inflight:
+            w = self._queue[i]
+            if self._can_start(w.route, w.tenant):
+                del self._queue[i]
+                WAITING.dec(w.route)
+                self._take(w.route, w.tenant)
+                w.granted.set_result(None)
+            else:
+                i += 1
+
+
+# Singleton instance used across the app
+admission = AdmissionController()
@@ -1,4 +1,4 @@
-from passlib.context import CryptContext
+from functools import lru_cache
 from jose import jwt
 from datetime import datetime, timedelta
 import os
@@ -6,18 +6,24 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'tutorwiseSpacesSecretKey')  # Default to dev key
 ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRE_MINUTES', 1440))  # Default to 1 day
 
+@lru_cache(maxsize=1)
+def pwd_context():
+    """bcrypt context, built on first use so passlib stays out of app import."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
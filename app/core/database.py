@@ -1,5 +1,6 @@
 import os
 import ssl
+import time
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
@@ -7,8 +8,10 @@ from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
 )
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
+
+from app.core.metrics import ERRORS, STAGE_SECONDS
 
 # ──────────────────────────────
 # 1. Environment
@@ -43,6 +46,23 @@ async_session_factory = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+
+# per‑statement latency (labelled by SQL verb) for every route / task
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _query_start(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _query_end(conn, cursor, statement, parameters, context, executemany):
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    STAGE_SECONDS.observe(time.perf_counter() - context._query_start, "db", verb)
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _query_error(exception_context):
+    ERRORS.inc("db")
+
 # ──────────────────────────────
 # 4. Dependency for FastAPI routes
 # ──────────────────────────────
@@ -56,12 +76,4 @@ async def get_session() -> AsyncSession:
         yield session
 
 
-# ──────────────────────────────
-# 5. One‑shot helper to build tables (dev only)
-# ──────────────────────────────
-async def create_db_and_tables() -> None:
-    """
-    Call once on startup in dev (or run migrations in prod).
-    """
-    async with engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+# Schema is managed by versioned migrations – see app/core/migrations.py
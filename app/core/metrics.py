@@ -0,0 +1,324 @@
+"""
+app/core/metrics.py
+Lightweight in‑process metrics with Prometheus text exposition.
+
+Recording is a dict lookup, a ``bisect`` and two additions under a lock,
+so it is cheap enough to leave on everywhere (≈1 µs per observation).
+
+Multi‑worker: set ``METRICS_DIR`` to a directory shared by every API
+worker and the Celery worker.  Each process snapshots its values to
+``<host>-<pid>-<start>.json`` every ``METRICS_FLUSH_SECONDS`` and
+``/metrics`` merges all snapshots: counters and histograms are summed,
+gauges only include processes whose snapshot is fresh (written within
+three flush intervals).  Summed totals must stay monotonic – a drop reads
+as a counter reset to ``rate()`` – so an exiting process folds its
+counters and histograms into ``_exited.json`` and removes its own file,
+as does ``/metrics`` for a snapshot not rewritten for
+``METRICS_PRUNE_SECONDS`` (a process killed without running ``atexit``).
+Folds and scrapes take an ``flock`` on the directory.  Without
+``METRICS_DIR`` the endpoint reports the serving process only.
+"""
+from __future__ import annotations
+
+import atexit
+import bisect
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import orjson
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross‑process lock; a fold may race a scrape
+    fcntl = None
+
+METRICS_DIR: str | None = os.getenv("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 5))
+METRICS_PRUNE_SECONDS = float(os.getenv("METRICS_PRUNE_SECONDS", 12 * METRICS_FLUSH_SECONDS))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_metrics: Dict[str, "_Metric"] = {}
+
+
+# ─── Metric types ──────────────────────────────────────────────────────
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_: str, labels: Sequence[str] = ()) -> None:
+        self.name, self.help, self.labels = name, help_, tuple(labels)
+        self.values: Dict[Tuple[str, ...], object] = {}
+        _metrics[name] = self
+
+    def _reset(self) -> None:
+        self.values = {}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with _lock:
+            self.values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_, labels=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(labels)
+            if state is None:
+                # [per‑bucket counts…, +Inf count, sum]
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[idx] += 1
+            state[-1] += value
+
+
+# ─── Pipeline metrics ──────────────────────────────────────────────────
+STAGE_SECONDS = Histogram(
+    "spaces_stage_seconds", "Latency of pipeline stages (extract, embed, llm, chroma, db…)",
+    ("stage", "model"),
+)
+ERRORS = Counter("spaces_errors_total", "Failed pipeline stage calls", ("stage",))
+RETRIES = Counter("spaces_retries_total", "Retried / hedged upstream calls", ("stage",))
+CACHE = Counter("spaces_cache_total", "Cache lookups by result", ("cache", "result"))
+BYTES = Counter("spaces_bytes_total", "Payload bytes moved", ("stage", "direction"))
+QUEUE_DEPTH = Gauge("spaces_queue_depth", "Work items waiting or in flight", ("queue",))
+
+
+@contextmanager
+def timed(stage: str, model: str = "") -> Iterator[None]:
+    """Time a block into STAGE_SECONDS; exceptions also bump ERRORS."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage, model)
+
+
+def instrument(stage: str, model: str = ""):
+    """Decorator form of :func:`timed` for coroutines."""
+
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with timed(stage, model):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ─── Snapshots (multi‑process) ─────────────────────────────────────────
+def _snapshot() -> Dict:
+    with _lock:
+        return {
+            name: [[list(k), v if not isinstance(v, list) else list(v)] for k, v in m.values.items()]
+            for name, m in _metrics.items()
+        }
+
+
+_started = time.time_ns()  # tells a reused PID's file from its predecessor's
+_EXITED = "_exited.json"  # counters and histograms of exited processes
+_flush_lock = threading.Lock()
+_retired = False  # folded into _EXITED at exit; never write a snapshot again
+
+
+def _snapshot_path() -> Path:
+    return Path(METRICS_DIR) / f"{socket.gethostname()}-{os.getpid()}-{_started}.json"
+
+
+def _write(path: Path, data: Dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(orjson.dumps(data))
+    os.replace(tmp, path)  # atomic: readers never see a partial file
+
+
+def flush() -> None:
+    if not METRICS_DIR:
+        return
+    with _flush_lock:
+        if not _retired:
+            _write(_snapshot_path(), _snapshot())
+
+
+def _flusher() -> None:
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _start_flusher() -> None:
+    if METRICS_DIR:
+        Path(METRICS_DIR).mkdir(parents=True, exist_ok=True)
+        threading.Thread(target=_flusher, name="metrics-flush", daemon=True).start()
+
+
+def _after_fork() -> None:
+    global _started, _flush_lock
+    # pre‑fork (gunicorn --preload) values belong to the parent
+    _started = time.time_ns()
+    _flush_lock = threading.Lock()  # the fork may have caught the flusher holding it
+    for m in _metrics.values():
+        m._reset()
+    _start_flusher()
+
+
+@contextmanager
+def _dir_lock() -> Iterator[None]:
+    """Exclusive across processes: folds into ``_EXITED`` never interleave with a scrape."""
+    with open(Path(METRICS_DIR) / ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file closes
+        yield
+
+
+def _load(path: Path) -> Dict:
+    try:
+        return orjson.loads(path.read_bytes())
+    except FileNotFoundError:
+        return {}
+
+
+def _add(merged: Dict[str, Dict[Tuple[str, ...], object]], data: Dict, gauges: bool = True) -> None:
+    """Sum snapshot *data* into *merged*; gauges only if *gauges*."""
+    for name, entries in data.items():
+        metric = _metrics.get(name)
+        if metric is None or (metric.kind == "gauge" and not gauges):
+            continue
+        target = merged.setdefault(name, {})
+        for labels, value in entries:
+            key = tuple(labels)
+            if isinstance(value, list):
+                cur = target.get(key)
+                target[key] = value if cur is None else [a + b for a, b in zip(cur, value)]
+            else:
+                target[key] = target.get(key, 0.0) + value
+
+
+def _entries(merged: Dict[str, Dict[Tuple[str, ...], object]]) -> Dict:
+    return {name: [[list(k), v] for k, v in values.items()] for name, values in merged.items()}
+
+
+def _fold(exited: Dict[str, Dict[Tuple[str, ...], object]], dead: List[Path]) -> None:
+    """Persist *exited*, then drop the snapshots it now includes (under :func:`_dir_lock`)."""
+    _write(Path(METRICS_DIR) / _EXITED, _entries(exited))
+    for path in dead:
+        path.unlink(missing_ok=True)
+
+
+def _retire() -> None:
+    """atexit: hand this process's counters and histograms over to ``_EXITED``."""
+    global _retired
+    if not METRICS_DIR:
+        return
+    with _flush_lock:
+        _retired = True  # the flusher thread must not recreate the file
+        try:
+            with _dir_lock():
+                exited: Dict[str, Dict[Tuple[str, ...], object]] = {}
+                _add(exited, _load(Path(METRICS_DIR) / _EXITED), gauges=False)
+                _add(exited, _snapshot(), gauges=False)
+                _fold(exited, [_snapshot_path()])
+        except (OSError, orjson.JSONDecodeError):
+            pass  # the snapshot stays and /metrics folds it once stale
+
+
+_start_flusher()
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(_retire)
+
+
+def _merged() -> Dict[str, Dict[Tuple[str, ...], object]]:
+    if not METRICS_DIR:
+        return {name: dict(m.values) for name, m in _metrics.items()}
+
+    flush()
+    merged: Dict[str, Dict[Tuple[str, ...], object]] = {name: {} for name in _metrics}
+    with _dir_lock():
+        exited: Dict[str, Dict[Tuple[str, ...], object]] = {}
+        _add(exited, _load(Path(METRICS_DIR) / _EXITED), gauges=False)
+        now = time.time()
+        dead: List[Path] = []
+        for path in Path(METRICS_DIR).glob("*.json"):
+            if path.name == _EXITED:
+                continue
+            try:
+                age = now - path.stat().st_mtime
+                data = orjson.loads(path.read_bytes())
+            except (OSError, orjson.JSONDecodeError):
+                continue
+            if age > METRICS_PRUNE_SECONDS:
+                # killed without running atexit: its totals move to _EXITED
+                _add(exited, data, gauges=False)
+                dead.append(path)
+                continue
+            _add(merged, data, gauges=age <= 3 * METRICS_FLUSH_SECONDS)
+        if dead:
+            _fold(exited, dead)
+    _add(merged, _entries(exited))
+    return merged
+
+
+# ─── Exposition ────────────────────────────────────────────────────────
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_prometheus() -> str:
+    """Prometheus text format (v0.0.4) for all metrics across processes."""
+    out: List[str] = []
+    for name, values in _merged().items():
+        m = _metrics[name]
+        out.append(f"# HELP {name} {m.help}")
+        out.append(f"# TYPE {name} {m.kind}")
+        for labels, value in sorted(values.items()):
+            if m.kind != "histogram":
+                out.append(f"{name}{_fmt_labels(m.labels, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(m.buckets + (float("inf"),), value[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                out.append(f"{name}_bucket{_fmt_labels(m.labels, labels, le)} {cumulative}")
+            out.append(f"{name}_sum{_fmt_labels(m.labels, labels)} {value[-1]}")
+            out.append(f"{name}_count{_fmt_labels(m.labels, labels)} {cumulative}")
+    return "\n".join(out) + "\n"
@@ -0,0 +1,153 @@
+"""
+app/core/migrations.py
+Minimal versioned schema migrations.
+
+Each module in ``app/migrations`` named ``vNNNN_<slug>.py`` defines
+``VERSION``, ``DESCRIPTION`` and ``upgrade(conn)`` (a *sync* connection,
+run through ``run_sync``).  Applied versions are recorded in the
+``schema_version`` table.
+
+Usage:
+    python -m app.core.migrations upgrade   # apply pending migrations
+    python -m app.core.migrations current   # print DB / code versions
+
+At startup the API only calls :func:`check_schema_version`, which costs a
+single ``SELECT max(version)`` instead of the reflection round trips of
+``metadata.create_all``.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import os
+import pkgutil
+import re
+import sys
+from datetime import datetime
+from functools import lru_cache
+from types import ModuleType
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.database import engine
+
+VERSION_TABLE = "schema_version"
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0").lower() in {"1", "true", "yes"}
+
+_MODULE_RE = re.compile(r"^v(\d{4})_\w+$")
+_LOCK_KEY = 0x5A4CE5  # pg advisory lock id, serialises concurrent upgrades
+
+
+class SchemaOutOfDate(RuntimeError):
+    """Raised at startup when the database is behind the code."""
+
+
+# ─── Discovery ─────────────────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def load_migrations() -> List[ModuleType]:
+    """Import every ``app/migrations/vNNNN_*.py`` module, ordered by VERSION."""
+    pkg = importlib.import_module("app.migrations")
+    modules = []
+    for info in pkgutil.iter_modules(pkg.__path__):
+        if _MODULE_RE.match(info.name):
+            modules.append(importlib.import_module(f"app.migrations.{info.name}"))
+    modules.sort(key=lambda m: m.VERSION)
+    versions = [m.VERSION for m in modules]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return modules
+
+
+def head_version() -> int:
+    """Version the code expects the database to be at."""
+    migrations = load_migrations()
+    return migrations[-1].VERSION if migrations else 0
+
+
+# ─── Version bookkeeping ───────────────────────────────────────────────
+async def current_version() -> int:
+    """Return the applied schema version (0 if never migrated) in one query."""
+    async with engine.connect() as conn:
+        try:
+            result = await conn.execute(text(f"SELECT max(version) FROM {VERSION_TABLE}"))
+        except DBAPIError:
+            # table missing → fresh database or pre‑migration create_all schema
+            return 0
+        return result.scalar() or 0
+
+
+def _ensure_version_table(conn) -> None:
+    conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            " version INTEGER PRIMARY KEY,"
+            " description VARCHAR(255) NOT NULL,"
+            " applied_at TIMESTAMP NOT NULL)"
+        )
+    )
+
+
+# ─── Public API ────────────────────────────────────────────────────────
+async def upgrade() -> List[int]:
+    """Apply all pending migrations, each in its own transaction."""
+    async with engine.begin() as conn:
+        await conn.run_sync(_ensure_version_table)
+
+    applied: List[int] = []
+    for mig in load_migrations():
+        async with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # several workers may boot with AUTO_MIGRATE at once
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_KEY})
+            done = await conn.execute(
+                text(f"SELECT 1 FROM {VERSION_TABLE} WHERE version = :v"), {"v": mig.VERSION}
+            )
+            if done.first():
+                continue
+            await conn.run_sync(mig.upgrade)
+            await conn.execute(
+                text(
+                    f"INSERT INTO {VERSION_TABLE} (version, description, applied_at) "
+                    "VALUES (:v, :d, :t)"
+                ),
+                {"v": mig.VERSION, "d": mig.DESCRIPTION, "t": datetime.utcnow()},
+            )
+            applied.append(mig.VERSION)
+    return applied
+
+
+async def check_schema_version() -> int:
+    """
+    Startup guard: verify the schema version with a single query.
+
+    When the database is behind, apply migrations if ``AUTO_MIGRATE=1``
+    (handy in dev), otherwise refuse to start.
+    """
+    db_version, expected = await current_version(), head_version()
+    if db_version >= expected:
+        return db_version
+    if AUTO_MIGRATE:
+        await upgrade()
+        return expected
+    raise SchemaOutOfDate(
+        f"Database schema is at v{db_version}, code expects v{expected}. "
+        "Run `python -m app.core.migrations upgrade` (or set AUTO_MIGRATE=1)."
+    )
+
+
+# ─── CLI ───────────────────────────────────────────────────────────────
+async def _main(cmd: str) -> None:
+    if cmd == "upgrade":
+        applied = await upgrade()
+        print(f"applied: {applied or 'nothing'}; now at v{head_version()}")
+    elif cmd == "current":
+        print(f"database: v{await current_version()}  code: v{head_version()}")
+    else:
+        raise SystemExit(f"unknown command {cmd!r} (expected upgrade|current)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1] if len(sys.argv) > 1 else "current"))
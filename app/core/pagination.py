@@ -0,0 +1,66 @@
+"""
+app/core/pagination.py
+Keyset (cursor) pagination over (created_at, id) for list endpoints.
+
+Pages are fetched with ``WHERE (created_at, id) < (:ts, :id)`` instead of
+OFFSET, so every page costs one index range scan no matter how deep the
+client has scrolled.  Cursors are opaque to clients.
+"""
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import Any, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# ─── Cursor encoding ───────────────────────────────────────────────────
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Return an opaque, URL‑safe cursor pointing *after* the given row."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of :func:`encode_cursor`; raises HTTP 400 on garbage."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(ts), UUID(row_id)
+    except ValueError as exc:  # binascii / unicode / uuid errors all subclass it
+        raise HTTPException(400, detail="Invalid cursor") from exc
+
+
+# ─── Query helpers ─────────────────────────────────────────────────────
+def paginate(stmt, created_col, id_col, cursor: str | None, limit: int):
+    """
+    Apply newest‑first keyset ordering to *stmt*.
+
+    Fetches ``limit + 1`` rows so :func:`split_page` can tell whether a
+    next page exists without a COUNT query.
+    """
+    stmt = stmt.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        # typed binds so the UUID is rendered the way the column stores it
+        after = tuple_(literal(ts, created_col.type), literal(row_id, id_col.type))
+        stmt = stmt.where(tuple_(created_col, id_col) < after)
+    return stmt
+
+
+def split_page(rows: Sequence[Any], limit: int) -> Tuple[Sequence[Any], str | None]:
+    """Return ``(items, next_cursor)`` for rows fetched via :func:`paginate`."""
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
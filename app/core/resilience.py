@@ -0,0 +1,229 @@
+"""
+app/core/resilience.py
+Deadlines, hedged requests and circuit breakers for upstream calls.
+
+* deadline – every call gets a total time budget for its call type
+  (``asyncio.wait_for``); httpx's own timeout is per phase, so a slowly
+  trickling response could otherwise run far past it.
+* hedging – for idempotent calls, if the first attempt has not answered
+  after the call type's recent p95 (clamped to ``HEDGE_MIN_DELAY_MS`` …
+  ``HEDGE_MAX_DELAY_MS``), a duplicate is sent and whichever finishes
+  first wins; the loser is cancelled.  Only the slowest ~5 % of calls
+  are duplicated, which is what cuts the tail.  ``HEDGING=0`` disables.
+* circuit breaker – per call type; once ``BREAKER_ERROR_RATIO`` of the
+  calls in the last ``BREAKER_WINDOW_SECONDS`` failed (with at least
+  ``BREAKER_MIN_CALLS``), calls fail fast with :class:`CircuitOpenError`
+  for ``BREAKER_OPEN_SECONDS``, then one probe call decides whether to
+  close again.  Only upstream trouble counts: 5xx, 429, timeouts and
+  transport errors, not 4xx caused by the request.
+
+Hedges are counted in ``spaces_retries_total``; open breakers show as
+``spaces_circuit_open``.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Tuple, TypeVar
+
+from app.core.metrics import RETRIES, Gauge
+
+T = TypeVar("T")
+
+HEDGING = os.getenv("HEDGING", "1") == "1"
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", 50))
+HEDGE_MAX_DELAY_MS = float(os.getenv("HEDGE_MAX_DELAY_MS", 5000))
+HEDGE_WINDOW = 200  # recent latencies per call type the p95 is taken over
+HEDGE_MIN_SAMPLES = 20  # below this, hedge after HEDGE_MAX_DELAY_MS
+
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", 30))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 20))
+BREAKER_ERROR_RATIO = float(os.getenv("BREAKER_ERROR_RATIO", 0.5))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 15))
+
+CIRCUIT_OPEN = Gauge("spaces_circuit_open", "1 while the upstream circuit breaker is open", ("stage",))
+
+
+class UpstreamError(RuntimeError):
+    """An upstream call that was not attempted or not finished in time."""
+
+
+class CircuitOpenError(UpstreamError):
+    def __init__(self, stage: str, retry_after: float) -> None:
+        super().__init__(f"{stage}: upstream circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(UpstreamError):
+    pass
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Errors that say the upstream is unwell (vs. a bad request)."""
+    import httpx
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code >= 500 or code == 429
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, DeadlineExceeded))
+
+
+# ─── Latency tracking (hedge delay) ────────────────────────────────────
+class LatencyWindow:
+    def __init__(self, size: int = HEDGE_WINDOW) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._p95: float | None = None
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._p95 = None  # recomputed lazily; sorting 200 floats is cheap
+
+    def hedge_delay(self) -> float:
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_MAX_DELAY_MS / 1000
+        if self._p95 is None:
+            s = sorted(self._samples)
+            self._p95 = s[int(0.95 * (len(s) - 1))]
+        return min(max(self._p95, HEDGE_MIN_DELAY_MS / 1000), HEDGE_MAX_DELAY_MS / 1000)
+
+
+# ─── Circuit breaker ───────────────────────────────────────────────────
+class CircuitBreaker:
+    def __init__(
+        self,
+        stage: str,
+        window: float = BREAKER_WINDOW_SECONDS,
+        min_calls: int = BREAKER_MIN_CALLS,
+        error_ratio: float = BREAKER_ERROR_RATIO,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+    ) -> None:
+        self.stage = stage
+        self.window, self.min_calls = window, min_calls
+        self.error_ratio, self.open_seconds = error_ratio, open_seconds
+        self._calls: Deque[Tuple[float, bool]] = deque()  # (time, failed)
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._open_until == 0.0:
+            return "closed"
+        return "open" if time.monotonic() < self._open_until else "half_open"
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpenError unless a call may go out; True for the half‑open probe."""
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "open" or self._probing:
+            raise CircuitOpenError(self.stage, max(0.0, self._open_until - time.monotonic()))
+        self._probing = True  # exactly one probe; everyone else keeps failing fast
+        return True
+
+    def record(self, failed: bool, probe: bool = False) -> None:
+        now = time.monotonic()
+        if probe:
+            self._probing = False
+            if failed:
+                self._trip(now)
+            else:
+                self._open_until = 0.0
+                self._calls.clear()
+                self._failures = 0
+                CIRCUIT_OPEN.set(0, self.stage)
+            return
+        if self._open_until:
+            return  # stragglers that started before the breaker opened
+        self._calls.append((now, failed))
+        self._failures += failed
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._failures -= self._calls.popleft()[1]
+        if len(self._calls) >= self.min_calls and self._failures / len(self._calls) >= self.error_ratio:
+            self._trip(now)
+
+    def abandon_probe(self) -> None:
+        self._probing = False  # the probe was cancelled; let the next call probe
+
+    def _trip(self, now: float) -> None:
+        self._open_until = now + self.open_seconds
+        CIRCUIT_OPEN.set(1, self.stage)
+
+
+# ─── Guarded call ──────────────────────────────────────────────────────
+_latency: Dict[str, LatencyWindow] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker(stage: str) -> CircuitBreaker:
+    if stage not in _breakers:
+        _breakers[stage] = CircuitBreaker(stage)
+    return _breakers[stage]
+
+
+async def _timed(window: LatencyWindow, attempt: Callable[[], Awaitable[T]]) -> T:
+    # every attempt's own latency feeds the p95 – including the slow ones a
+    # hedge cancelled (as a lower bound), so hedging doesn't hide the tail
+    start = time.perf_counter()
+    try:
+        return await attempt()
+    finally:
+        window.observe(time.perf_counter() - start)
+
+
+def _discard(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()  # an abandoned attempt's failure is expected, not "never retrieved"
+
+
+async def _hedged(stage: str, attempt: Callable[[], Awaitable[T]], window: LatencyWindow) -> T:
+    tasks = [asyncio.ensure_future(_timed(window, attempt))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=window.hedge_delay())
+        if not done:
+            RETRIES.inc(stage)
+            tasks.append(asyncio.ensure_future(_timed(window, attempt)))
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: t.exception() is not None):
+                if not task.exception() or not pending:
+                    return task.result()  # first success, or the last failure
+    finally:
+        # also reached when the deadline cancels us before the hedge went out
+        for task in tasks:
+            task.cancel()
+            task.add_done_callback(_discard)
+
+
+async def guarded(
+    stage: str,
+    attempt: Callable[[], Awaitable[T]],
+    *,
+    deadline: float,
+    hedge: bool = False,
+) -> T:
+    """
+    Run *attempt* (a zero‑arg coroutine factory, called again for a hedge)
+    under the *stage*'s breaker, within *deadline* seconds.
+    """
+    cb = breaker(stage)
+    probe = cb.before_call()
+    window = _latency.setdefault(stage, LatencyWindow())
+    try:
+        coro = _hedged(stage, attempt, window) if hedge and HEDGING else _timed(window, attempt)
+        result = await asyncio.wait_for(coro, deadline)
+    except asyncio.TimeoutError:
+        cb.record(True, probe)
+        raise DeadlineExceeded(f"{stage}: no upstream answer within {deadline:g}s") from None
+    except asyncio.CancelledError:
+        if probe:
+            cb.abandon_probe()
+        raise
+    except Exception as exc:
+        cb.record(is_upstream_failure(exc), probe)
+        raise
+    cb.record(False, probe)
+    return result
@@ -1,24 +1,371 @@
+"""
+app/core/storage.py
+Where uploaded files live: local disk or an S3‑compatible bucket.
+
+``STORAGE_BACKEND`` selects where new uploads go:
+
+* ``local`` (default) – ``UPLOAD_DIR`` on this host; the API and the
+  Celery worker must share that disk.
+* ``s3`` – ``S3_BUCKET`` (MinIO in docker‑compose, via ``S3_ENDPOINT_URL``)
+  through one pooled boto3 client.  Uploads stream from the request's
+  spooled file as a multipart upload (``S3_PART_SIZE`` parts, at most
+  ``S3_UPLOAD_CONCURRENCY`` in flight) and reads are streamed, optionally
+  ranged, GETs – no file is ever held in memory whole.
+
+``Content.file_path`` stores the location a backend returns – a path or
+``s3://bucket/key`` – and reads and deletes dispatch on it, so rows
+written before a backend switch stay readable.  The orphan sweeper lists
+every backend that may still hold uploads (:func:`sweep_storages`).
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
-import shutil
-import os
 
-UPLOAD_DIR = Path("data/uploads")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+from app.core.tracing import traced
 
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "data/uploads"))
 
-def save_upload(upload_file, content_id: UUID) -> Path:
-    """
-    Save *upload_file* to disk preserving its extension.
-    Returns the absolute path.
-    """
-    _, ext = os.path.splitext(upload_file.filename)
-    ext = ext.lower()
+S3_BUCKET = os.getenv("S3_BUCKET", "spaces-uploads")
+S3_PREFIX = os.getenv("S3_PREFIX", "uploads/")
+S3_ENDPOINT_URL: str | None = os.getenv("S3_ENDPOINT_URL")  # MinIO / stand‑ins; unset for AWS
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_CREATE_BUCKET = os.getenv("S3_CREATE_BUCKET", "0") == "1"
+S3_MAX_CONNECTIONS = int(os.getenv("S3_MAX_CONNECTIONS", 32))
+S3_PART_SIZE = max(5 << 20, int(os.getenv("S3_PART_SIZE", 8 << 20)))  # S3 minimum is 5 MiB
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", 4))
+# earlier backends the orphan sweeper should keep listing after a switch
+STORAGE_SWEEP_BACKENDS = [b.strip().lower() for b in os.getenv("STORAGE_SWEEP_BACKENDS", "").split(",") if b.strip()]
+
+READ_CHUNK = 1 << 20
+
+
+@dataclass(frozen=True, slots=True)
+class StoredFile:
+    location: str  # what goes into Content.file_path
+    size: int
+
+
+def _extension(filename: str | None) -> str:
+    _, ext = os.path.splitext(filename or "")
     if not ext:
         # basic safeguard – you can allow no‑ext if you add a default
         raise ValueError("File must have an extension")
+    return ext.lower()
+
+
+class Storage(abc.ABC):
+    """Backend interface; locations are opaque strings owned by the backend."""
+
+    name = "storage"
+
+    @abc.abstractmethod
+    async def save(self, upload_file, name: str) -> StoredFile:
+        """Store *upload_file* (a FastAPI ``UploadFile``) under *name*."""
+
+    @abc.abstractmethod
+    def iter_bytes(
+        self, location: str, start: int = 0, end: Optional[int] = None, chunk_size: int = READ_CHUNK
+    ) -> AsyncIterator[bytes]:
+        """Stream bytes ``[start, end)`` of *location* (to EOF if *end* is None)."""
+
+    @abc.abstractmethod
+    def local_path(self, location: str):
+        """``async with`` → a filesystem path with the object's content, for parsers."""
+
+    @abc.abstractmethod
+    async def delete_many(self, locations: List[str]) -> int:
+        """Delete *locations*; returns how many were removed."""
+
+    @abc.abstractmethod
+    async def list_older_than(self, cutoff: float) -> List[str]:
+        """Locations of stored objects last modified before *cutoff* (epoch)."""
+
+    async def read_range(self, location: str, start: int, length: int) -> bytes:
+        return b"".join([b async for b in self.iter_bytes(location, start, start + length)])
+
+
+# ─── Local disk ────────────────────────────────────────────────────────
+class LocalStorage(Storage):
+    name = "local"
+
+    def __init__(self, root: Path = UPLOAD_DIR) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _save(self, src, name: str) -> StoredFile:
+        dest = self.root / name
+        with dest.open("wb") as buffer:
+            shutil.copyfileobj(src, buffer, READ_CHUNK)
+        return StoredFile(str(dest), dest.stat().st_size)
+
+    async def save(self, upload_file, name: str) -> StoredFile:
+        return await asyncio.to_thread(self._save, upload_file.file, name)
+
+    async def iter_bytes(
+        self, location: str, start: int = 0, end: Optional[int] = None, chunk_size: int = READ_CHUNK
+    ) -> AsyncIterator[bytes]:
+        fh = await asyncio.to_thread(open, location, "rb")
+        try:
+            await asyncio.to_thread(fh.seek, start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                n = chunk_size if remaining is None else min(chunk_size, remaining)
+                block = await asyncio.to_thread(fh.read, n)
+                if not block:
+                    return
+                if remaining is not None:
+                    remaining -= len(block)
+                yield block
+        finally:
+            fh.close()
+
+    @asynccontextmanager
+    async def local_path(self, location: str) -> AsyncIterator[str]:
+        yield location  # already on disk – no copy
+
+    @staticmethod
+    def _unlink(path: str) -> bool:
+        try:
+            Path(path).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete_many(self, locations: List[str]) -> int:
+        return await asyncio.to_thread(lambda: sum(self._unlink(p) for p in locations))
+
+    async def list_older_than(self, cutoff: float) -> List[str]:
+        return await asyncio.to_thread(
+            lambda: [str(p) for p in self.root.iterdir() if p.is_file() and p.stat().st_mtime < cutoff]
+        )
+
+
+# ─── S3 / MinIO ────────────────────────────────────────────────────────
+class S3Storage(Storage):
+    """
+    boto3 is synchronous, so every call runs in a worker thread; the one
+    client (thread‑safe, ``S3_MAX_CONNECTIONS`` pooled connections) is
+    shared by all of them and by every event loop in the process.
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket: str = S3_BUCKET, prefix: str = S3_PREFIX) -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3  # only needed with STORAGE_BACKEND=s3
+                    from botocore.config import Config
+
+                    client = boto3.client(
+                        "s3",
+                        endpoint_url=S3_ENDPOINT_URL,
+                        region_name=S3_REGION,
+                        config=Config(
+                            max_pool_connections=S3_MAX_CONNECTIONS,
+                            retries={"mode": "standard"},
+                            s3={"addressing_style": "path" if S3_ENDPOINT_URL else "auto"},
+                        ),
+                    )
+                    if S3_CREATE_BUCKET:
+                        self._ensure_bucket(client)
+                    self._client = client
+        return self._client
+
+    def _ensure_bucket(self, client) -> None:
+        from botocore.exceptions import ClientError
+
+        try:
+            client.head_bucket(Bucket=self.bucket)
+        except ClientError:
+            client.create_bucket(Bucket=self.bucket)
+
+    @staticmethod
+    def parse(location: str) -> Tuple[str, str]:
+        bucket, _, key = location.removeprefix("s3://").partition("/")
+        return bucket, key
+
+    async def save(self, upload_file, name: str) -> StoredFile:
+        key = f"{self.prefix}{name}"
+        content_type = getattr(upload_file, "content_type", None) or "application/octet-stream"
+        client = await asyncio.to_thread(lambda: self.client)
+        first = await upload_file.read(S3_PART_SIZE)
+        if len(first) < S3_PART_SIZE:  # small file: one PUT
+            await asyncio.to_thread(
+                client.put_object, Bucket=self.bucket, Key=key, Body=first, ContentType=content_type
+            )
+            return StoredFile(f"s3://{self.bucket}/{key}", len(first))
+
+        mpu = await asyncio.to_thread(
+            client.create_multipart_upload, Bucket=self.bucket, Key=key, ContentType=content_type
+        )
+        upload_id = mpu["UploadId"]
+        parts: Dict[int, str] = {}
+        pending: set[asyncio.Task] = set()
+        size = 0
+
+        async def put(number: int, body: bytes) -> None:
+            r = await asyncio.to_thread(
+                client.upload_part, Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+            parts[number] = r["ETag"]
+
+        try:
+            number, block = 1, first
+            while block:
+                size += len(block)
+                pending.add(asyncio.create_task(put(number, block)))
+                if len(pending) >= S3_UPLOAD_CONCURRENCY:  # bounds memory to N parts
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for t in done:
+                        t.result()
+                number, block = number + 1, await upload_file.read(S3_PART_SIZE)
+            await asyncio.gather(*pending)
+            await asyncio.to_thread(
+                client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": [{"PartNumber": n, "ETag": parts[n]} for n in sorted(parts)]},
+            )
+        except BaseException:
+            for t in pending:
+                t.cancel()
+            await asyncio.to_thread(
+                client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id
+            )
+            raise
+        return StoredFile(f"s3://{self.bucket}/{key}", size)
+
+    async def iter_bytes(
+        self, location: str, start: int = 0, end: Optional[int] = None, chunk_size: int = READ_CHUNK
+    ) -> AsyncIterator[bytes]:
+        bucket, key = self.parse(location)
+        kwargs = {"Bucket": bucket, "Key": key}
+        if start or end is not None:
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end - 1}"
+        client = await asyncio.to_thread(lambda: self.client)
+        body = (await asyncio.to_thread(client.get_object, **kwargs))["Body"]
+        try:
+            while block := await asyncio.to_thread(body.read, chunk_size):
+                yield block
+        finally:
+            body.close()
+
+    @asynccontextmanager
+    async def local_path(self, location: str) -> AsyncIterator[str]:
+        fd, path = tempfile.mkstemp(suffix=Path(location).suffix)  # parsers dispatch on the extension
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                async for block in self.iter_bytes(location):
+                    await asyncio.to_thread(fh.write, block)
+            yield path
+        finally:
+            os.unlink(path)
+
+    async def delete_many(self, locations: List[str]) -> int:
+        by_bucket: Dict[str, List[str]] = {}
+        for loc in locations:
+            bucket, key = self.parse(loc)
+            by_bucket.setdefault(bucket, []).append(key)
+
+        def _delete() -> int:
+            deleted = 0
+            for bucket, keys in by_bucket.items():
+                for i in range(0, len(keys), 1000):  # DeleteObjects limit
+                    r = self.client.delete_objects(
+                        Bucket=bucket,
+                        Delete={"Objects": [{"Key": k} for k in keys[i : i + 1000]], "Quiet": True},
+                    )
+                    deleted += len(keys[i : i + 1000]) - len(r.get("Errors", []))
+            return deleted
+
+        return await asyncio.to_thread(_delete)
+
+    async def list_older_than(self, cutoff: float) -> List[str]:
+        def _list() -> List[str]:
+            out = []
+            pages = self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix)
+            for page in pages:
+                for obj in page.get("Contents", []):
+                    if obj["LastModified"].timestamp() < cutoff:
+                        out.append(f"s3://{self.bucket}/{obj['Key']}")
+            return out
+
+        return await asyncio.to_thread(_list)
+
+
+# ─── Backend selection ─────────────────────────────────────────────────
+_backends: Dict[str, Storage] = {}
+
+
+def get_storage(kind: str = STORAGE_BACKEND) -> Storage:
+    """The backend new uploads are written to (one instance per kind)."""
+    if kind not in _backends:
+        if kind == "local":
+            _backends[kind] = LocalStorage()
+        elif kind == "s3":
+            _backends[kind] = S3Storage()
+        else:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND {kind!r}")
+    return _backends[kind]
+
+
+def storage_for(location: str) -> Storage:
+    """The backend that owns an existing *location*."""
+    return get_storage("s3" if location.startswith("s3://") else "local")
+
+
+def sweep_storages() -> List[Storage]:
+    """
+    Backends that may hold uploads: the active one, those named in
+    ``STORAGE_SWEEP_BACKENDS``, and local disk while ``UPLOAD_DIR`` exists
+    (files from before a switch to S3, which reads still serve).
+    """
+    kinds = [STORAGE_BACKEND, *STORAGE_SWEEP_BACKENDS]
+    if UPLOAD_DIR.is_dir():
+        kinds.append("local")
+    return [get_storage(kind) for kind in dict.fromkeys(kinds)]
+
+
+@traced("save_upload")
+async def save_upload(upload_file, content_id: UUID) -> StoredFile:
+    """
+    Store *upload_file* as ``<content_id><ext>`` on the configured backend,
+    preserving its extension.  Raises ValueError without one.
+    """
+    return await get_storage().save(upload_file, f"{content_id}{_extension(upload_file.filename)}")
+
+
+def open_upload(location: str):
+    """``async with open_upload(loc) as path`` – a local path for the parsers."""
+    return storage_for(location).local_path(location)
+
 
-    dest = UPLOAD_DIR / f"{content_id}{ext}"
-    with dest.open("wb") as buffer:
-        shutil.copyfileobj(upload_file.file, buffer)
-    return dest
+async def delete_uploads(locations: Iterable[str]) -> int:
+    """Remove stored uploads; returns how many were removed."""
+    groups: Dict[str, List[str]] = {}
+    for loc in locations:
+        groups.setdefault(storage_for(loc).name, []).append(loc)
+    deleted = 0
+    for name, locs in groups.items():
+        deleted += await get_storage(name).delete_many(locs)
+    return deleted
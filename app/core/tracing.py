@@ -0,0 +1,202 @@
+"""
+app/core/tracing.py
+OpenTelemetry tracing for the upload → extract → embed → store lifecycle.
+
+Select an exporter with ``TRACING_EXPORTER``:
+
+* ``none`` (default) – API no‑op tracer, effectively free
+* ``file``  – one JSON span per line in ``TRACING_FILE`` (data/traces.jsonl)
+* ``memory`` – keep finished spans in process (see :func:`finished_spans`)
+* ``otlp``  – standard OTLP/gRPC exporter (``OTEL_EXPORTER_OTLP_ENDPOINT``)
+
+The file exporter needs no collector; summarise a slow ingest with:
+
+    python -m app.core.tracing summarize data/traces.jsonl [trace_id]
+
+Context crosses process / task boundaries as a W3C ``traceparent``
+carrier dict (:func:`inject_context` / :func:`extract_context`), which
+is passed to BackgroundTasks and Celery messages.
+"""
+from __future__ import annotations
+
+import inspect
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "data/traces.jsonl")
+
+tracer = trace.get_tracer("spaces")
+_memory_exporter = None
+_configured = False
+
+
+# ─── Exporters ─────────────────────────────────────────────────────────
+def _file_exporter(path: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class JsonLinesSpanExporter(SpanExporter):
+        """Append finished spans as compact JSON lines."""
+
+        def __init__(self, file_path: str) -> None:
+            Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(file_path, "a", encoding="utf-8")
+            self._lock = threading.Lock()
+
+        def export(self, spans: Sequence) -> "SpanExportResult":
+            lines = "".join(s.to_json(indent=None) + "\n" for s in spans)
+            with self._lock:
+                self._fh.write(lines)
+                self._fh.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            self._fh.close()
+
+    return JsonLinesSpanExporter(path)
+
+
+def setup_tracing(service_name: str) -> None:
+    """Install the SDK tracer provider once per process (no‑op for ``none``)."""
+    global _configured, _memory_exporter
+    if _configured or TRACING_EXPORTER == "none":
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    if TRACING_EXPORTER == "file":
+        provider.add_span_processor(BatchSpanProcessor(_file_exporter(TRACING_FILE)))
+    elif TRACING_EXPORTER == "memory":
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        _memory_exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(_memory_exporter))
+    elif TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    else:
+        raise RuntimeError(f"Unknown TRACING_EXPORTER {TRACING_EXPORTER!r}")
+    trace.set_tracer_provider(provider)
+    _configured = True
+
+
+def finished_spans() -> List[Any]:
+    """Spans captured by the ``memory`` exporter (empty otherwise)."""
+    return list(_memory_exporter.get_finished_spans()) if _memory_exporter else []
+
+
+# ─── Helpers ───────────────────────────────────────────────────────────
+@contextmanager
+def span(name: str, context: otel_context.Context | None = None, **attributes: Any) -> Iterator[Any]:
+    """Start a current span; exceptions are recorded and mark it as errored."""
+    attrs = {k: v for k, v in attributes.items() if v is not None}
+    with tracer.start_as_current_span(name, context=context, attributes=attrs) as sp:
+        yield sp
+
+
+def traced(name: str):
+    """Decorator: run a sync or async function inside :func:`span`."""
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inject_context() -> Dict[str, str]:
+    """Serialise the current span context (W3C traceparent) into a dict."""
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+
+def extract_context(carrier: Dict[str, str] | None) -> otel_context.Context | None:
+    return propagate.extract(carrier) if carrier else None
+
+
+# ─── HTTP server spans ─────────────────────────────────────────────────
+class TracingMiddleware:
+    """Pure‑ASGI middleware: one server span per HTTP request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        status: Dict[str, int] = {}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(headers),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        ) as sp:
+            await self.app(scope, receive, _send)
+            if "code" in status:
+                sp.set_attribute("http.status_code", status["code"])
+
+
+# ─── Local trace summary ───────────────────────────────────────────────
+def _summarize(path: str, trace_id: str | None) -> None:
+    import orjson
+
+    spans = [orjson.loads(line) for line in Path(path).read_text().splitlines() if line]
+    if trace_id:
+        spans = [s for s in spans if s["context"]["trace_id"].endswith(trace_id)]
+    children: Dict[str | None, List[Dict]] = {}
+    ids = {s["context"]["span_id"] for s in spans}
+    for s in spans:
+        s["_ms"] = (
+            datetime.fromisoformat(s["end_time"]) - datetime.fromisoformat(s["start_time"])
+        ).total_seconds() * 1000
+        parent = s.get("parent_id") if s.get("parent_id") in ids else None
+        children.setdefault(parent, []).append(s)
+
+    def _print(s: Dict, depth: int) -> None:
+        flag = "  !" if s.get("status", {}).get("status_code") == "ERROR" else ""
+        print(f"{'  ' * depth}{s['name']:<{48 - 2 * depth}} {s['_ms']:10.1f} ms{flag}")
+        for child in sorted(children.get(s["context"]["span_id"], []), key=lambda c: c["start_time"]):
+            _print(child, depth + 1)
+
+    for root in sorted(children.get(None, []), key=lambda c: c["start_time"]):
+        print(f"trace {root['context']['trace_id']}")
+        _print(root, 1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "summarize":
+        raise SystemExit("usage: python -m app.core.tracing summarize <file> [trace_id]")
+    _summarize(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
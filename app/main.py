@@ -1,10 +1,47 @@
-from fastapi import FastAPI
+import asyncio
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, spaces, content, chat
-from app.core.database import create_db_and_tables
+from fastapi.responses import JSONResponse
+from app.routers import auth, spaces, content, chat, metrics
+from app.core.migrations import check_schema_version
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.resilience import CircuitOpenError, UpstreamError
+from app.core.tracing import TracingMiddleware, setup_tracing
+from app.services.config import warm_http_client
+from app.services.events import broker
+from app.services.memory_db import memory_db
+from app.services.space_cache import space_cache
+from app.services.video_cache import video_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Verify the schema version (one query) – migrations run out of band –
+    and start shared resources.  The vector store opens in the background
+    (``MEMORY_DB_WARMUP``) so the worker accepts requests immediately, as
+    do the pre‑warmed Gemini connections (``GEMINI_PREWARM_CONNECTIONS``).
+    """
+    await check_schema_version()
+    await space_cache.start()
+    await broker.start()
+    await memory_db.start()
+    prewarm = asyncio.create_task(warm_http_client())
+    yield
+    prewarm.cancel()
+    await memory_db.stop()
+    await space_cache.stop()
+    await broker.stop()
+    await video_cache.close()
+
 
+app = FastAPI(title="Spaces Backend API", version="1.0.0", lifespan=lifespan)
 
-app = FastAPI(title="Spaces Backend API", version="1.0.0")
+setup_tracing("spaces-api")
+app.add_middleware(TracingMiddleware)
 
 # CORS configuration
 app.add_middleware( CORSMiddleware,
@@ -12,13 +49,18 @@ app.add_middleware( CORSMiddleware,
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=[NEXT_CURSOR_HEADER],  # let the browser read pagination cursors
 )
 
 
-@app.on_event("startup")
-async def on_startup():
-    """Create database tables on startup."""
-    await create_db_and_tables()
+@app.exception_handler(UpstreamError)
+async def upstream_error(request: Request, exc: UpstreamError) -> JSONResponse:
+    """Fail‑fast (breaker open) → 503 + Retry‑After; blown deadline → 504."""
+    if isinstance(exc, CircuitOpenError):
+        return JSONResponse(
+            {"detail": str(exc)}, status_code=503, headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+        )
+    return JSONResponse({"detail": str(exc)}, status_code=504)
 
 
 @app.get("/")
@@ -32,4 +74,5 @@ async def root():
 app.include_router(auth.router)
 app.include_router(spaces.router)
 app.include_router(content.router)
-app.include_router(chat.router)
\ No newline at end of file
+app.include_router(chat.router)
+app.include_router(metrics.router)
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+v0001 – baseline schema (users, spaces, contents).
+
+Frozen copy of what ``SQLModel.metadata.create_all`` used to build at
+startup.  Every statement is ``checkfirst`` so databases created the old
+way adopt the migration history without changes.
+"""
+import sqlalchemy as sa
+
+VERSION = 1
+DESCRIPTION = "baseline users / spaces / contents tables"
+
+_meta = sa.MetaData()
+
+users = sa.Table(
+    "users",
+    _meta,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("email", sa.String, nullable=False),
+    sa.Column("hashed_password", sa.String, nullable=False),
+    sa.Column("full_name", sa.String, nullable=True),
+    sa.Column("is_active", sa.Boolean, nullable=False),
+    sa.Index("ix_users_id", "id"),
+    sa.Index("ix_users_email", "email", unique=True),
+)
+
+spaces = sa.Table(
+    "spaces",
+    _meta,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("title", sa.String(255), nullable=False),
+    sa.Column("description", sa.String(1000), nullable=True),
+    sa.Column("owner_id", sa.Uuid, nullable=False),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+    sa.Index("ix_spaces_owner_id", "owner_id"),
+)
+
+contents = sa.Table(
+    "contents",
+    _meta,
+    sa.Column("id", sa.Uuid, primary_key=True),
+    sa.Column("space_id", sa.Uuid, sa.ForeignKey("spaces.id"), nullable=False),
+    sa.Column("owner_id", sa.Uuid, nullable=True),
+    sa.Column("title", sa.String, nullable=True),
+    sa.Column("file_path", sa.String, nullable=False),
+    sa.Column("mime_type", sa.String, nullable=False),
+    sa.Column("status", sa.String, nullable=False),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Index("ix_contents_space_id", "space_id"),
+    sa.Index("ix_contents_owner_id", "owner_id"),
+)
+
+
+def upgrade(conn) -> None:
+    _meta.create_all(conn, checkfirst=True)
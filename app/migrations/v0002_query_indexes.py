@@ -0,0 +1,26 @@
+"""
+v0002 – composite indexes for keyset pagination and ingest bookkeeping.
+
+* (owner_id, created_at, id) on spaces   → list_spaces?owner_id=…
+* (space_id, created_at, id) on contents → /contents/by_space/{id}
+* partial index on contents.status = 'pending' → finding unfinished ingests
+  without scanning the (much larger) processed set
+"""
+from sqlalchemy import text
+
+VERSION = 2
+DESCRIPTION = "composite list indexes + partial pending-status index"
+
+STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS ix_spaces_owner_created "
+    "ON spaces (owner_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_contents_space_created "
+    "ON contents (space_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_contents_pending "
+    "ON contents (status) WHERE status = 'pending'",
+)
+
+
+def upgrade(conn) -> None:
+    for stmt in STATEMENTS:
+        conn.execute(text(stmt))
@@ -0,0 +1,30 @@
+"""
+v0003 – space_deletions: cascading delete progress, visible to every worker.
+
+One row per space; it outlives the space so the outcome stays readable,
+and the orphan sweeper resumes jobs left in ``error`` or stale ``running``.
+"""
+import sqlalchemy as sa
+
+VERSION = 3
+DESCRIPTION = "space_deletions progress table"
+
+_meta = sa.MetaData()
+
+space_deletions = sa.Table(
+    "space_deletions",
+    _meta,
+    sa.Column("space_id", sa.Uuid, primary_key=True),
+    sa.Column("state", sa.String(16), nullable=False),
+    sa.Column("contents_deleted", sa.Integer, nullable=False),
+    sa.Column("vector_batches", sa.Integer, nullable=False),
+    sa.Column("files_unlinked", sa.Integer, nullable=False),
+    sa.Column("error", sa.String(1000), nullable=True),
+    sa.Column("started_at", sa.DateTime, nullable=False),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+    sa.Column("finished_at", sa.DateTime, nullable=True),
+)
+
+
+def upgrade(conn) -> None:
+    _meta.create_all(conn, checkfirst=True)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, TypedDict
 from uuid import UUID
 
 
@@ -17,6 +17,42 @@ class ChatRequest(BaseModel):
     temperature: float = 0.3
 
 
+class ChatBatchRequest(BaseModel):
+    user_id: UUID
+    space_id: UUID
+    questions: List[str] = Field(..., min_length=1)
+    k: int = 5
+    temperature: float = 0.3
+    concurrency: Optional[int] = Field(None, ge=1)  # LLM calls in flight; server default if unset
+
+
 class ChatResponse(BaseModel):
     answer: str
     context: List[str]
+
+
+class ChatResult(TypedDict):
+    """ChatResponse shape returned by services.chat and encoded with orjson."""
+    answer: str
+    context: List[str]
+
+
+class ChatBatchItem(TypedDict, total=False):
+    """One JSON line of the batch chat stream, in completion order."""
+    index: int                 # position in ChatBatchRequest.questions
+    question: str
+    answer: str
+    context: List[str]
+    latency_ms: float          # this question's LLM call, admission wait included
+    error: str                 # set instead of answer when the LLM call failed or was shed
+
+
+class ChatBatchSummary(TypedDict):
+    """Last line of the batch chat stream (under a "summary" key)."""
+    count: int
+    errors: int
+    retrieve_ms: float         # shared batched embed + multi‑query search
+    elapsed_ms: float
+    questions_per_s: float
+    p50_ms: float
+    p95_ms: float
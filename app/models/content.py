@@ -2,10 +2,21 @@ from sqlmodel import SQLModel, Field
 from uuid import uuid4, UUID
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import Index, select, text
 
 class Content(SQLModel, table=True):
     __tablename__ = "contents"
+    __table_args__ = (
+        # keyset pagination of /contents/by_space/{space_id}
+        Index("ix_contents_space_created", "space_id", "created_at", "id"),
+        # unfinished ingests only – stays tiny as the processed set grows
+        Index(
+            "ix_contents_pending",
+            "status",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     space_id: UUID = Field(foreign_key="spaces.id", index=True)
@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
-from typing import Optional
+from typing import Optional, TypedDict
 
 
 # ─── inbound payload ──────────────────────────────────────────
@@ -23,3 +23,14 @@ class ContentOut(BaseModel):
 
     class Config:
         orm_mode = True               # enables SQLModel → Pydantic
+
+
+class ContentRow(TypedDict):
+    """ContentOut shape built straight from a column tuple (fast list path)."""
+    id: UUID
+    space_id: UUID
+    owner_id: Optional[UUID]
+    title: Optional[str]
+    mime_type: str
+    status: str
+    created_at: datetime
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 import uuid
 from typing import Optional, List
 from datetime import datetime
@@ -6,6 +7,10 @@ from datetime import datetime
 
 class Space(SQLModel, table=True):
     __tablename__ = "spaces"
+    __table_args__ = (
+        # keyset pagination of list_spaces?owner_id=…
+        Index("ix_spaces_owner_created", "owner_id", "created_at", "id"),
+    )
 
     id :uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255, nullable=False)
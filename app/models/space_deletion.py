@@ -0,0 +1,19 @@
+from sqlmodel import SQLModel, Field
+import uuid
+from typing import Optional
+from datetime import datetime
+
+
+class SpaceDeletion(SQLModel, table=True):
+    """Progress of a cascading space delete, shared by every worker (see services/space_deletion.py)."""
+    __tablename__ = "space_deletions"
+
+    space_id: uuid.UUID = Field(primary_key=True)   # no FK: the row outlives its space
+    state: str = Field(default="running", max_length=16)   # running | done | error
+    contents_deleted: int = 0
+    vector_batches: int = 0
+    files_unlinked: int = 0
+    error: Optional[str] = Field(default=None, max_length=1000)
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)   # heartbeat of a running job
+    finished_at: Optional[datetime] = None
@@ -1,13 +1,13 @@
 # app/models/space_schemas.py
 import uuid
-from typing import Optional
+from typing import Optional, TypedDict
 from pydantic import BaseModel, Field
 import datetime
 
 class SpaceBase(BaseModel):
     title: str
     description: Optional[str] = None
-    owner_id: str                      # ← required in payload
+    owner_id: uuid.UUID                # ← required in payload; malformed → 422
 
 class SpaceCreate(SpaceBase):
     pass
@@ -30,3 +30,12 @@ class SpaceOut(BaseModel):
 
     class Config:
         orm_mode = True  # ← key line      # allow owner change if you want
+
+
+class SpaceRow(TypedDict):
+    """SpaceOut shape built straight from a column tuple (fast list path)."""
+    id: uuid.UUID
+    title: str
+    description: Optional[str]
+    owner_id: uuid.UUID
+    created_at: datetime.datetime
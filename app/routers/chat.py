@@ -1,17 +1,24 @@
+import os
+
+import orjson
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from sqlmodel import select  
+from app.core.admission import admission
 from app.core.database import get_session
-from app.models.space import Space
-from app.models.content import Content  # optional existence check
-from app.models.chat_schemas import ChatRequest, ChatResponse
-from app.services.chat import chat  # <- your helper module
+from app.models.chat_schemas import ChatBatchRequest, ChatRequest, ChatResponse
+from app.core.serialization import FastJSONResponse
+from app.services.chat import chat, chat_batch  # <- your helper module
+from app.services.space_cache import space_cache
 from sqlalchemy import select
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
+CHAT_BATCH_MAX_QUESTIONS = int(os.getenv("CHAT_BATCH_MAX_QUESTIONS", 1000))
+
 
 @router.post("/", response_model=ChatResponse)
 async def chat_endpoint(
@@ -20,16 +27,21 @@ async def chat_endpoint(
 ):
     """
     Conversational endpoint scoped to a Space.
+
+    Admitted through the "chat" admission class (per space); answers 503
+    with Retry-After when overloaded (see app/core/admission.py).
     """
-    # 1. basic validation: space must exist
-    space: Space | None = await session.get(Space, payload.space_id)
-    if not space:
-        raise HTTPException(status_code=404, detail="Space not found")
+    async with admission.admit("chat", str(payload.space_id)):
+        return await _chat(payload, session)
+
 
-    # (optional) ensure the space actually has content
-    stmt = select(Content).where(Content.space_id == payload.space_id).limit(1)
-    result = await session.execute(stmt)
-    if not result.first():
+async def _chat(payload: ChatRequest, session: AsyncSession):
+    # 1. basic validation: space must exist and have processed content
+    #    (served from the space cache – no DB round trip on a hit)
+    meta = await space_cache.lookup(session, payload.space_id)
+    if not meta.exists:
+        raise HTTPException(status_code=404, detail="Space not found")
+    if not meta.has_processed:
         raise HTTPException(400, detail="Space has no processed content yet")
 
     # 2. delegate to chat helper
@@ -41,4 +53,44 @@ async def chat_endpoint(
         k=payload.k,
         temperature=payload.temperature,
     )
-    return response
+    # ChatResult is already the ChatResponse shape – skip re‑validation
+    return FastJSONResponse(response)
+
+
+@router.post("/batch")
+async def chat_batch_endpoint(
+    payload: ChatBatchRequest,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Many independent questions against one Space (evaluations, bulk
+    question generation).
+
+    Streams JSON Lines (``application/x-ndjson``): one ChatBatchItem per
+    question as it completes – match them up by ``index`` – then a final
+    ``{"summary": ...}`` line with latency percentiles and throughput.
+    Each question's LLM call is admitted as "chat_batch", the lowest
+    priority class; an overloaded server sheds questions, not the stream.
+    """
+    if len(payload.questions) > CHAT_BATCH_MAX_QUESTIONS:
+        raise HTTPException(400, detail=f"At most {CHAT_BATCH_MAX_QUESTIONS} questions per batch")
+    meta = await space_cache.lookup(session, payload.space_id)
+    if not meta.exists:
+        raise HTTPException(status_code=404, detail="Space not found")
+    if not meta.has_processed:
+        raise HTTPException(400, detail="Space has no processed content yet")
+
+    async def lines():
+        async for item in chat_batch(
+            user_id=str(payload.user_id),
+            space=str(payload.space_id),
+            questions=payload.questions,
+            k=payload.k,
+            temperature=payload.temperature,
+            concurrency=payload.concurrency,
+        ):
+            yield orjson.dumps(item) + b"\n"
+
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"}
+    )
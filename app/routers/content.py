@@ -1,17 +1,47 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, status
+import asyncio
+
+import orjson
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Query, Request, status
+from fastapi.responses import StreamingResponse
 from uuid import UUID
 from sqlmodel import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.admission import admission
 from app.core.database import get_session
+from app.core.metrics import BYTES
+from app.core.tracing import inject_context, span
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    paginate,
+    split_page,
+)
+from app.core.serialization import FastJSONResponse, column_keys, rows_to_dicts
 from app.core.storage import save_upload
 from app.models.content import Content
 from app.models.content_schemas import ContentOut
-from app.models.space import Space
+from app.services.events import broker, content_topic, space_topic
 from app.services.ingest import async_ingest
+from app.services.space_cache import space_cache
 
 router = APIRouter(prefix="/contents", tags=["Contents"])
 
+# columns ContentOut needs, in output order (see ContentRow) – file_path never leaves the DB
+CONTENT_OUT_COLUMNS = (
+    Content.id,
+    Content.space_id,
+    Content.owner_id,
+    Content.title,
+    Content.mime_type,
+    Content.status,
+    Content.created_at,
+)
+CONTENT_OUT_KEYS = column_keys(CONTENT_OUT_COLUMNS)
+
+SSE_HEARTBEAT_SECONDS = 15
+
 
 @router.post("/upload", response_model=ContentOut, status_code=status.HTTP_201_CREATED)
 async def upload_content(
@@ -22,8 +52,15 @@ async def upload_content(
     owner_id: UUID | None = None,
     session: AsyncSession = Depends(get_session),
 ):
+    with span("upload_content", space_id=str(space_id), filename=file.filename):
+        # queued behind interactive chat when overloaded (app/core/admission.py)
+        async with admission.admit("upload", str(space_id)):
+            return await _upload_content(background_tasks, space_id, file, title, owner_id, session)
+
+
+async def _upload_content(background_tasks, space_id, file, title, owner_id, session):
     # 1. verify space exists
-    if not await session.get(Space, space_id):
+    if not (await space_cache.lookup(session, space_id)).exists:
         raise HTTPException(404, detail="Space not found")
 
     # 2. create Content (without file_path yet)
@@ -35,28 +72,74 @@ async def upload_content(
         status="pending",
     )
 
-    # 3. save file first (to keep extension) → get path
+    # 3. save file first (to keep extension) → get its location (path or s3:// key)
     try:
-        saved_path = save_upload(file, content.id)
+        stored = await save_upload(file, content.id)
     except ValueError as exc:
         raise HTTPException(400, str(exc)) from exc
 
-    content.file_path = str(saved_path)
+    content.file_path = stored.location
+    BYTES.inc("upload", "in", amount=stored.size)
 
     # 4. insert row
     session.add(content)
     await session.commit()
     await session.refresh(content)
 
-    # 5. background ingestion
-    background_tasks.add_task(async_ingest, content.id)
+    # 5. background ingestion – carries the trace so ingest spans join this request
+    background_tasks.add_task(async_ingest, content.id, inject_context())
 
     return content
 
 
 # ─── list by space ─────────────────────────────────────────────
 @router.get("/by_space/{space_id}", response_model=list[ContentOut])
-async def list_by_space(space_id: UUID, session: AsyncSession = Depends(get_session)):
-    stmt = select(Content).where(Content.space_id == space_id).order_by(Content.created_at.desc())
+async def list_by_space(
+    space_id: UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_session),
+):
+    stmt = select(*CONTENT_OUT_COLUMNS).where(Content.space_id == space_id)
+    stmt = paginate(stmt, Content.created_at, Content.id, cursor, limit)
     result = await session.execute(stmt)
-    return result.scalars().all()
+    rows, next_cursor = split_page(result.all(), limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(rows_to_dicts(rows, CONTENT_OUT_KEYS), headers=headers)
+
+
+# ─── ingestion status stream (SSE) ────────────────────────────────
+async def _sse(topic: str, request: Request):
+    async with broker.subscribe(topic) as queue:
+        yield b": subscribed\n\n"
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield b"event: status\ndata: " + orjson.dumps(event) + b"\n\n"
+
+
+def _event_stream(topic: str, request: Request) -> StreamingResponse:
+    return StreamingResponse(
+        _sse(topic, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/by_space/{space_id}/events")
+async def space_events(space_id: UUID, request: Request):
+    """
+    Server‑sent events for every content in a space: status transitions
+    (processing → processed | error) plus progress (pages parsed, chunks
+    embedded).  Subscribe first, then list once – no polling needed.
+    """
+    return _event_stream(space_topic(space_id), request)
+
+
+@router.get("/{content_id}/events")
+async def content_events(content_id: UUID, request: Request):
+    """Same as ``/by_space/{space_id}/events`` for a single content."""
+    return _event_stream(content_topic(content_id), request)
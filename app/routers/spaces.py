@@ -1,15 +1,30 @@
 # app/routers/spaces.py
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
 from app.core.database import get_session
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    paginate,
+    split_page,
+)
+from app.core.serialization import FastJSONResponse, column_keys, rows_to_dicts
 from app.models.space import Space
 from app.models.space_schemas import SpaceCreate, SpaceRead, SpaceUpdate, SpaceOut
+from app.services.space_cache import MISSING, SpaceMeta, space_cache
+from app.services.space_deletion import delete_space_cascade, get_progress, start_deletion
 from typing import List
+from uuid import UUID
 
 router = APIRouter(prefix="/spaces", tags=["Spaces (no-auth, owner_id in body)"])
 
+# columns SpaceOut needs, in output order (see SpaceRow)
+SPACE_OUT_COLUMNS = (Space.id, Space.title, Space.description, Space.owner_id, Space.created_at)
+SPACE_OUT_KEYS = column_keys(SPACE_OUT_COLUMNS)
+
 # CREATE
 @router.post("/create_space", status_code=status.HTTP_201_CREATED)
 async def create_space(
@@ -19,25 +34,31 @@ async def create_space(
     space = Space(
         title=payload.title,
         description=payload.description,
-        owner_id=payload.owner_id,  # owner_id is required in the payload
+        owner_id=payload.owner_id,  # validated UUID, so non‑PG drivers bind it
     )
     session.add(space)
     await session.commit()
     await session.refresh(space)
+    await space_cache.put(space.id, SpaceMeta(exists=True, owner_id=space.owner_id))
     return space
 
-# LIST (optionally filter by owner_id)
+# LIST (optionally filter by owner_id), newest first, keyset‑paginated
 @router.get("/list_spaces", response_model=List[SpaceOut])
 async def list_spaces(
-    owner_id: str | None = None,                   # ?owner_id=<uuid> query param
+    owner_id: UUID | None = None,                  # ?owner_id=<uuid> query param
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,                     # value of the previous X-Next-Cursor
     session: AsyncSession = Depends(get_session),
 ):
-    stmt = select(Space).order_by(Space.created_at.desc())
+    # only the columns SpaceOut needs – no ORM identity map, no updated_at
+    stmt = select(*SPACE_OUT_COLUMNS)
     if owner_id:
         stmt = stmt.where(Space.owner_id == owner_id)
+    stmt = paginate(stmt, Space.created_at, Space.id, cursor, limit)
     result = await session.execute(stmt)
-    spaces = result.all()
-    return [space for space, in spaces]
+    rows, next_cursor = split_page(result.all(), limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(rows_to_dicts(rows, SPACE_OUT_KEYS), headers=headers)
 
 # GET
 @router.get("/space/{space_id}", response_model=SpaceOut)
@@ -62,14 +83,48 @@ async def update_space(
         setattr(space, k, v)
     await session.commit()
     await session.refresh(space)
+    await space_cache.invalidate(space.id)
     return space
 
-# DELETE
-@router.delete("/space/{space_id}")
-async def delete_space(space_id: str, session: AsyncSession = Depends(get_session)):
+# DELETE – cascades to contents, vectors and files in the background
+@router.delete("/space/{space_id}", status_code=status.HTTP_202_ACCEPTED)
+async def delete_space(
+    space_id: UUID,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session),
+):
     space = await session.get(Space, space_id)
     if not space:
         raise HTTPException(status_code=404, detail="Space not found")
-    await session.delete(space)
-    await session.commit()
-    return {"detail": "Space deleted successfully"}
\ No newline at end of file
+
+    # hide the space from chat/upload right away; rows go in batches
+    await space_cache.put(space.id, MISSING)
+    progress, created = await start_deletion(space.id)
+    if created:
+        background_tasks.add_task(delete_space_cascade, space.id)
+    return {"detail": "Space deletion started", "progress": progress.model_dump()}
+
+
+# DELETE progress
+@router.get("/space/{space_id}/deletion")
+async def delete_space_progress(space_id: UUID):
+    progress = await get_progress(space_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="No deletion job for this space")
+    return progress.model_dump()
+
+
+# SEARCH across all of an owner's spaces (routed – see services/space_router.py)
+@router.get("/search")
+async def search_spaces(
+    owner_id: UUID,
+    q: str = Query(..., min_length=1),
+    k: int = Query(5, ge=1, le=100),
+    probes: int | None = Query(None, ge=1, le=256),
+):
+    from app.services.space_router import SPACE_ROUTER_PROBES, space_router  # numpy, on first use
+
+    hits = await space_router.search(str(owner_id), q, k=k, probes=probes or SPACE_ROUTER_PROBES)
+    # spaces being deleted are hidden at once; their summaries go with the cascade
+    hits = [h for h in hits if space_cache.get(UUID(h["space_id"])) is not MISSING]
+    return FastJSONResponse(hits)
\ No newline at end of file
@@ -4,9 +4,12 @@ Space‑scoped conversational helper using MemoryDB + Gemini Flash‑Lite
 """
 from __future__ import annotations
 
-from typing import List, Dict
+import asyncio, os, time
+from typing import AsyncIterator, List, Dict, Union
 
-from app.services.memory_db import memory_db
+from app.core.admission import admission
+from app.models.chat_schemas import ChatBatchItem, ChatBatchSummary, ChatResult
+from app.services.memory_db import Retrieval, memory_db
 from app.services.config import llm_chat
 
 # ─── Prompt templates ──────────────────────────────────────────────────
@@ -18,18 +21,38 @@ CONTEXT_HEADER = "Here are some relevant snippets from your space:\n"
 CONTEXT_ITEM = "- {chunk}"
 
 USER_HEADER = "\n\nUser: {message}\nAI:"
+
+# batch chat: LLM calls in flight per request, and the cap a client may ask for
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", 8))
+CHAT_BATCH_MAX_CONCURRENCY = int(os.getenv("CHAT_BATCH_MAX_CONCURRENCY", 32))
+# MMR / near‑duplicate filtering of retrieved context (see services/diversify.py)
+RETRIEVAL_MMR = os.getenv("RETRIEVAL_MMR", "1") == "1"
+RETRIEVAL_OVERFETCH = int(os.getenv("RETRIEVAL_OVERFETCH", 4))
 # ----------------------------------------------------------------------
 
 
+def _diverse(hits: Retrieval, k: int) -> List[str]:
+    """*k* of the over‑fetched *hits*, minus near‑duplicates, by MMR."""
+    if hits.embeddings is None or not len(hits.embeddings):
+        return hits.documents[:k]
+    from app.services.diversify import mmr  # numpy, on first use
+
+    return [hits.documents[i] for i in mmr(hits.scores, hits.embeddings, k)]
+
+
 async def _build_context(user_id: str, space: str, query: str, k: int = 5) -> List[str]:
     """
-    Retrieve *k* most relevant snippets for *query* within a *space*.
+    Retrieve *k* relevant, mutually diverse snippets for *query* within a *space*.
     Filters by subtype prefix '<space>/' in MemoryDB.
     """
     # add simple prefix so retrieval is scoped
     scoped_query = f"[{space}] {query}"
-    chunks = await memory_db.retrieve(user_id=user_id, query=scoped_query, k=k)
-    return chunks
+    if not RETRIEVAL_MMR:
+        return await memory_db.retrieve(user_id=user_id, query=scoped_query, k=k)
+    hits = await memory_db.search(
+        user_id=user_id, query=scoped_query, k=k * RETRIEVAL_OVERFETCH, embeddings=True
+    )
+    return _diverse(hits, k)
 
 
 def _assemble_prompt(chunks: List[str], user_msg: str) -> str:
@@ -55,7 +78,7 @@ async def chat(
     *,
     k: int = 5,
     temperature: float = 0.3,
-) -> Dict[str, str]:
+) -> ChatResult:
     """
     High‑level chat helper.
 
@@ -95,4 +118,83 @@ async def chat(
     answer = await llm_chat(prompt, temperature=temperature)
 
     # 4️⃣  return
-    return {"answer": answer, "context": snippets}
+    return ChatResult(answer=answer, context=snippets)
+
+
+def _pct(sorted_ms: List[float], q: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))] if sorted_ms else 0.0
+
+
+async def chat_batch(
+    user_id: str,
+    space: str,
+    questions: List[str],
+    *,
+    k: int = 5,
+    temperature: float = 0.3,
+    concurrency: int | None = None,
+) -> AsyncIterator[Union[ChatBatchItem, Dict[str, ChatBatchSummary]]]:
+    """
+    Answer many independent *questions* against one space.
+
+    Retrieval for the whole batch is one batched embed plus one
+    multi‑query vector search; the LLM calls then run at most
+    *concurrency* at a time, each admitted as a "chat_batch" call (see
+    app/core/admission.py).  Yields a :class:`ChatBatchItem` per
+    question as it completes (not in input order), then
+    ``{"summary": ChatBatchSummary}``.  A failed LLM call yields an item
+    with ``error`` instead of ending the batch.
+    """
+    started = time.perf_counter()
+    scoped = [f"[{space}] {q}" for q in questions]
+    if RETRIEVAL_MMR:
+        hits = await memory_db.search_many(
+            user_id=user_id, queries=scoped, k=k * RETRIEVAL_OVERFETCH, embeddings=True
+        )
+        contexts = [_diverse(h, k) for h in hits]
+    else:
+        contexts = await memory_db.retrieve_many(user_id=user_id, queries=scoped, k=k)
+    retrieve_ms = (time.perf_counter() - started) * 1000
+
+    limit = asyncio.Semaphore(min(concurrency or CHAT_BATCH_CONCURRENCY, CHAT_BATCH_MAX_CONCURRENCY))
+
+    async def _answer(i: int) -> ChatBatchItem:
+        item = ChatBatchItem(index=i, question=questions[i], context=contexts[i])
+        async with limit:
+            t0 = time.perf_counter()
+            try:
+                async with admission.admit("chat_batch", space):
+                    item["answer"] = await llm_chat(
+                        _assemble_prompt(contexts[i], questions[i]), temperature=temperature
+                    )
+            except Exception as exc:  # noqa: BLE001 – reported per item, shed ones included
+                item["error"] = f"{type(exc).__name__}: {exc}"
+            item["latency_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        return item
+
+    tasks = [asyncio.create_task(_answer(i)) for i in range(len(questions))]
+    latencies: List[float] = []
+    errors = 0
+    try:
+        for done in asyncio.as_completed(tasks):
+            item = await done
+            latencies.append(item["latency_ms"])
+            errors += "error" in item
+            yield item
+    finally:
+        for t in tasks:  # client went away: stop the LLM calls still queued
+            t.cancel()
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    yield {
+        "summary": ChatBatchSummary(
+            count=len(questions),
+            errors=errors,
+            retrieve_ms=round(retrieve_ms, 2),
+            elapsed_ms=round(elapsed * 1000, 2),
+            questions_per_s=round(len(questions) / elapsed, 2),
+            p50_ms=_pct(latencies, 0.50),
+            p95_ms=_pct(latencies, 0.95),
+        )
+    }
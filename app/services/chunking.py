@@ -0,0 +1,163 @@
+"""
+app/services/chunking.py
+Content‑defined text chunking + chunk fingerprints for incremental ingest.
+
+Fixed‑size windows shift every boundary after an edit, so one new
+paragraph would change every later chunk and force a full re‑embed.
+Here chunks are packed from whole paragraphs and a chunk may only close
+early at a paragraph whose hash hits a boundary mask.  Boundaries depend
+on local content, so after an edit they re‑synchronise at the next
+boundary paragraph and the rest of the document hashes identically.
+
+Extractors that keep document structure (see media_parser.py) feed
+:func:`chunk_blocks` instead: a heading always opens a new chunk, and a
+table's rows are packed together, with its first row repeated at the top
+of each continuation, rather than being split up line by line.  A
+paragraph too long to hold whole arrives as segments – consecutive
+slices of its stripped text, cut by :func:`segment_cut` where
+:func:`_split_long` splits anyway – so its chunks match :func:`chunk_text`
+over the whole text.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+MAX_CHUNK_CHARS = 1500
+MIN_CHUNK_CHARS = 400
+# ~1 in 4 paragraphs past MIN_CHUNK_CHARS is a boundary
+_BOUNDARY_MASK = 0b11
+
+_PARA_SPLIT = re.compile(r"\n\s*\n")
+# what str.splitlines() splits on
+_LINE_BREAK = re.compile(r"\r\n|[\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+
+HEADING, PARAGRAPH, TABLE_ROW, SEGMENT = "heading", "paragraph", "table_row", "segment"
+
+
+class Block(NamedTuple):
+    """One structural unit of a document, in reading order."""
+
+    kind: str  # HEADING | PARAGRAPH | TABLE_ROW | SEGMENT
+    text: str
+    level: int = 0  # heading: 1 = top level; table row: index within its table; segment: 1 = more follow
+
+
+def chunk_hash(chunk: str) -> str:
+    """Stable fingerprint of a chunk's text (also its vector id suffix)."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:32]
+
+
+def _is_boundary(paragraph: str) -> bool:
+    digest = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=4).digest()
+    return digest[0] & _BOUNDARY_MASK == 0
+
+
+def _split_long(paragraph: str, size: int) -> Iterator[str]:
+    # oversized "paragraphs" (e.g. PDF pages joined by single newlines) are
+    # split into lines, and only over‑long lines into fixed windows
+    for line in paragraph.splitlines():
+        for i in range(0, len(line), size):
+            yield line[i : i + size]
+
+
+def segment_cut(text: str, limit: int, size: int = MAX_CHUNK_CHARS) -> int:
+    """
+    Where to cut *text* (which starts a line, or *size*‑aligned inside
+    one) at or before *limit* so that :func:`_split_long` yields the same
+    pieces for the two halves as for the whole: after the last line
+    break, else at a multiple of *size*.  0 if there is no such point.
+    """
+    cut = 0
+    for m in _LINE_BREAK.finditer(text, 0, limit):
+        cut = m.end()
+    if cut:
+        return cut + 1 if text[cut - 1] == "\r" and text[cut : cut + 1] == "\n" else cut
+    return limit // size * size
+
+
+def chunk_paragraphs(
+    paragraphs: Iterable[str],
+    max_chars: int = MAX_CHUNK_CHARS,
+    min_chars: int = MIN_CHUNK_CHARS,
+) -> Iterator[str]:
+    """Pack *paragraphs* into content‑defined chunks of at most *max_chars*."""
+    return _pack(paragraphs, max_chars, min_chars)
+
+
+def _pack(paragraphs: Iterable[Union[str, List[str], None]], max_chars: int, min_chars: int) -> Iterator[str]:
+    # ``None`` in *paragraphs* closes the current chunk (section break); a
+    # list is a segment of an oversized paragraph, already split
+    buf: List[str] = []
+    size = 0
+    for para in paragraphs:
+        if para is None:
+            if buf:
+                yield "\n\n".join(buf)
+                buf, size = [], 0
+            continue
+        if isinstance(para, list):
+            pieces = para
+        else:
+            para = para.strip()
+            if not para:
+                continue
+            pieces = [para] if len(para) <= max_chars else list(_split_long(para, max_chars))
+        for piece in pieces:
+            if buf and size + len(piece) > max_chars:
+                yield "\n\n".join(buf)
+                buf, size = [], 0
+            buf.append(piece)
+            size += len(piece)
+            if size >= min_chars and _is_boundary(piece):
+                yield "\n\n".join(buf)
+                buf, size = [], 0
+    if buf:
+        yield "\n\n".join(buf)
+
+
+def _block_paragraphs(blocks: Iterable[Block], max_chars: int) -> Iterator[Union[str, List[str], None]]:
+    # a table's rows are grouped up to *max_chars*; only the group being
+    # filled is held, so a huge table costs no more memory than a chunk
+    header: Optional[str] = None
+    group: List[str] = []
+    size = 0
+    for block in blocks:
+        if block.kind == TABLE_ROW and block.level and header is not None:
+            if size + len(block.text) > max_chars:
+                yield "\n".join(group)
+                # repeat a (short) header row so the columns stay readable
+                group = [header] if len(header) <= max_chars // 4 else []
+                size = sum(len(r) + 1 for r in group)
+            group.append(block.text)
+            size += len(block.text) + 1
+            continue
+        if group:
+            yield "\n".join(group)
+            header, group, size = None, [], 0
+        if block.kind == TABLE_ROW:  # first row of a table
+            header, group, size = block.text, [block.text], len(block.text) + 1
+        elif block.kind == HEADING:
+            yield None
+            yield block.text
+        elif block.kind == SEGMENT:
+            yield list(_split_long(block.text, max_chars))
+        else:
+            yield block.text
+    if group:
+        yield "\n".join(group)
+
+
+def chunk_blocks(
+    blocks: Iterable[Block],
+    max_chars: int = MAX_CHUNK_CHARS,
+    min_chars: int = MIN_CHUNK_CHARS,
+) -> Iterator[str]:
+    """Pack structured *blocks* (consumed lazily) into chunks; see the module docstring."""
+    return _pack(_block_paragraphs(blocks, max_chars), max_chars, min_chars)
+
+
+def chunk_text(text: str, max_chars: int = MAX_CHUNK_CHARS, min_chars: int = MIN_CHUNK_CHARS) -> List[str]:
+    """Split extracted *text* on blank lines and pack into chunks."""
+    return list(chunk_paragraphs(_PARA_SPLIT.split(text), max_chars, min_chars))
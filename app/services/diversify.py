@@ -0,0 +1,71 @@
+"""
+app/services/diversify.py
+Maximal marginal relevance (MMR) and near‑duplicate filtering of retrieved chunks.
+
+Overlapping slides, re‑uploaded handouts and repeated boilerplate give
+the top *k* of a plain similarity search several copies of one passage.
+The chat path therefore over‑fetches ``k × RETRIEVAL_OVERFETCH``
+candidates with their vectors (``RETRIEVAL_MMR=0`` turns this off, see
+``services/chat.py``) and picks *k* of them greedily:
+
+* a candidate whose cosine similarity to an already picked chunk is at
+  least ``RETRIEVAL_DEDUP_THRESHOLD`` is a near‑duplicate and dropped;
+* of the rest, the next pick maximises
+  ``λ · relevance − (1 − λ) · max similarity to the picks so far``
+  (``RETRIEVAL_MMR_LAMBDA``; 1 is plain relevance order, and only the
+  duplicate filter applies).
+
+One ``n × n`` similarity matmul, then *k* vector steps over ``n``
+candidates – well under a millisecond for a few dozen 768‑d candidates.
+Imports numpy, so callers import this module on first use.
+"""
+from __future__ import annotations
+
+import os
+from typing import List, Sequence
+
+import numpy as np
+
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", 0.7))
+RETRIEVAL_DEDUP_THRESHOLD = float(os.getenv("RETRIEVAL_DEDUP_THRESHOLD", 0.95))
+
+
+def mmr(
+    relevance: Sequence[float],
+    vectors,
+    k: int,
+    lambda_: float = RETRIEVAL_MMR_LAMBDA,
+    dedup_threshold: float = RETRIEVAL_DEDUP_THRESHOLD,
+) -> List[int]:
+    """
+    Indices of up to *k* diverse candidates, in pick order.
+
+    *relevance* is each candidate's similarity to the query (higher is
+    better), *vectors* their embeddings as an ``(n, d)`` array or rows
+    (normalised here; Python lists cost more to convert than the rest).
+    Fewer than *k* come back when the rest are near‑duplicates.
+    """
+    rel = np.asarray(relevance, dtype=np.float32)
+    n = len(rel)
+    if not n or k <= 0:
+        return []
+    v = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(v, axis=1, keepdims=True)
+    v = v / np.where(norms == 0, 1, norms)
+    sim = v @ v.T
+
+    closest = np.full(n, -np.inf, dtype=np.float32)  # max similarity to any pick
+    open_ = np.ones(n, dtype=bool)  # neither picked nor a near‑duplicate of a pick
+    picks: List[int] = []
+    rel = lambda_ * rel
+    while len(picks) < k:
+        # closest is -inf before the first pick, and anti‑correlated chunks earn no bonus
+        gain = rel - (1 - lambda_) * np.maximum(closest, 0)
+        i = int(np.argmax(np.where(open_, gain, -np.inf)))
+        if not open_[i]:
+            break  # the rest are near‑duplicates
+        picks.append(i)
+        open_[i] = False
+        np.maximum(closest, sim[i], out=closest)
+        open_ &= closest < dedup_threshold
+    return picks
@@ -0,0 +1,159 @@
+"""
+app/services/events.py
+Pub/sub fan‑out of ingestion status + progress to SSE subscribers.
+
+Topics are ``space:<space_id>`` and ``content:<content_id>``.  By default
+events are delivered in‑process.  With ``EVENTS_REDIS_URL`` set they go
+through Redis pub/sub instead, so an event emitted by one API worker or
+by the Celery worker reaches subscribers connected to any API worker.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Set
+from uuid import UUID
+
+import orjson
+
+log = logging.getLogger(__name__)
+
+EVENTS_REDIS_URL: str | None = os.getenv("EVENTS_REDIS_URL")
+CHANNEL_PREFIX = "events:"
+QUEUE_SIZE = 256  # per subscriber; slow consumers lose the oldest events
+
+
+class EventBroker:
+    def __init__(self) -> None:
+        self._subs: Dict[str, Set[asyncio.Queue]] = {}
+        self._redis = None
+        self._redis_loop: asyncio.AbstractEventLoop | None = None
+        self._listener: asyncio.Task | None = None
+        self._pending: Set[asyncio.Task] = set()
+
+    # ── subscribing ─────────────────────────────────────────────────
+    @asynccontextmanager
+    async def subscribe(self, topic: str) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subs.setdefault(topic, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subs = self._subs.get(topic)
+            if subs is not None:
+                subs.discard(queue)
+                if not subs:
+                    del self._subs[topic]
+
+    def _deliver(self, topic: str, event: Dict[str, Any]) -> None:
+        for queue in self._subs.get(topic, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    # ── publishing ──────────────────────────────────────────────────
+    async def publish(self, topic: str, event: Dict[str, Any]) -> None:
+        client = self._client()
+        if client is None:
+            self._deliver(topic, event)
+            return
+        try:
+            await client.publish(CHANNEL_PREFIX + topic, orjson.dumps(event))
+        except Exception:  # noqa: BLE001 – status is still persisted in the DB
+            log.warning("event publish to redis failed", exc_info=True)
+
+    def emit(self, topic: str, event: Dict[str, Any]) -> None:
+        """
+        Fire‑and‑forget :meth:`publish` for sync callbacks on the loop thread.
+        Terminal events are awaited instead; :meth:`stop` drains the rest.
+        """
+        if self._client() is None:
+            self._deliver(topic, event)
+            return
+        task = asyncio.get_running_loop().create_task(self.publish(topic, event))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    # ── redis plumbing ──────────────────────────────────────────────
+    def _client(self):
+        if not EVENTS_REDIS_URL:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            import redis.asyncio as aioredis  # optional dependency path
+
+            self._redis = aioredis.from_url(EVENTS_REDIS_URL)
+            self._redis_loop = loop
+        return self._redis
+
+    async def start(self) -> None:
+        """Relay Redis events to local subscribers (API workers only)."""
+        if self._client() is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def drain(self) -> None:
+        """Wait for the :meth:`emit` publishes still in flight."""
+        while self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Flush pending publishes and close Redis (API lifespan, and per Celery task)."""
+        await self.drain()
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "pmessage":
+                        continue
+                    topic = msg["channel"].decode()[len(CHANNEL_PREFIX):]
+                    if topic in self._subs:
+                        self._deliver(topic, orjson.loads(msg["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                log.warning("event relay dropped; retrying", exc_info=True)
+                await asyncio.sleep(1.0)
+
+
+# Singleton instance used across the app
+broker = EventBroker()
+
+
+# ─── Ingestion helpers ─────────────────────────────────────────────────
+def space_topic(space_id: UUID | str) -> str:
+    return f"space:{space_id}"
+
+
+def content_topic(content_id: UUID | str) -> str:
+    return f"content:{content_id}"
+
+
+def _ingest_payload(space_id: UUID, content_id: UUID, status: str, progress: Dict[str, Any]) -> Dict[str, Any]:
+    return {"content_id": str(content_id), "space_id": str(space_id), "status": status, **progress}
+
+
+def ingest_event(space_id: UUID, content_id: UUID, status: str, **progress: Any) -> None:
+    """Emit a status/progress event for *content_id* to both of its topics."""
+    event = _ingest_payload(space_id, content_id, status, progress)
+    broker.emit(space_topic(space_id), event)
+    broker.emit(content_topic(content_id), event)
+
+
+async def publish_ingest_event(space_id: UUID, content_id: UUID, status: str, **progress: Any) -> None:
+    """:func:`ingest_event`, awaited – for the terminal ``processed`` / ``error`` events."""
+    event = _ingest_payload(space_id, content_id, status, progress)
+    await asyncio.gather(
+        broker.publish(space_topic(space_id), event),
+        broker.publish(content_topic(content_id), event),
+    )
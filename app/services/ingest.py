@@ -1,44 +1,71 @@
 from uuid import UUID
-from pathlib import Path
-import tempfile
 import asyncio
 
-from app.services.media_parser import extract_text
+from app.core.metrics import QUEUE_DEPTH
+from app.core.storage import open_upload
+from app.core.tracing import extract_context, span
+from app.services.events import ingest_event, publish_ingest_event
+from app.services.media_parser import extract_chunks
 from app.services.memory_db import memory_db
 from app.core.database import async_session_factory
 from app.models.content import Content
+from app.services.space_cache import space_cache
 
 
-async def async_ingest(content_id: UUID) -> None:
+async def async_ingest(content_id: UUID, trace_context: dict | None = None) -> None:
+    """
+    Ingest one Content.  *trace_context* is the carrier from
+    ``inject_context()`` at enqueue time, so the ingest spans become
+    children of the upload request (or Celery sender) span.
+    """
+    QUEUE_DEPTH.inc("ingest")
+    try:
+        with span("async_ingest", context=extract_context(trace_context), content_id=str(content_id)):
+            await _ingest(content_id)
+    finally:
+        QUEUE_DEPTH.dec("ingest")
+
+
+async def _ingest(content_id: UUID) -> None:
     async with async_session_factory() as session:
         content: Content | None = await session.get(Content, content_id)
         if not content:
             return
 
+        def progress(**fields) -> None:
+            ingest_event(content.space_id, content.id, "processing", **fields)
+
         try:
-            # 1. read bytes
-            data = Path(content.file_path).read_bytes()
+            progress(stage="extracting")
 
-            # 2. write to temp file so extract_text gets a path
-            with tempfile.NamedTemporaryFile(delete=False, suffix=Path(content.file_path).suffix) as tmp:  # keep ext
-                tmp.write(data)
-                tmp_path = tmp.name
+            # 1‑3. get a local path (the file itself, or an S3 object streamed
+            #      to a temp file that is removed afterwards), extract + chunk
+            async with open_upload(content.file_path) as path:
+                chunks = await extract_chunks(path, progress=progress)
 
-            # 3. extract text
-            text = await extract_text(tmp_path)
+            # 4. embed only new/changed chunks, drop removed ones
+            progress(stage="embedding")
+            from app.services.space_router import space_router  # numpy stays out of app startup
 
-            # 4. embed + store
-            await memory_db.upsert(
-                user_id=str(content.owner_id or "anon"),
-                text=text,
+            user_id, space_id = str(content.owner_id or "anon"), str(content.space_id)
+            stats = await memory_db.upsert_chunks(
+                user_id=user_id,
+                chunks=chunks,
                 type_="content",
                 subtype=str(content.id),
+                space_id=space_id,
+                progress=progress,
+                # keeps the space's routing summary current (cross‑space search)
+                on_vectors=space_router.on_vectors(user_id, space_id),
             )
 
             content.status = "processed"
             await session.commit()
+            await space_cache.mark_processed(content.space_id)
+            await publish_ingest_event(content.space_id, content.id, "processed", **stats)
 
         except Exception:  # noqa: BLE001
             content.status = "error"
             await session.commit()
+            await publish_ingest_event(content.space_id, content.id, "error")
             raise
@@ -1,63 +1,302 @@
 """
 app/media_parser.py
 Extract text from PDFs, Office docs, images, and videos for the RAG pipeline.
+
+DOCX and plain text are also read as a stream of structured blocks
+(headings, paragraphs, table rows) – ``word/document.xml`` through lxml
+``iterparse``, text files in ``TXT_READ_CHARS`` pieces – which
+:func:`extract_chunks` packs into chunks as they arrive, so memory does
+not grow with the size of the file.
 """
 from __future__ import annotations
 
+import asyncio
 import os
+import re
+import zipfile
 from pathlib import Path
-from typing import Callable
-
-import pdfplumber
-import pytesseract
-from PIL import Image
-from docx import Document
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
+from app.core.metrics import timed
+from app.core.tracing import span, traced
+from app.services.chunking import (
+    HEADING,
+    MAX_CHUNK_CHARS,
+    PARAGRAPH,
+    SEGMENT,
+    TABLE_ROW,
+    Block,
+    chunk_blocks,
+    chunk_text,
+    segment_cut,
+)
 from app.services.config import caption_image, summarize_video
 
+# progress(**fields) – e.g. progress(pages_parsed=3, pages_total=12)
+ProgressFn = Callable[..., Any]
+
+
 # ─── Sync text extractors ──────────────────────────────────────────────
-def _pdf(path: str) -> str:
+@traced("extract.pdf")
+def _pdf(path: str, progress: Optional[ProgressFn] = None) -> str:
+    import pdfplumber  # parser libraries load on first use, not at app import
+
+    texts = []
     with pdfplumber.open(path) as pdf:
-        return "\n".join(
-            page_text.strip()
-            for page in pdf.pages
-            if (page_text := page.extract_text())
-        )
+        total = len(pdf.pages)
+        for i, page in enumerate(pdf.pages, 1):
+            if page_text := page.extract_text():
+                texts.append(page_text.strip())
+            if progress:
+                progress(pages_parsed=i, pages_total=total)
+    return "\n".join(texts)
+
+
+@traced("extract.docx")
+def _docx(path: str, progress: Optional[ProgressFn] = None) -> str:
+    return "\n\n".join(b.text for b in iter_docx_blocks(path, progress))
+
+
+@traced("extract.txt")
+def _txt(path: str, progress: Optional[ProgressFn] = None) -> str:
+    parts: List[str] = []
+    for b in iter_txt_blocks(path, progress):
+        parts += (b.text, "" if b.kind == SEGMENT and b.level else "\n\n")
+    return "".join(parts[:-1])
+
+
+# ─── Streaming block extractors ────────────────────────────────────────
+TXT_READ_CHARS = 1 << 20
+PROGRESS_BYTES = 1 << 20  # DOCX: report progress about once per MiB of XML
+# a "paragraph" with no blank line for this long is yielded in segments
+TXT_MAX_PARAGRAPH_CHARS = 1 << 16
+_PARA_END = re.compile(r"\n\s*\n")
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_HEADING_NAME = re.compile(r"^heading\s*(\d)$")
+
+
+def iter_txt_blocks(path: str, progress: Optional[ProgressFn] = None) -> Iterator[Block]:
+    """
+    Paragraphs (split on blank lines) of a UTF‑8 text file, read piecewise.
+
+    A paragraph longer than ``TXT_MAX_PARAGRAPH_CHARS`` is yielded as it
+    is read, in ``SEGMENT`` blocks that chunk exactly like the whole
+    paragraph would (see :func:`~app.services.chunking.segment_cut`).
+    """
+    total = os.path.getsize(path)
+    pending = ""
+    segmented = False  # pending continues a paragraph whose head was yielded
+    # text mode: incremental UTF‑8 decoding and universal newlines, as read_text()
+    with open(path, encoding="utf-8", errors="ignore") as fh:
+        while piece := fh.read(TXT_READ_CHARS):
+            pending += piece
+            # the last paragraph may continue in the next piece; only
+            # paragraphs followed by a separator and then text are complete
+            start = 0
+            for m in _PARA_END.finditer(pending):
+                if m.end() == len(pending):
+                    break
+                yield _txt_block(pending[start : m.start()], segmented)
+                segmented, start = False, m.end()
+            pending = pending[start:]
+            if len(pending) > TXT_MAX_PARAGRAPH_CHARS:
+                if not segmented:
+                    pending = pending.lstrip()  # as the whole paragraph's strip()
+                # the last non‑space character stays: what follows it decides
+                # where the paragraph ends, and so what its strip() removes
+                keep = len(pending.rstrip()) - 1
+                # chunk_text keeps a paragraph of at most MAX_CHUNK_CHARS whole
+                while (segmented or keep >= MAX_CHUNK_CHARS) and len(pending) > TXT_MAX_PARAGRAPH_CHARS:
+                    cut = segment_cut(pending, min(TXT_MAX_PARAGRAPH_CHARS, keep))
+                    if not cut:
+                        break
+                    yield Block(SEGMENT, pending[:cut], 1)
+                    segmented, pending, keep = True, pending[cut:], keep - cut
+            if progress:
+                progress(bytes_read=fh.buffer.tell(), bytes_total=total)
+    for para in _PARA_END.split(pending):
+        yield _txt_block(para, segmented)
+        segmented = False
+
+
+def _txt_block(text: str, segmented: bool) -> Block:
+    # a segmented paragraph ends in a last segment, which its strip() trims
+    return Block(SEGMENT, text.rstrip()) if segmented else Block(PARAGRAPH, text)
+
+
+def _docx_styles(zf: zipfile.ZipFile) -> Dict[str, int]:
+    """styleId → heading level for the document's paragraph styles."""
+    from lxml import etree
+
+    try:
+        root = etree.fromstring(zf.read("word/styles.xml"))
+    except KeyError:
+        return {}
+    levels: Dict[str, int] = {}
+    for style in root.iter(f"{_W}style"):
+        style_id = style.get(f"{_W}styleId")
+        name = style.find(f"{_W}name")
+        name = (name.get(f"{_W}val") if name is not None else "").strip().lower()
+        outline = style.find(f"{_W}pPr/{_W}outlineLvl")
+        if outline is not None and outline.get(f"{_W}val", "9").isdigit() and int(outline.get(f"{_W}val")) < 9:
+            levels[style_id] = int(outline.get(f"{_W}val")) + 1
+        elif m := _HEADING_NAME.match(name):
+            levels[style_id] = int(m.group(1))
+        elif name == "title":
+            levels[style_id] = 1
+    return levels
+
 
+def _docx_text(elem) -> str:
+    parts: List[str] = []
+    for node in elem.iter(f"{_W}t", f"{_W}tab", f"{_W}br", f"{_W}cr"):
+        if node.tag == f"{_W}t":
+            parts.append(node.text or "")
+        else:
+            parts.append("\t" if node.tag == f"{_W}tab" else "\n")
+    return "".join(parts)
 
-def _docx(path: str) -> str:
-    doc = Document(path)
-    return "\n".join(p.text for p in doc.paragraphs)
 
+def _docx_heading(p, styles: Dict[str, int]) -> int:
+    ppr = p.find(f"{_W}pPr")
+    if ppr is None:
+        return 0
+    outline = ppr.find(f"{_W}outlineLvl")
+    if outline is not None and outline.get(f"{_W}val", "9").isdigit() and int(outline.get(f"{_W}val")) < 9:
+        return int(outline.get(f"{_W}val")) + 1
+    style = ppr.find(f"{_W}pStyle")
+    return styles.get(style.get(f"{_W}val"), 0) if style is not None else 0
 
-def _txt(path: str) -> str:
-    return Path(path).read_text(encoding="utf-8", errors="ignore")
 
+def _docx_row(tr) -> str:
+    cells = []
+    for tc in tr.iterfind(f"{_W}tc"):
+        paras = (" ".join(_docx_text(p).split()) for p in tc.iter(f"{_W}p"))
+        cells.append(" ".join(t for t in paras if t))
+    return " | ".join(cells)
 
+
+def _discard(elem) -> None:
+    # drop what has been handled so the tree never holds the whole body
+    elem.clear()
+    parent = elem.getparent()
+    while elem.getprevious() is not None:
+        del parent[0]
+
+
+def iter_docx_blocks(path: str, progress: Optional[ProgressFn] = None) -> Iterator[Block]:
+    """Headings, paragraphs and table rows of a .docx, parsed incrementally."""
+    from lxml import etree  # parser libraries load on first use, not at app import
+
+    with zipfile.ZipFile(path) as zf:
+        styles = _docx_styles(zf)
+        total = zf.getinfo("word/document.xml").file_size
+        with zf.open("word/document.xml") as fh:
+            tables = 0  # depth of open <w:tbl>; nested tables belong to their cell
+            row = reported = 0
+            events = etree.iterparse(fh, events=("start", "end"), tag=(f"{_W}p", f"{_W}tbl", f"{_W}tr"))
+            for event, elem in events:
+                tag = elem.tag
+                if tag == f"{_W}tbl":
+                    tables += 1 if event == "start" else -1
+                    if event == "start" and tables == 1:
+                        row = 0
+                    elif event == "end" and not tables:
+                        _discard(elem)
+                    continue
+                if event != "end":
+                    continue
+                if tag == f"{_W}tr" and tables == 1:
+                    text = _docx_row(elem)
+                    if text.strip(" |"):
+                        yield Block(TABLE_ROW, text, row)
+                        row += 1
+                    _discard(elem)
+                elif tag == f"{_W}p" and not tables:
+                    text = _docx_text(elem)
+                    level = _docx_heading(elem, styles)
+                    yield Block(HEADING if level else PARAGRAPH, text, level)
+                    _discard(elem)
+                else:
+                    continue
+                # after top‑level paragraphs and table rows alike, so a
+                # document that is mostly one big table still reports
+                if progress and fh.tell() - reported >= PROGRESS_BYTES:
+                    reported = fh.tell()
+                    progress(bytes_read=reported, bytes_total=total)
+
+
+@traced("extract.ocr")
 def _ocr_fallback(path: str) -> str:
     """Last‑resort OCR using Tesseract if Gemini captioning fails."""
+    import pytesseract
+    from PIL import Image
+
     return pytesseract.image_to_string(Image.open(path))
 
 
 # ─── Extension maps ───────────────────────────────────────────────────
-SYNC_PARSERS: dict[str, Callable[[str], str]] = {
+SYNC_PARSERS: dict[str, Callable[[str, Optional[ProgressFn]], str]] = {
     ".pdf": _pdf,
     ".docx": _docx,
     ".txt": _txt,
 }
 
+BLOCK_PARSERS: dict[str, Callable[[str, Optional[ProgressFn]], Iterator[Block]]] = {
+    ".docx": iter_docx_blocks,
+    ".txt": iter_txt_blocks,
+}
+
 IMAGE_EXT = {".png", ".jpg", ".jpeg", ".bmp", ".gif"}
 VIDEO_EXT = {".mp4", ".mov", ".avi", ".mkv"}
 
 # ─── Main async extractor ----------------------------------------------------
-async def extract_text(path: str) -> str:
+async def extract_text(path: str, progress: Optional[ProgressFn] = None) -> str:
     """
     Return a best‑effort text representation of *path*.
 
     Always returns a string—never raises—so the calling code can
-    persist something even when extraction fails.
+    persist something even when extraction fails.  Sync parsers run in a
+    worker thread; *progress* is always invoked on the event‑loop thread.
+    """
+    ext = Path(path).suffix.lower()
+    with span("extract_text", ext=ext):
+        return await _extract(path, ext, progress)
+
+
+def _thread_progress(progress: Optional[ProgressFn]) -> Optional[ProgressFn]:
+    if not progress:
+        return None
+    loop = asyncio.get_running_loop()
+    return lambda **kw: loop.call_soon_threadsafe(lambda: progress(**kw))  # noqa: E731
+
+
+async def extract_chunks(path: str, progress: Optional[ProgressFn] = None) -> List[str]:
+    """
+    Chunks of *path* for ingest.  DOCX / TXT stream structured blocks
+    straight into :func:`chunk_blocks` in a worker thread; everything else
+    goes through :func:`extract_text` and :func:`chunk_text`.  Like
+    extract_text, never raises.
     """
     ext = Path(path).suffix.lower()
+    parser = BLOCK_PARSERS.get(ext)
+    if parser is None:
+        return chunk_text(await extract_text(path, progress=progress))
+
+    def run(report: Optional[ProgressFn]) -> List[str]:
+        with span(f"extract.{ext[1:]}"):
+            return list(chunk_blocks(parser(path, report)))
+
+    with span("extract_text", ext=ext):
+        try:
+            with timed("extract", ext):
+                return await asyncio.to_thread(run, _thread_progress(progress))
+        except Exception as exc:
+            return [f"[Extraction error: {exc}]"]
+
+
+async def _extract(path: str, ext: str, progress: Optional[ProgressFn]) -> str:
 
     # ----- Video → Gemini summarisation ----------------------------------
     if ext in VIDEO_EXT:
@@ -77,7 +316,8 @@ async def extract_text(path: str) -> str:
     parser = SYNC_PARSERS.get(ext)
     if parser:
         try:
-            return parser(path)
+            with timed("extract", ext):
+                return await asyncio.to_thread(parser, path, _thread_progress(progress))
         except Exception as exc:
             return f"[Extraction error: {exc}]"
 
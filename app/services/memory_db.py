@@ -1,23 +1,97 @@
-import asyncio, datetime
-from typing import List, Tuple
-import chromadb
-from app.services.config import embed_text
+import asyncio, datetime, logging, os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from app.core.metrics import timed
+from app.core.tracing import span
+from app.services.chunking import chunk_hash
+from app.services.config import EMBED_DIM, embed_text, embed_texts
+from app.services.vector_store import VectorStore, create_store
 
+log = logging.getLogger(__name__)
 
-class MemoryDB:
-    def __init__(self, path: str = "db_chroma") -> None:
-        # PersistentClient → embedded DuckDB backend
-        self.client = chromadb.PersistentClient(path=path)
-        self.col = self.client.get_or_create_collection(
-            name="user_memories", metadata={"hnsw:space": "cosine"}
+# how the app lifespan opens the store: off | background | eager
+MEMORY_DB_WARMUP = os.getenv("MEMORY_DB_WARMUP", "background").lower()
+# ids per add/delete request – keeps payloads under the server's batch limit
+VECTOR_WRITE_BATCH = int(os.getenv("VECTOR_WRITE_BATCH", 1000))
+
+
+class Retrieval(NamedTuple):
+    """One query's hits, best first, as parallel lists."""
+
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Dict]
+    scores: List[float]  # cosine similarity to the query (1 − distance)
+    embeddings: Optional[Sequence[Sequence[float]]] = None  # only when asked for
+
+    @classmethod
+    def from_query(cls, res: Dict, i: int = 0) -> "Retrieval":
+        """The *i*‑th query of a store ``query`` result."""
+        def col(key: str) -> List:
+            v = res.get(key)
+            return list(v[i]) if v is not None and len(v) > i and v[i] is not None else []
+
+        ids = col("ids")
+        embs = res.get("embeddings")
+        return cls(
+            ids=ids,
+            documents=col("documents"),
+            metadatas=col("metadatas") or [{}] * len(ids),
+            scores=[1.0 - float(d) for d in col("distances")],
+            # as the store returns them – embedded Chroma gives one ndarray per query
+            embeddings=embs[i] if embs is not None and len(embs) > i else None,
         )
 
+
+class MemoryDB:
+    def __init__(self, store: VectorStore | None = None) -> None:
+        # backend chosen by VECTOR_STORE; opening it is deferred to first use
+        self.store = store or create_store()
+        self._warmup: asyncio.Task | None = None
+
+    # ── lifespan ────────────────────────────────────────────────────
+    async def _warm(self) -> None:
+        if await self.store.call("count"):
+            # the HNSW segment is loaded by the first query, not by opening
+            await self.store.call(
+                "query", query_embeddings=[[1.0] + [0.0] * (EMBED_DIM - 1)], n_results=1, include=[]
+            )
+
+    async def _warm_logged(self) -> None:
+        try:
+            with timed(f"{self.store.name}_warmup"):
+                await self._warm()
+        except Exception:  # noqa: BLE001 – first real call retries the open
+            log.warning("memory db warmup failed", exc_info=True)
+
+    async def start(self, warmup: str = MEMORY_DB_WARMUP) -> None:
+        """Open (and pre‑load) the store: inline for ``eager``, as a task for ``background``."""
+        if warmup == "eager":
+            await self._warm_logged()
+        elif warmup == "background":
+            self._warmup = asyncio.create_task(self._warm_logged())
+
+    async def stop(self) -> None:
+        if self._warmup:
+            await self._warmup  # a running to_thread can't be cancelled
+            self._warmup = None
+        await self.close()
+
+    async def close(self) -> None:
+        """Drop connections bound to this event loop (Celery tasks call it per run)."""
+        await self.store.close()
+
     # ── internal helper ─────────────────────────────────────────────
     @staticmethod
     def _doc_id(user_id: str, type_: str, subtype: str) -> str:
         """Return deterministic ID so re‑inserts overwrite."""
         return f"{user_id}:{type_}:{subtype}"
 
+    async def _call(self, op: str, **kwargs: Any) -> Any:
+        """One vector store call, timed as ``<store>_<op>`` (e.g. ``chroma_query``)."""
+        name = self.store.name
+        with span(f"{name}.{op}"), timed(f"{name}_{op}"):
+            return await self.store.call(op, **kwargs)
+
     # ── public API ──────────────────────────────────────────────────
     async def upsert(
         self,
@@ -28,6 +102,7 @@ class MemoryDB:
         subtype: str,
         visibility: str = "owner",
         score_boost: float = 1.0,
+        space_id: str | None = None,
     ) -> None:
         """Store or update a memory chunk with its embedding."""
         emb = await embed_text(text)
@@ -40,16 +115,143 @@ class MemoryDB:
             "ts": datetime.datetime.utcnow().isoformat(),
             "score_boost": score_boost,
         }
+        if space_id:
+            # lets a whole space be dropped with one metadata‑filtered delete
+            meta["space_id"] = space_id
         # Replace any previous entry with same logical ID
-        await asyncio.to_thread(self.col.delete, ids=[doc_id])
-        await asyncio.to_thread(
-            self.col.add,
+        await self._call("delete", ids=[doc_id])
+        await self._call(
+            "add",
             ids=[doc_id],
             embeddings=[emb],
             documents=[text],
             metadatas=[meta],
         )
 
+    async def upsert_chunks(
+        self,
+        *,
+        user_id: str,
+        chunks: List[str],
+        type_: str,
+        subtype: str,
+        visibility: str = "owner",
+        score_boost: float = 1.0,
+        space_id: str | None = None,
+        progress: Optional[Callable[..., Any]] = None,
+        on_vectors: Optional[Callable[[List[List[float]], List[List[float]]], Awaitable[None]]] = None,
+    ) -> Dict[str, int]:
+        """
+        Incrementally sync the chunk set stored for one document.
+
+        Chunk ids are ``<doc_id>:<content hash>``, so re‑ingesting an edited
+        document only embeds chunks whose text is new; chunks that vanished
+        are deleted in one call and unchanged vectors are left untouched.
+        Returns ``{"added", "removed", "kept"}`` counts; *progress* receives
+        ``chunks_embedded`` / ``chunks_total`` as embedding batches finish;
+        *on_vectors* is awaited with the ``(added, removed)`` embeddings
+        (used to keep the space routing summary current).
+        """
+        doc_id = self._doc_id(user_id, type_, subtype)
+        wanted: Dict[str, str] = {}
+        for chunk in chunks:
+            wanted.setdefault(f"{doc_id}:{chunk_hash(chunk)}", chunk)
+
+        stored = await self._call(
+            "get",
+            where={"$and": [{"type": type_}, {"subtype": subtype}]},
+            include=[],
+        )
+        stored_ids = set(stored.get("ids") or [])
+
+        new_ids = [i for i in wanted if i not in stored_ids]
+        stale_ids = [i for i in stored_ids if i not in wanted]  # incl. legacy whole‑doc entry
+
+        embs: List[List[float]] = []
+        if new_ids:
+            texts = [wanted[i] for i in new_ids]
+            done = 0
+
+            def _on_batch(n: int) -> None:
+                nonlocal done
+                done += n
+                if progress:
+                    progress(chunks_embedded=done, chunks_total=len(new_ids))
+
+            embs = await embed_texts(texts, on_batch=_on_batch)
+            ts = datetime.datetime.utcnow().isoformat()
+            meta = {
+                "user_id": user_id,
+                "type": type_,
+                "subtype": subtype,
+                "visibility": visibility,
+                "ts": ts,
+                "score_boost": score_boost,
+            }
+            if space_id:
+                meta["space_id"] = space_id
+            metas = [{**meta, "chunk_hash": i.rsplit(":", 1)[1]} for i in new_ids]
+            for i in range(0, len(new_ids), VECTOR_WRITE_BATCH):
+                batch = slice(i, i + VECTOR_WRITE_BATCH)
+                await self._call(
+                    "add",
+                    ids=new_ids[batch],
+                    embeddings=embs[batch],
+                    documents=texts[batch],
+                    metadatas=metas[batch],
+                )
+        removed: List[List[float]] = []
+        if on_vectors and stale_ids:
+            for i in range(0, len(stale_ids), VECTOR_WRITE_BATCH):
+                got = await self._call("get", ids=stale_ids[i : i + VECTOR_WRITE_BATCH], include=["embeddings"])
+                removed.extend(list(e) for e in got.get("embeddings") or [])
+        # delete after adding so the document never disappears from retrieval
+        await self.delete_ids(stale_ids)
+        if on_vectors and (embs or removed):
+            await on_vectors(embs, removed)
+        return {
+            "added": len(new_ids),
+            "removed": len(stale_ids),
+            "kept": len(wanted) - len(new_ids),
+        }
+
+    @staticmethod
+    def _visible(user_id: str, allowed: Tuple[str, ...]) -> Dict:
+        return {"$and": [{"user_id": user_id}, {"visibility": {"$in": list(allowed)}}]}
+
+    async def search(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 5,
+        allowed: Tuple[str, ...] = ("owner", "public"),
+        embeddings: bool = False,
+    ) -> Retrieval:
+        """Up to *k* hits for *query*: ids, documents, metadata, scores (and vectors)."""
+        return (await self.search_many(user_id, [query], k, allowed, embeddings))[0]
+
+    async def search_many(
+        self,
+        user_id: str,
+        queries: List[str],
+        k: int = 5,
+        allowed: Tuple[str, ...] = ("owner", "public"),
+        embeddings: bool = False,
+    ) -> List[Retrieval]:
+        """:meth:`search` for many queries: one batched embed, one multi‑query search."""
+        if not queries:
+            return []
+        embs = await embed_texts(queries) if len(queries) > 1 else [await embed_text(queries[0])]
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if embeddings else [])
+        res = await self._call(
+            "query",
+            query_embeddings=embs,
+            n_results=k,
+            where=self._visible(user_id, allowed),
+            include=include,
+        )
+        return [Retrieval.from_query(res, i) for i in range(len(queries))]
+
     async def retrieve(
         self,
         user_id: str,
@@ -58,21 +260,46 @@ class MemoryDB:
         allowed: Tuple[str, ...] = ("owner", "public"),
     ) -> List[str]:
         """Return up to *k* memory snippets relevant to *query*."""
-        emb = await embed_text(query)
-        res = await asyncio.to_thread(
-            self.col.query,
-            query_embeddings=[emb],
-            n_results=k,
-            where={
-                "$and": [
-                    {"user_id": user_id},
-                    {"visibility": {"$in": list(allowed)}},
-                ]
-            },
-        )
-        docs = res.get("documents")
-        return docs[0] if docs else []
+        return (await self.search(user_id, query, k, allowed)).documents
+
+    async def retrieve_many(
+        self,
+        user_id: str,
+        queries: List[str],
+        k: int = 5,
+        allowed: Tuple[str, ...] = ("owner", "public"),
+    ) -> List[List[str]]:
+        """:meth:`retrieve` for many queries."""
+        return [r.documents for r in await self.search_many(user_id, queries, k, allowed)]
+
+    # ── bulk maintenance ────────────────────────────────────────────
+    async def delete_where(self, where: Dict) -> None:
+        """Delete every entry matching a metadata filter in one call."""
+        await self._call("delete", where=where)
+
+    async def delete_ids(self, ids: List[str]) -> None:
+        for i in range(0, len(ids), VECTOR_WRITE_BATCH):
+            await self._call("delete", ids=ids[i : i + VECTOR_WRITE_BATCH])
+
+    async def iter_metadatas(
+        self, where: Dict | None = None, page_size: int = 5000
+    ) -> AsyncIterator[Tuple[List[str], List[Dict]]]:
+        """Page through ``(ids, metadatas)`` without loading documents/vectors."""
+        offset = 0
+        while True:
+            page = await self._call(
+                "get",
+                where=where,
+                include=["metadatas"],
+                limit=page_size,
+                offset=offset,
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                return
+            yield ids, page.get("metadatas") or []
+            offset += len(ids)
 
 
-# Singleton instance used across the app
+# Singleton instance used across the app (cheap: the store opens lazily)
 memory_db = MemoryDB()
\ No newline at end of file
@@ -0,0 +1,354 @@
+"""
+app/services/pgvector_store.py
+pgvector backend for MemoryDB (``VECTOR_STORE=pgvector``).
+
+Vectors live in ``memory_chunks`` next to ``spaces`` / ``contents`` in the
+same Postgres, reached through the app's asyncpg engine:
+
+* ``content_id`` references ``contents(id) ON DELETE CASCADE`` – deleting
+  Content rows drops their vectors in the same transaction, so the
+  cascading space delete needs no separate vector round trip and cannot
+  leave orphans behind
+* ``space_id`` / ``user_id`` / ``type`` / ``subtype`` / ``visibility`` are
+  real columns, so Chroma‑style ``where`` filters become indexed SQL
+  predicates; ``content.<col>`` keys (e.g. ``content.owner_id``) filter
+  through a join on ``contents``
+* ANN index: HNSW (default) or IVFFlat on cosine distance, picked by
+  ``PGVECTOR_INDEX``; ``PGVECTOR_EF_SEARCH`` / ``PGVECTOR_PROBES`` trade
+  recall for latency per query.  Filtered queries use iterative index
+  scans on pgvector ≥ 0.8; older versions filter only the index's
+  candidates, so when that leaves fewer than ``n_results`` the filtered
+  rows are ranked exactly instead (a selective filter, e.g. one space)
+* bulk adds are streamed with ``COPY`` into a temp staging table and
+  merged with ``INSERT … ON CONFLICT DO NOTHING`` (Chroma's add semantics)
+
+The table is created on first use (idempotent DDL under an advisory lock),
+like Chroma's ``get_or_create_collection`` – it only exists when this
+backend is selected, so it stays out of the core migrations.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import orjson
+from sqlalchemy import text
+
+from app.services.config import EMBED_DIM
+from app.services.vector_store import VectorStore
+
+TABLE = "memory_chunks"
+PGVECTOR_INDEX = os.getenv("PGVECTOR_INDEX", "hnsw").lower()          # hnsw | ivfflat
+PGVECTOR_HNSW_M = int(os.getenv("PGVECTOR_HNSW_M", 16))
+PGVECTOR_HNSW_EF_CONSTRUCTION = int(os.getenv("PGVECTOR_HNSW_EF_CONSTRUCTION", 64))
+PGVECTOR_EF_SEARCH = int(os.getenv("PGVECTOR_EF_SEARCH", 64))
+PGVECTOR_IVF_LISTS = int(os.getenv("PGVECTOR_IVF_LISTS", 1000))       # ≈ rows / 1000 up to 1M rows
+PGVECTOR_PROBES = int(os.getenv("PGVECTOR_PROBES", 10))
+PGVECTOR_COPY_MIN = int(os.getenv("PGVECTOR_COPY_MIN", 64))           # smaller adds use INSERT
+
+_LOCK_KEY = 0x5A4CE6  # pg advisory lock id for the DDL below
+_COLUMNS = ("user_id", "type", "subtype", "visibility")
+_CONTENT_COLUMNS = {"owner_id", "space_id", "status", "mime_type"}
+_NOT_NULL = ["id", "user_id", "type", "subtype", "visibility", "metadata", "document", "embedding"]
+_KEY_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS vector",
+    f"""CREATE TABLE IF NOT EXISTS {TABLE} (
+        id          TEXT PRIMARY KEY,
+        content_id  UUID REFERENCES contents(id) ON DELETE CASCADE,
+        space_id    UUID,
+        user_id     TEXT NOT NULL,
+        type        TEXT NOT NULL,
+        subtype     TEXT NOT NULL,
+        visibility  TEXT NOT NULL,
+        metadata    JSONB NOT NULL,
+        document    TEXT NOT NULL,
+        embedding   VECTOR({EMBED_DIM}) NOT NULL
+    )""",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_doc ON {TABLE} (type, subtype)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_user ON {TABLE} (user_id, visibility)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_space ON {TABLE} (space_id)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_content ON {TABLE} (content_id)",
+)
+_ANN_DDL = {
+    "hnsw": f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_embedding ON {TABLE} USING hnsw "
+            f"(embedding vector_cosine_ops) WITH (m = {PGVECTOR_HNSW_M}, "
+            f"ef_construction = {PGVECTOR_HNSW_EF_CONSTRUCTION})",
+    "ivfflat": f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_embedding ON {TABLE} USING ivfflat "
+               f"(embedding vector_cosine_ops) WITH (lists = {PGVECTOR_IVF_LISTS})",
+}
+
+
+def _vector_literal(values) -> str:
+    return "[" + ",".join(repr(float(v)) for v in values) + "]"
+
+
+def _uuid_or_none(value: Any) -> Optional[str]:
+    try:
+        return str(UUID(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+# ─── Chroma ``where`` → SQL ────────────────────────────────────────────
+class _Where:
+    """Compile a Chroma metadata filter into a SQL predicate + bind params."""
+
+    def __init__(self) -> None:
+        self.params: Dict[str, Any] = {}
+        self.joins_content = False
+
+    def _bind(self, value: Any) -> str:
+        name = f"w{len(self.params)}"
+        self.params[name] = value
+        return f":{name}"
+
+    def _column(self, key: str) -> Tuple[str, bool]:
+        """SQL expression for *key* and whether it is a UUID column."""
+        if key in _COLUMNS:
+            return f"m.{key}", False
+        if key == "space_id":
+            return "m.space_id", True
+        if key.startswith("content.") and key[8:] in _CONTENT_COLUMNS:
+            self.joins_content = True
+            col = key[8:]
+            return f"c.{col}", col in ("owner_id", "space_id")
+        if not _KEY_RE.match(key):
+            raise ValueError(f"invalid metadata key {key!r}")
+        return f"(m.metadata->>'{key}')", False
+
+    def _value(self, value: Any, is_uuid: bool) -> str:
+        if is_uuid:
+            return f"CAST({self._bind(str(value))} AS uuid)"
+        return self._bind(value if isinstance(value, str) else str(value))
+
+    def compile(self, where: Optional[Dict]) -> str:
+        if not where:
+            return "TRUE"
+        parts = []
+        for key, cond in where.items():
+            if key in ("$and", "$or"):
+                joiner = " AND " if key == "$and" else " OR "
+                parts.append("(" + joiner.join(self.compile(c) for c in cond) + ")")
+                continue
+            col, is_uuid = self._column(key)
+            op, value = next(iter(cond.items())) if isinstance(cond, dict) else ("$eq", cond)
+            if op in ("$in", "$nin"):
+                if not value:
+                    parts.append("FALSE" if op == "$in" else "TRUE")
+                    continue
+                items = ", ".join(self._value(v, is_uuid) for v in value)
+                parts.append(f"{col} {'IN' if op == '$in' else 'NOT IN'} ({items})")
+            elif op in ("$eq", "$ne"):
+                parts.append(f"{col} {'=' if op == '$eq' else '<>'} {self._value(value, is_uuid)}")
+            else:
+                raise ValueError(f"unsupported where operator {op!r}")
+        return " AND ".join(parts)
+
+
+# ─── Store ─────────────────────────────────────────────────────────────
+class PgVectorStore(VectorStore):
+    name = "pgvector"
+
+    def __init__(self, index: str = PGVECTOR_INDEX) -> None:
+        if index not in _ANN_DDL:
+            raise RuntimeError(f"Unknown PGVECTOR_INDEX {index!r}")
+        self.index = index
+        self._ready = False
+        self._iterative_scan = False
+        self._open_lock: asyncio.Lock | None = None
+
+    @staticmethod
+    def _engine():
+        from app.core.database import engine  # the app's pooled asyncpg engine
+
+        return engine
+
+    async def _ensure_schema(self) -> None:
+        if self._ready:
+            return
+        # a lock per loop is enough: a duplicate open only re‑runs idempotent DDL
+        self._open_lock = self._open_lock or asyncio.Lock()
+        async with self._open_lock:
+            if self._ready:
+                return
+            async with self._engine().begin() as conn:
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _LOCK_KEY})
+                for stmt in (*_DDL, _ANN_DDL[self.index]):
+                    await conn.execute(text(stmt))
+                version = (
+                    await conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+                ).scalar()
+            # pgvector ≥ 0.8 keeps scanning the index until enough rows pass the filter
+            self._iterative_scan = tuple(int(p) for p in version.split(".")[:2]) >= (0, 8)
+            self._ready = True
+
+    async def call(self, op: str, **kwargs: Any) -> Any:
+        await self._ensure_schema()
+        handler = getattr(self, f"_{op}", None)
+        if handler is None:
+            raise ValueError(f"unsupported vector store op {op!r}")
+        return await handler(**kwargs)
+
+    # ── writes ──────────────────────────────────────────────────────
+    @staticmethod
+    def _rows(ids, embeddings, documents, metadatas) -> List[Tuple]:
+        rows = []
+        for id_, emb, doc, meta in zip(ids, embeddings, documents, metadatas):
+            content_id = _uuid_or_none(meta.get("subtype")) if meta.get("type") == "content" else None
+            rows.append((
+                id_,
+                content_id,
+                _uuid_or_none(meta.get("space_id")),
+                str(meta.get("user_id", "")),
+                str(meta.get("type", "")),
+                str(meta.get("subtype", "")),
+                str(meta.get("visibility", "owner")),
+                orjson.dumps(meta).decode(),
+                doc,
+                _vector_literal(emb),
+            ))
+        return rows
+
+    async def _add(self, ids, embeddings, documents, metadatas) -> None:
+        rows = self._rows(ids, embeddings, documents, metadatas)
+        async with self._engine().begin() as conn:
+            if len(rows) < PGVECTOR_COPY_MIN:
+                await conn.execute(
+                    text(
+                        f"INSERT INTO {TABLE} (id, content_id, space_id, user_id, type, subtype, visibility,"
+                        " metadata, document, embedding) VALUES (:id, CAST(:content_id AS uuid),"
+                        " CAST(:space_id AS uuid), :user_id, :type, :subtype, :visibility,"
+                        " CAST(CAST(:metadata AS text) AS jsonb), :document,"
+                        " CAST(CAST(:embedding AS text) AS vector))"
+                        " ON CONFLICT (id) DO NOTHING"
+                    ),
+                    [dict(zip(("id", "content_id", "space_id", "user_id", "type", "subtype", "visibility",
+                                "metadata", "document", "embedding"), r)) for r in rows],
+                )
+                return
+            await self._copy(conn, rows)
+
+    @staticmethod
+    async def _copy(conn, rows: List[Tuple]) -> None:
+        """COPY *rows* (CSV) into a staging table, then merge with ON CONFLICT."""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for r in rows:
+            writer.writerow(["\\N" if v is None else v for v in r])
+        data = buf.getvalue().encode()
+
+        await conn.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {TABLE}_stage "
+            f"(LIKE {TABLE} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        ))
+        raw = (await conn.get_raw_connection()).driver_connection  # asyncpg.Connection
+        await raw.copy_to_table(
+            f"{TABLE}_stage", source=io.BytesIO(data), format="csv", null="\\N",
+            force_not_null=_NOT_NULL,  # a document that is literally \N stays text
+        )
+        await conn.execute(text(
+            f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_stage ON CONFLICT (id) DO NOTHING"
+        ))
+
+    async def _delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None) -> None:
+        w = _Where()
+        pred = w.compile(where)
+        if ids is not None:
+            pred += f" AND m.id = ANY({w._bind(list(ids))})"
+        using = " USING contents c" if w.joins_content else ""
+        join = " AND c.id = m.content_id" if w.joins_content else ""
+        async with self._engine().begin() as conn:
+            await conn.execute(text(f"DELETE FROM {TABLE} m{using} WHERE {pred}{join}"), w.params)
+
+    # ── reads ───────────────────────────────────────────────────────
+    @staticmethod
+    def _from(w: _Where) -> str:
+        return f"{TABLE} m JOIN contents c ON c.id = m.content_id" if w.joins_content else f"{TABLE} m"
+
+    @staticmethod
+    def _meta(value: Any) -> Dict:
+        return value if isinstance(value, dict) else orjson.loads(value)
+
+    async def _count(self) -> int:
+        async with self._engine().connect() as conn:
+            return (await conn.execute(text(f"SELECT count(*) FROM {TABLE}"))).scalar()
+
+    async def _get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+        include: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        include = ["metadatas", "documents"] if include is None else include
+        w = _Where()
+        pred = w.compile(where)
+        if ids is not None:
+            pred += f" AND m.id = ANY({w._bind(list(ids))})"
+        emb = ", CAST(m.embedding AS text) AS embedding" if "embeddings" in include else ""
+        sql = f"SELECT m.id, m.metadata, m.document{emb} FROM {self._from(w)} WHERE {pred} ORDER BY m.id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        if offset:
+            sql += f" OFFSET {int(offset)}"
+        async with self._engine().connect() as conn:
+            rows = (await conn.execute(text(sql), w.params)).all()
+        return {
+            "ids": [r.id for r in rows],
+            "metadatas": [self._meta(r.metadata) for r in rows] if "metadatas" in include else None,
+            "documents": [r.document for r in rows] if "documents" in include else None,
+            # vector's text form "[1,2,…]" is valid JSON
+            "embeddings": [orjson.loads(r.embedding) for r in rows] if emb else None,
+        }
+
+    async def _query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        include = ["metadatas", "documents", "distances"] if include is None else include
+        w = _Where()
+        pred = w.compile(where)
+        emb = ", CAST(m.embedding AS text) AS embedding" if "embeddings" in include else ""
+        select = f"SELECT m.id, m.metadata, m.document{emb}, m.embedding <=> CAST(CAST(:q AS text) AS vector) AS distance "
+        sql = text(
+            f"{select}FROM {self._from(w)} WHERE {pred} "
+            f"ORDER BY m.embedding <=> CAST(CAST(:q AS text) AS vector) LIMIT {int(n_results)}"
+        )
+        # MATERIALIZED keeps the planner on the filter's btree index, not the ANN one
+        exact = text(
+            f"WITH m AS MATERIALIZED (SELECT m.* FROM {self._from(w)} WHERE {pred}) "
+            f"{select}FROM m ORDER BY distance LIMIT {int(n_results)}"
+        )
+        out: Dict[str, List] = {"ids": [], "metadatas": [], "documents": [], "distances": [], "embeddings": []}
+        async with self._engine().begin() as conn:
+            if self.index == "hnsw":
+                await conn.execute(text(f"SET LOCAL hnsw.ef_search = {PGVECTOR_EF_SEARCH}"))
+                if self._iterative_scan and where:
+                    await conn.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            else:
+                await conn.execute(text(f"SET LOCAL ivfflat.probes = {PGVECTOR_PROBES}"))
+                if self._iterative_scan and where:
+                    await conn.execute(text("SET LOCAL ivfflat.iterative_scan = relaxed_order"))
+            for q in query_embeddings:
+                params = {**w.params, "q": _vector_literal(q)}
+                rows = (await conn.execute(sql, params)).all()
+                if where and not self._iterative_scan and len(rows) < n_results:
+                    rows = (await conn.execute(exact, params)).all()
+                out["ids"].append([r.id for r in rows])
+                out["metadatas"].append([self._meta(r.metadata) for r in rows])
+                out["documents"].append([r.document for r in rows])
+                out["distances"].append([float(r.distance) for r in rows])
+                if emb:
+                    out["embeddings"].append([orjson.loads(r.embedding) for r in rows])
+        return {k: (v if k == "ids" or k in include else None) for k, v in out.items()}
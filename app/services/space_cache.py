@@ -0,0 +1,151 @@
+"""
+app/services/space_cache.py
+Per‑process cache of space existence / owner / "has processed content".
+
+Chat and upload used to spend two remote round trips per request just to
+validate the space.  Entries here are filled by a single query on miss
+and kept current by the write paths (create/update/delete space, ingest).
+
+With ``SPACE_CACHE_REDIS_URL`` set, every local change is also published
+on a Redis channel and other workers drop their copy, so a space deleted
+in one worker is not served by another.  Without Redis, entries expire
+after ``SPACE_CACHE_TTL`` seconds, which bounds cross‑worker staleness.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+
+from cachetools import TTLCache
+from sqlalchemy import exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import CACHE
+from app.models.content import Content
+from app.models.space import Space
+
+log = logging.getLogger(__name__)
+
+SPACE_CACHE_TTL = float(os.getenv("SPACE_CACHE_TTL", 60))
+SPACE_CACHE_SIZE = int(os.getenv("SPACE_CACHE_SIZE", 10_000))
+SPACE_CACHE_REDIS_URL: str | None = os.getenv("SPACE_CACHE_REDIS_URL")
+CHANNEL = "spaces:cache:invalidate"
+
+
+@dataclass(frozen=True, slots=True)
+class SpaceMeta:
+    exists: bool
+    owner_id: Optional[UUID] = None
+    has_processed: bool = False
+
+
+MISSING = SpaceMeta(exists=False)
+
+
+class SpaceCache:
+    def __init__(self, maxsize: int = SPACE_CACHE_SIZE, ttl: float = SPACE_CACHE_TTL) -> None:
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._origin = uuid.uuid4().hex  # ignore our own pub/sub echoes
+        self._redis = None
+        self._redis_loop: asyncio.AbstractEventLoop | None = None
+        self._listener: asyncio.Task | None = None
+
+    # ── reads ───────────────────────────────────────────────────────
+    def get(self, space_id: UUID) -> SpaceMeta | None:
+        return self._entries.get(space_id)
+
+    async def lookup(self, session: AsyncSession, space_id: UUID) -> SpaceMeta:
+        """Cached metadata for *space_id*; one DB query on a miss."""
+        meta = self._entries.get(space_id)
+        if meta is not None:
+            CACHE.inc("space", "hit")
+            return meta
+
+        CACHE.inc("space", "miss")
+        has_processed = exists().where(
+            Content.space_id == Space.id, Content.status == "processed"
+        )
+        stmt = select(Space.owner_id, has_processed).where(Space.id == space_id)
+        row = (await session.execute(stmt)).first()
+        meta = SpaceMeta(True, row[0], bool(row[1])) if row else MISSING
+        self._entries[space_id] = meta
+        return meta
+
+    # ── writes (called by the routes / ingest that change the state) ─
+    async def put(self, space_id: UUID, meta: SpaceMeta) -> None:
+        self._entries[space_id] = meta
+        await self._publish(space_id)
+
+    async def invalidate(self, space_id: UUID) -> None:
+        self._entries.pop(space_id, None)
+        await self._publish(space_id)
+
+    async def mark_processed(self, space_id: UUID) -> None:
+        meta = self._entries.get(space_id)
+        if meta is not None and meta.exists and not meta.has_processed:
+            self._entries[space_id] = SpaceMeta(True, meta.owner_id, True)
+        await self._publish(space_id)
+
+    # ── cross‑worker invalidation ───────────────────────────────────
+    async def start(self) -> None:
+        """Subscribe to peer invalidations (no‑op without SPACE_CACHE_REDIS_URL)."""
+        if self._client() is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis:
+            await self._redis.aclose()
+            self._redis = None
+
+    def _client(self):
+        # created lazily so the Celery worker can publish without start();
+        # re‑created when a task runs under a fresh asyncio.run() loop
+        if not SPACE_CACHE_REDIS_URL:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            import redis.asyncio as aioredis  # optional dependency path
+
+            self._redis = aioredis.from_url(SPACE_CACHE_REDIS_URL)
+            self._redis_loop = loop
+        return self._redis
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                # anything published while we were disconnected is lost
+                self._entries.clear()
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    origin, _, space_id = msg["data"].decode().partition(":")
+                    if origin != self._origin:
+                        self._entries.pop(UUID(space_id), None)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                log.warning("space cache subscriber dropped; retrying", exc_info=True)
+                await asyncio.sleep(1.0)
+
+    async def _publish(self, space_id: UUID) -> None:
+        client = self._client()
+        if client is None:
+            return
+        try:
+            await client.publish(CHANNEL, f"{self._origin}:{space_id}")
+        except Exception:  # noqa: BLE001 – TTL still bounds staleness
+            log.warning("space cache invalidation publish failed", exc_info=True)
+
+
+# Singleton instance used across the app
+space_cache = SpaceCache()
@@ -0,0 +1,248 @@
+"""
+app/services/space_deletion.py
+Cascading space deletion (rows → vectors → files) and the orphan sweeper.
+
+Deleting a space with 100k+ chunks must not hold a lock for minutes, so
+Content rows go in batches of ``DELETE_BATCH_SIZE``, each in its own
+short transaction.  Vectors for each batch are dropped with one
+metadata‑filtered Chroma call and the batch's files are deleted from
+storage in a background task while the next batch proceeds.  The Space
+row goes last.
+
+Progress lives in the ``space_deletions`` table, so every worker
+answers ``GET /spaces/space/{id}/deletion`` the same way and a running
+job is claimed by exactly one of them.  The space is hidden from chat /
+upload while its delete runs, and stays hidden only once it succeeded.
+
+:func:`sweep_orphans`, run periodically by Celery, resumes cascades that
+failed or whose worker died (``running`` with no progress for
+``DELETION_STALE_SECONDS``), then reclaims anything left behind
+(vectors or files whose Content row is gone).  Files are listed on every
+backend that may hold uploads – the active one, the local upload
+directory left by a switch to S3, and ``STORAGE_SWEEP_BACKENDS``.  Local
+files are only seen by a sweep on the host where ``UPLOAD_DIR`` lives.
+
+Usage:
+    python -m app.services.space_deletion sweep
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import PurePosixPath
+from typing import Dict, List, Set
+from uuid import UUID
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import async_session_factory
+from app.core.storage import delete_uploads, sweep_storages
+from app.models.content import Content
+from app.models.space import Space
+from app.models.space_deletion import SpaceDeletion
+from app.services.memory_db import memory_db
+from app.services.space_cache import MISSING, space_cache
+
+log = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", 1000))
+# uploads are written to disk before their Content row is committed
+ORPHAN_FILE_GRACE_SECONDS = int(os.getenv("ORPHAN_FILE_GRACE_SECONDS", 3600))
+# a running job with no progress for this long has lost its worker
+DELETION_STALE_SECONDS = int(os.getenv("DELETION_STALE_SECONDS", 900))
+# finished jobs stay readable this long, then the sweeper drops them
+DELETION_RETENTION_SECONDS = int(os.getenv("DELETION_RETENTION_SECONDS", 7 * 86400))
+
+
+# ─── Progress tracking ─────────────────────────────────────────────────
+def _advance(space_id: UUID, **counts: int):
+    """UPDATE adding *counts* to the job's counters and touching its heartbeat."""
+    return (
+        update(SpaceDeletion)
+        .where(SpaceDeletion.space_id == space_id)
+        .values(updated_at=datetime.utcnow(), **{k: getattr(SpaceDeletion, k) + n for k, n in counts.items()})
+    )
+
+
+async def _record(stmt) -> None:
+    async with async_session_factory() as session:
+        await session.execute(stmt)
+        await session.commit()
+
+
+async def get_progress(space_id: UUID) -> SpaceDeletion | None:
+    async with async_session_factory() as session:
+        return await session.get(SpaceDeletion, space_id)
+
+
+async def start_deletion(space_id: UUID) -> tuple[SpaceDeletion, bool]:
+    """Claim the job; returns ``(progress, created)`` – False if another worker runs it."""
+    now = datetime.utcnow()
+    async with async_session_factory() as session:
+        # a failed or abandoned job is resumed in place, counters kept …
+        claimed = await session.execute(
+            update(SpaceDeletion)
+            .where(
+                SpaceDeletion.space_id == space_id,
+                or_(
+                    SpaceDeletion.state != "running",
+                    SpaceDeletion.updated_at < now - timedelta(seconds=DELETION_STALE_SECONDS),
+                ),
+            )
+            .values(state="running", error=None, updated_at=now, finished_at=None)
+        )
+        if not claimed.rowcount:
+            # … otherwise the primary key lets exactly one worker create it
+            session.add(SpaceDeletion(space_id=space_id, started_at=now, updated_at=now))
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                return await session.get(SpaceDeletion, space_id), False
+        else:
+            await session.commit()
+        return await session.get(SpaceDeletion, space_id, populate_existing=True), True
+
+
+# ─── Cascade ───────────────────────────────────────────────────────────
+async def delete_space_cascade(space_id: UUID) -> None:
+    """Background job body, after :func:`start_deletion` claimed the job."""
+    unlinks: List[asyncio.Task] = []
+    try:
+        while True:
+            async with async_session_factory() as session:
+                rows = (
+                    await session.execute(
+                        select(Content.id, Content.file_path)
+                        .where(Content.space_id == space_id)
+                        .limit(DELETE_BATCH_SIZE)
+                    )
+                ).all()
+                if not rows:
+                    break
+                ids = [r.id for r in rows]
+                await session.execute(delete(Content).where(Content.id.in_(ids)))
+                await session.execute(_advance(space_id, contents_deleted=len(ids)))
+                await session.commit()
+
+            # vectors written before space_id was in the metadata are keyed by content id
+            await memory_db.delete_where({"subtype": {"$in": [str(i) for i in ids]}})
+            await _record(_advance(space_id, vector_batches=1))
+
+            unlinks.append(asyncio.create_task(delete_uploads([r.file_path for r in rows])))
+
+        await memory_db.delete_where({"space_id": str(space_id)})
+        async with async_session_factory() as session:
+            await session.execute(delete(Space).where(Space.id == space_id))
+            await session.commit()
+
+        files = sum(await asyncio.gather(*unlinks))
+        await _record(_advance(space_id, files_unlinked=files).values(state="done", finished_at=datetime.utcnow()))
+        await space_cache.put(space_id, MISSING)
+    except Exception as exc:  # noqa: BLE001 – the sweeper resumes the job
+        log.exception("cascading delete of space %s failed", space_id)
+        now = datetime.utcnow()
+        try:
+            await _record(
+                update(SpaceDeletion)
+                .where(SpaceDeletion.space_id == space_id)
+                .values(state="error", error=str(exc)[:1000], updated_at=now, finished_at=now)
+            )
+        except Exception:  # noqa: BLE001 – left "running", it goes stale and is resumed
+            log.warning("could not record failed delete of space %s", space_id, exc_info=True)
+        # the Space row may still exist: let the next lookup read the DB
+        await space_cache.invalidate(space_id)
+
+
+async def resume_deletions() -> int:
+    """Re‑run cascades that failed or whose worker died part‑way."""
+    stale = datetime.utcnow() - timedelta(seconds=DELETION_STALE_SECONDS)
+    async with async_session_factory() as session:
+        ids = (
+            await session.execute(
+                select(SpaceDeletion.space_id).where(
+                    or_(
+                        SpaceDeletion.state == "error",
+                        and_(SpaceDeletion.state == "running", SpaceDeletion.updated_at < stale),
+                    )
+                )
+            )
+        ).scalars().all()
+    resumed = 0
+    for space_id in ids:
+        if (await start_deletion(space_id))[1]:
+            await delete_space_cascade(space_id)
+            resumed += 1
+    return resumed
+
+
+async def _prune_jobs() -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=DELETION_RETENTION_SECONDS)
+    async with async_session_factory() as session:
+        result = await session.execute(
+            delete(SpaceDeletion).where(SpaceDeletion.state == "done", SpaceDeletion.finished_at < cutoff)
+        )
+        await session.commit()
+    return result.rowcount
+
+
+# ─── Orphan sweeper ────────────────────────────────────────────────────
+async def _existing_content_ids(candidates: List[UUID]) -> Set[UUID]:
+    found: Set[UUID] = set()
+    for i in range(0, len(candidates), DELETE_BATCH_SIZE):
+        batch = candidates[i : i + DELETE_BATCH_SIZE]
+        async with async_session_factory() as session:
+            rows = await session.execute(select(Content.id).where(Content.id.in_(batch)))
+            found.update(r[0] for r in rows)
+    return found
+
+
+def _parse_uuid(value: str) -> UUID | None:
+    try:
+        return UUID(value)
+    except ValueError:
+        return None
+
+
+async def _sweep_vectors() -> int:
+    by_content: Dict[UUID, List[str]] = {}
+    async for ids, metas in memory_db.iter_metadatas(where={"type": "content"}):
+        for doc_id, meta in zip(ids, metas):
+            cid = _parse_uuid(str(meta.get("subtype", "")))
+            if cid:
+                by_content.setdefault(cid, []).append(doc_id)
+
+    alive = await _existing_content_ids(list(by_content))
+    orphans = [d for cid, docs in by_content.items() if cid not in alive for d in docs]
+    for i in range(0, len(orphans), DELETE_BATCH_SIZE):
+        await memory_db.delete_ids(orphans[i : i + DELETE_BATCH_SIZE])
+    return len(orphans)
+
+
+async def _sweep_files() -> int:
+    cutoff = time.time() - ORPHAN_FILE_GRACE_SECONDS
+    files = [loc for backend in sweep_storages() for loc in await backend.list_older_than(cutoff)]
+    # locations end in "<content_id><ext>" on every backend
+    by_content = {cid: loc for loc in files if (cid := _parse_uuid(PurePosixPath(loc).stem))}
+    alive = await _existing_content_ids(list(by_content))
+    orphans = [loc for cid, loc in by_content.items() if cid not in alive]
+    return await delete_uploads(orphans)
+
+
+async def sweep_orphans() -> Dict[str, int]:
+    """Finish interrupted deletes, then drop vectors and files whose Content row is gone."""
+    stats = {"deletions_resumed": await resume_deletions()}
+    stats.update(vectors=await _sweep_vectors(), files=await _sweep_files(), jobs_pruned=await _prune_jobs())
+    log.info("orphan sweep reclaimed %s", stats)
+    return stats
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["sweep"]:
+        raise SystemExit("usage: python -m app.services.space_deletion sweep")
+    print(asyncio.run(sweep_orphans()))
@@ -0,0 +1,293 @@
+"""
+app/services/space_router.py
+Two‑level "search everything I own" across an owner's spaces.
+
+``MemoryDB.retrieve`` filters one big index by ``user_id``, which is a
+scan over every space the owner has.  Here each space is summarised by
+up to ``SPACE_ROUTER_REPS`` representative vectors (spherical k‑means
+centroids of its chunk embeddings), stored in the same vector store as
+entries with ``type="space_summary"``.  A query:
+
+1. ranks the owner's summaries against the query embedding and keeps
+   the ``probes`` best distinct spaces (``SPACE_ROUTER_PROBES``; more
+   probes → higher recall, more latency).  The owner's summaries are
+   held in process as one matrix for ``SPACE_ROUTER_CACHE_TTL`` seconds
+   (``SPACE_ROUTER_CACHE_MB`` in total), so routing is a matmul, then
+2. searches only those spaces' chunks – one query filtered to the probed
+   ``space_id``s, so the store prunes to those partitions before the
+   vector search instead of scanning every space the owner has.
+
+Summaries are updated incrementally on ingest (added chunks join their
+nearest representative, removed ones leave it) and dropped with the
+space.  Concurrent ingests into one space can race on that
+read‑modify‑write; the drift only affects routing and is reset by
+
+    python -m app.services.space_router rebuild [<space_id> …]
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+import numpy as np
+from cachetools import TTLCache
+
+from app.core.metrics import timed
+from app.services.config import embed_text
+from app.services.memory_db import MemoryDB, memory_db
+
+SPACE_ROUTER_PROBES = int(os.getenv("SPACE_ROUTER_PROBES", 8))
+SPACE_ROUTER_REPS = int(os.getenv("SPACE_ROUTER_REPS", 4))
+# rebuild: k‑means runs on at most this many vectors, then every vector is assigned
+SPACE_ROUTER_SAMPLE = int(os.getenv("SPACE_ROUTER_SAMPLE", 20_000))
+# other workers' summary changes are picked up after this long
+SPACE_ROUTER_CACHE_TTL = float(os.getenv("SPACE_ROUTER_CACHE_TTL", 60))
+SPACE_ROUTER_CACHE_MB = int(os.getenv("SPACE_ROUTER_CACHE_MB", 256))
+
+SUMMARY_TYPE = "space_summary"
+SUMMARY_VISIBILITY = "summary"  # never matches retrieve()'s owner/public filter
+
+
+class RoutedHit(TypedDict):
+    id: str
+    space_id: str
+    document: str
+    distance: float
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    n = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.where(n == 0, 1, n)
+
+
+def _kmeans(x: np.ndarray, k: int, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k‑means on unit rows of *x*; returns ≤ *k* unit centroids."""
+    k = min(k, len(x))
+    rng = np.random.default_rng(seed)
+    c = x[rng.choice(len(x), k, replace=False)]
+    for _ in range(iters):
+        assign = np.argmax(x @ c.T, axis=1)
+        sums = np.zeros_like(c)
+        np.add.at(sums, assign, x)
+        keep = np.bincount(assign, minlength=len(c)) > 0  # drop emptied clusters
+        c = _unit(sums[keep])
+    return c
+
+
+class _Reps:
+    """A space's representatives as running sums (``count`` vectors each)."""
+
+    def __init__(self, sums: np.ndarray, counts: np.ndarray, directions: np.ndarray) -> None:
+        self.sums, self.counts = sums, counts
+        self.directions = directions  # what vectors are assigned by (fixed per update)
+
+    @classmethod
+    def fresh(cls, centroids: np.ndarray) -> "_Reps":
+        return cls(np.zeros_like(centroids), np.zeros(len(centroids)), centroids)
+
+    def add(self, vecs: np.ndarray, sign: int = 1) -> None:
+        if not len(vecs):
+            return
+        assign = np.argmax(vecs @ self.directions.T, axis=1)
+        np.add.at(self.sums, assign, sign * vecs)
+        np.add.at(self.counts, assign, sign)
+
+
+class SpaceRouter:
+    def __init__(self, db: MemoryDB = memory_db, reps: int = SPACE_ROUTER_REPS) -> None:
+        self.db = db
+        self.reps = reps
+        # user_id → (space_id per representative, unit representative matrix)
+        self._tables: TTLCache = TTLCache(
+            maxsize=SPACE_ROUTER_CACHE_MB << 20, ttl=SPACE_ROUTER_CACHE_TTL, getsizeof=lambda t: t[1].nbytes + 1
+        )
+
+    # ── summary storage ─────────────────────────────────────────────
+    @staticmethod
+    def _ids(space_id: str, n: int) -> List[str]:
+        return [f"{SUMMARY_TYPE}:{space_id}:{j}" for j in range(n)]
+
+    async def _load(self, space_id: str) -> Optional[_Reps]:
+        got = await self.db._call(
+            "get",
+            where={"$and": [{"type": SUMMARY_TYPE}, {"space_id": space_id}]},
+            include=["embeddings", "metadatas"],
+        )
+        embs, metas = got.get("embeddings"), got.get("metadatas") or []
+        if embs is None or not len(embs):
+            return None
+        # stores may normalise vectors, so the mean's length lives in the metadata
+        counts = np.array([m["count"] for m in metas], dtype=np.float64)
+        norms = np.array([m["norm"] for m in metas], dtype=np.float64)
+        directions = _unit(np.asarray(embs, dtype=np.float64))
+        return _Reps(directions * (norms * counts)[:, None], counts, directions)
+
+    async def _save(self, user_id: str, space_id: str, reps: _Reps, previous: int) -> None:
+        live = reps.counts > 0
+        sums, counts = reps.sums[live], reps.counts[live]
+        means = sums / counts[:, None]
+        ids = self._ids(space_id, len(means))
+        await self.db.delete_ids(self._ids(space_id, max(previous, len(means))))
+        if not len(means):
+            return
+        await self.db._call(
+            "add",
+            ids=ids,
+            embeddings=_unit(means).tolist(),
+            documents=[""] * len(ids),
+            metadatas=[
+                {"user_id": user_id, "type": SUMMARY_TYPE, "subtype": space_id, "space_id": space_id,
+                 "visibility": SUMMARY_VISIBILITY, "count": int(c), "norm": float(np.linalg.norm(m))}
+                for c, m in zip(counts, means)
+            ],
+        )
+
+    # ── maintenance ─────────────────────────────────────────────────
+    async def update(
+        self, user_id: str, space_id: str, added: List[List[float]], removed: List[List[float]]
+    ) -> None:
+        """Fold one ingest's ``(added, removed)`` chunk embeddings into the summary."""
+        with timed("space_router_update"):
+            reps = await self._load(space_id)
+            previous = 0 if reps is None else len(reps.counts)
+            if reps is None:
+                if not added:
+                    return  # nothing summarised yet and nothing to add
+                reps = _Reps.fresh(_kmeans(_unit(np.asarray(added, dtype=np.float64)), self.reps))
+            elif removed:
+                reps.add(_unit(np.asarray(removed, dtype=np.float64)), sign=-1)
+            if added:
+                reps.add(_unit(np.asarray(added, dtype=np.float64)))
+            await self._save(user_id, space_id, reps, previous)
+            self._tables.pop(user_id, None)
+
+    def on_vectors(self, user_id: str, space_id: str):
+        """``upsert_chunks(on_vectors=...)`` callback for one space."""
+        return lambda added, removed: self.update(user_id, space_id, added, removed)
+
+    async def rebuild(self, space_id: str) -> int:
+        """Recompute a space's summary from all its chunks; returns the chunk count."""
+        where = {"$and": [{"type": "content"}, {"space_id": space_id}]}
+        sample: List[np.ndarray] = []
+        user_id = None
+        async for page in self._pages(where):
+            user_id = user_id or page[1][0]["user_id"]
+            sample.append(page[0])
+            if sum(len(s) for s in sample) >= SPACE_ROUTER_SAMPLE:
+                break
+        old = await self._load(space_id)
+        previous = 0 if old is None else len(old.counts)
+        if not sample:
+            await self.db.delete_ids(self._ids(space_id, previous))
+            return 0
+        reps = _Reps.fresh(_kmeans(np.concatenate(sample)[:SPACE_ROUTER_SAMPLE], self.reps))
+        async for vecs, _ in self._pages(where):
+            reps.add(vecs)
+        await self._save(user_id, space_id, reps, previous)
+        self._tables.pop(user_id, None)
+        return int(reps.counts.sum())
+
+    async def _pages(self, where: Dict, page_size: int = 5000):
+        offset = 0
+        while True:
+            page = await self.db._call(
+                "get", where=where, include=["embeddings", "metadatas"], limit=page_size, offset=offset
+            )
+            embs = page.get("embeddings")
+            if embs is None or not len(embs):
+                return
+            yield _unit(np.asarray(embs, dtype=np.float64)), page.get("metadatas") or []
+            offset += len(embs)
+
+    # ── search ──────────────────────────────────────────────────────
+    async def _table(self, user_id: str) -> Tuple[List[str], np.ndarray]:
+        table = self._tables.get(user_id)
+        if table is None:
+            got = await self.db._call(
+                "get",
+                where={"$and": [{"type": SUMMARY_TYPE}, {"user_id": user_id}]},
+                include=["embeddings", "metadatas"],
+            )
+            embs, metas = got.get("embeddings"), got.get("metadatas") or []
+            if embs is None or not len(embs):
+                table = ([], np.empty((0, 0), dtype=np.float32))
+            else:
+                table = ([m["space_id"] for m in metas], _unit(np.asarray(embs, dtype=np.float32)))
+            self._tables[user_id] = table
+        return table
+
+    async def route(self, user_id: str, emb: List[float], probes: int) -> List[str]:
+        """The *probes* spaces whose representatives are nearest to *emb*."""
+        space_ids, reps = await self._table(user_id)
+        if not space_ids:
+            return []
+        sims = reps @ np.asarray(emb, dtype=np.float32)
+        n = min(len(sims), probes * self.reps)  # enough rows for *probes* distinct spaces
+        best = np.argpartition(-sims, n - 1)[:n]
+        spaces: List[str] = []
+        for j in best[np.argsort(-sims[best])]:
+            if space_ids[j] not in spaces:
+                spaces.append(space_ids[j])
+        return spaces[:probes]
+
+    async def search(
+        self,
+        user_id: str,
+        query: str,
+        k: int = 5,
+        probes: int = SPACE_ROUTER_PROBES,
+        allowed: Tuple[str, ...] = ("owner", "public"),
+    ) -> List[RoutedHit]:
+        """Top *k* chunks across *user_id*'s spaces, searching only *probes* of them."""
+        return await self.search_embedding(user_id, await embed_text(query), k, probes, allowed)
+
+    async def search_embedding(
+        self,
+        user_id: str,
+        emb: List[float],
+        k: int = 5,
+        probes: int = SPACE_ROUTER_PROBES,
+        allowed: Tuple[str, ...] = ("owner", "public"),
+    ) -> List[RoutedHit]:
+        with timed("space_router_route"):
+            spaces = await self.route(user_id, emb, probes)
+        if not spaces:
+            return []
+        res = await self.db._call(
+            "query",
+            query_embeddings=[emb],
+            n_results=k,
+            where={"$and": [
+                {"user_id": user_id},
+                {"space_id": {"$in": spaces}},
+                {"visibility": {"$in": list(allowed)}},
+            ]},
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            RoutedHit(id=i, space_id=m["space_id"], document=d, distance=float(x))
+            for i, d, m, x in zip(res["ids"][0], res["documents"][0], res["metadatas"][0], res["distances"][0])
+        ]
+
+
+# Singleton instance used across the app
+space_router = SpaceRouter()
+
+
+async def _rebuild_cli(space_ids: List[str]) -> None:
+    if not space_ids:
+        seen: set = set()
+        async for _, metas in memory_db.iter_metadatas(where={"type": "content"}):
+            seen.update(m["space_id"] for m in metas if m.get("space_id"))
+        space_ids = sorted(seen)
+    for space_id in space_ids:
+        print(space_id, await space_router.rebuild(space_id))
+    await memory_db.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["rebuild"]:
+        raise SystemExit("usage: python -m app.services.space_router rebuild [<space_id> …]")
+    asyncio.run(_rebuild_cli(sys.argv[2:]))
@@ -0,0 +1,180 @@
+"""
+app/services/vector_store.py
+Vector store backends behind MemoryDB.
+
+Each backend exposes the Chroma collection calls MemoryDB makes – ``get``,
+``add``, ``delete``, ``query``, ``count`` – as ``await store.call(op, **kw)``
+with Chroma‑shaped arguments and results.  ``VECTOR_STORE`` selects:
+
+* ``chroma-embedded`` (default) – ``PersistentClient`` at ``MEMORY_DB_PATH``.
+  Every process opens its own copy of the index; fine for one worker.
+* ``chroma-http`` – the shared Chroma server (docker‑compose ``chroma``)
+  at ``CHROMA_HOST:CHROMA_PORT``, over a pooled keep‑alive httpx client
+  with per‑request timeouts.  All API workers and the Celery worker then
+  read and write one index.
+* ``pgvector`` – a table in the app's Postgres (see ``pgvector_store.py``);
+  vectors are deleted transactionally with their Content rows.
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma-embedded").lower()
+MEMORY_DB_PATH = os.getenv("MEMORY_DB_PATH", "db_chroma")
+COLLECTION = "user_memories"
+COLLECTION_METADATA = {"hnsw:space": "cosine"}
+
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8000))
+CHROMA_TIMEOUT_SECONDS = float(os.getenv("CHROMA_TIMEOUT_SECONDS", 10))
+CHROMA_MAX_CONNECTIONS = int(os.getenv("CHROMA_MAX_CONNECTIONS", 32))
+CHROMA_TENANT = os.getenv("CHROMA_TENANT", "default_tenant")
+CHROMA_DATABASE = os.getenv("CHROMA_DATABASE", "default_database")
+
+
+class VectorStore(abc.ABC):
+    """Chroma‑collection‑shaped async interface (see module docstring)."""
+
+    name = "vector"  # metric / span prefix
+
+    @abc.abstractmethod
+    async def call(self, op: str, **kwargs: Any) -> Any:
+        """Run Chroma collection method *op* (``get``, ``add``, …) with Chroma‑shaped *kwargs*."""
+
+    async def close(self) -> None:
+        """Release connections bound to the current event loop."""
+
+
+# ─── Embedded Chroma ───────────────────────────────────────────────────
+class EmbeddedChromaStore(VectorStore):
+    name = "chroma"
+
+    def __init__(self, path: str = MEMORY_DB_PATH) -> None:
+        # nothing is opened here – importing chromadb and loading the
+        # persistent store happen on first use (or in the lifespan warmup)
+        self.path = path
+        self.client = None
+        self._col = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def col(self):
+        """The Chroma collection, opened on first access (thread‑safe)."""
+        if self._col is None:
+            with self._open_lock:
+                if self._col is None:
+                    import chromadb  # ~0.8 s of imports, paid only when the store is used
+
+                    # PersistentClient → embedded DuckDB backend
+                    self.client = chromadb.PersistentClient(path=self.path)
+                    self._col = self.client.get_or_create_collection(
+                        name=COLLECTION, metadata=COLLECTION_METADATA
+                    )
+        return self._col
+
+    async def call(self, op: str, **kwargs: Any) -> Any:
+        # self.col inside the thread: a cold first open never blocks the loop
+        return await asyncio.to_thread(lambda: getattr(self.col, op)(**kwargs))
+
+
+# ─── Chroma server over HTTP ───────────────────────────────────────────
+class HttpChromaStore(VectorStore):
+    """
+    Minimal client for the Chroma v2 REST API.
+
+    chromadb's own ``AsyncHttpClient`` keeps one httpx client per event
+    loop in a class‑level dict with no way to close it, which leaks a pool
+    per Celery task (each task runs its own loop).  This one is loop‑aware
+    like the other shared clients here and :meth:`close` releases it.
+    """
+
+    name = "chroma"
+    _GET_INCLUDE = ["metadatas", "documents"]
+    _QUERY_INCLUDE = ["metadatas", "documents", "distances"]
+
+    def __init__(
+        self,
+        host: str = CHROMA_HOST,
+        port: int = CHROMA_PORT,
+        timeout: float = CHROMA_TIMEOUT_SECONDS,
+        max_connections: int = CHROMA_MAX_CONNECTIONS,
+    ) -> None:
+        self.base_url = f"http://{host}:{port}/api/v2/tenants/{CHROMA_TENANT}/databases/{CHROMA_DATABASE}"
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._http = None
+        self._http_loop: asyncio.AbstractEventLoop | None = None
+        self._collection_id: str | None = None
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http_loop is not loop:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Content-Type": "application/json"},
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._http_loop = loop
+        return self._http
+
+    async def _request(self, method: str, path: str, body: Optional[Dict] = None) -> Any:
+        content = orjson.dumps(body) if body is not None else None
+        r = await self._client().request(method, path, content=content)
+        if r.is_error:  # keep chroma's message (e.g. dimension mismatch) in the error
+            import httpx
+
+            raise httpx.HTTPStatusError(
+                f"chroma {path.rsplit('/', 1)[-1]} failed ({r.status_code}): {r.text[:300]}", request=r.request, response=r
+            )
+        return orjson.loads(r.content) if r.content else None
+
+    async def _collection(self) -> str:
+        if self._collection_id is None:
+            model = await self._request(
+                "POST",
+                "/collections",
+                {"name": COLLECTION, "metadata": COLLECTION_METADATA, "get_or_create": True},
+            )
+            self._collection_id = model["id"]
+        return f"/collections/{self._collection_id}"
+
+    async def call(self, op: str, **kwargs: Any) -> Any:
+        col = await self._collection()
+        if op == "count":
+            return await self._request("GET", f"{col}/count")
+        if op == "get":
+            kwargs.setdefault("include", self._GET_INCLUDE)
+        elif op == "query":
+            kwargs.setdefault("include", self._QUERY_INCLUDE)
+        elif op not in ("add", "delete", "upsert"):
+            raise ValueError(f"unsupported vector store op {op!r}")
+        return await self._request("POST", f"{col}/{op}", kwargs)
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+def create_store(kind: str = VECTOR_STORE) -> VectorStore:
+    if kind == "chroma-embedded":
+        return EmbeddedChromaStore()
+    if kind == "chroma-http":
+        return HttpChromaStore()
+    if kind == "pgvector":
+        from app.services.pgvector_store import PgVectorStore  # needs DATABASE_URL on Postgres
+
+        return PgVectorStore()
+    raise RuntimeError(f"Unknown VECTOR_STORE {kind!r}")
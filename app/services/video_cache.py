@@ -0,0 +1,226 @@
+"""
+app/services/video_cache.py
+Content‑addressed cache for Gemini video work.
+
+``summarize_video`` used to upload the whole file and run a full model
+call on every ingest, so a retried ingest or the same lecture uploaded
+into a second space paid for both again.  Entries here are keyed by the
+SHA‑256 of the video bytes:
+
+* ``file:<sha>`` – the uploaded file's URI + MIME type, reused until
+  ``VIDEO_FILE_URI_MARGIN`` seconds before Gemini's ``expirationTime``
+  (files live 48 h)
+* ``summary:<sha>:<model>:<prompt sha>`` – the generated text, kept for
+  ``VIDEO_SUMMARY_TTL`` seconds
+
+Concurrent calls for the same key share one upload / generation:
+in‑process through a per‑key task, and with ``VIDEO_CACHE_REDIS_URL`` set
+also across API and Celery workers through a Redis lease (``SET NX``)
+that peers poll until the holder has stored its result.  Without Redis
+the cache is per process.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+from cachetools import LRUCache
+
+from app.core.metrics import CACHE
+
+log = logging.getLogger(__name__)
+
+VIDEO_CACHE_REDIS_URL: str | None = os.getenv("VIDEO_CACHE_REDIS_URL")
+VIDEO_CACHE_SIZE = int(os.getenv("VIDEO_CACHE_SIZE", 1024))
+VIDEO_SUMMARY_TTL = float(os.getenv("VIDEO_SUMMARY_TTL", 30 * 86400))
+VIDEO_FILE_URI_MARGIN = float(os.getenv("VIDEO_FILE_URI_MARGIN", 3600))
+VIDEO_CACHE_LEASE_SECONDS = float(os.getenv("VIDEO_CACHE_LEASE_SECONDS", 900))
+VIDEO_CACHE_POLL_SECONDS = float(os.getenv("VIDEO_CACHE_POLL_SECONDS", 1.0))
+KEY_PREFIX = "video:"
+HASH_BLOCK = 1 << 20
+
+# delete the lease only if we still hold it (it may have expired and been re‑taken)
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+Compute = Callable[[], Awaitable[Tuple[Any, float]]]  # → (value, seconds to keep it)
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(HASH_BLOCK):
+            h.update(block)
+    return h.hexdigest()
+
+
+class VideoCache:
+    def __init__(self, maxsize: int = VIDEO_CACHE_SIZE) -> None:
+        self._entries: LRUCache = LRUCache(maxsize=maxsize)  # key → (expires_at, value)
+        self._inflight: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Task]] = {}
+        self._redis = None
+        self._redis_loop: asyncio.AbstractEventLoop | None = None
+
+    # ── public API ──────────────────────────────────────────────────
+    async def digest(self, path: str) -> str:
+        """SHA‑256 of the file at *path* (read in a worker thread)."""
+        return await asyncio.to_thread(_sha256_file, path)
+
+    async def file_uri(
+        self, digest: str, upload: Callable[[], Awaitable[Tuple[str, str, float]]]
+    ) -> Tuple[str, str]:
+        """
+        ``(file_uri, mime_type)`` for the video *digest*; *upload* returns
+        ``(file_uri, mime_type, expires_at)`` and only runs on a miss.
+        """
+
+        async def compute() -> Tuple[Any, float]:
+            uri, mime_type, expires_at = await upload()
+            return [uri, mime_type], expires_at - VIDEO_FILE_URI_MARGIN - time.time()
+
+        uri, mime_type = await self._get("video_file", f"file:{digest}", compute)
+        return uri, mime_type
+
+    async def forget_file(self, digest: str) -> None:
+        """Drop a file URI Gemini no longer accepts (deleted or expired early)."""
+        await self._delete(f"file:{digest}")
+
+    async def summary(
+        self, digest: str, model: str, prompt: str, generate: Callable[[], Awaitable[str]]
+    ) -> str:
+        """Generated text for (*digest*, *model*, *prompt*); *generate* runs on a miss."""
+        prompt_sha = hashlib.sha256(prompt.encode()).hexdigest()[:16]
+
+        async def compute() -> Tuple[Any, float]:
+            return await generate(), VIDEO_SUMMARY_TTL
+
+        return await self._get("video_summary", f"summary:{digest}:{model}:{prompt_sha}", compute)
+
+    async def close(self) -> None:
+        if self._redis:
+            await self._redis.aclose()
+            self._redis = None
+
+    # ── lookup + single flight ──────────────────────────────────────
+    async def _get(self, cache: str, key: str, compute: Compute) -> Any:
+        value = await self._load(key)
+        if value is not None:
+            CACHE.inc(cache, "hit")
+            return value
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] is loop:
+            CACHE.inc(cache, "shared")
+        else:
+            task = loop.create_task(self._fill(cache, key, compute))
+            inflight = self._inflight[key] = (loop, task)
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None) if self._inflight.get(key) is inflight else None)
+        # shield: a cancelled caller must not cancel the work its peers wait on
+        return await asyncio.shield(inflight[1])
+
+    async def _fill(self, cache: str, key: str, compute: Compute) -> Any:
+        client = self._client()
+        if client is None:
+            return await self._compute(cache, key, compute)
+
+        lease, token = f"{KEY_PREFIX}lock:{key}", uuid.uuid4().hex
+        while True:
+            try:
+                acquired = await client.set(lease, token, nx=True, px=int(VIDEO_CACHE_LEASE_SECONDS * 1000))
+            except Exception:  # noqa: BLE001 – without Redis, just do the work here
+                log.warning("video cache lease failed; computing locally", exc_info=True)
+                return await self._compute(cache, key, compute)
+            if acquired:
+                try:
+                    # a peer may have stored the result between our miss and the lease
+                    value = await self._load(key)
+                    if value is not None:
+                        CACHE.inc(cache, "shared")
+                        return value
+                    return await self._compute(cache, key, compute)
+                finally:
+                    try:
+                        await client.eval(_RELEASE, 1, lease, token)
+                    except Exception:  # noqa: BLE001 – the lease expires on its own
+                        log.warning("video cache lease release failed", exc_info=True)
+
+            # another worker holds the lease: wait for its result, or take
+            # over once it gives up (error) or dies (lease expiry)
+            await asyncio.sleep(VIDEO_CACHE_POLL_SECONDS)
+            value = await self._load(key)
+            if value is not None:
+                CACHE.inc(cache, "shared")
+                return value
+
+    async def _compute(self, cache: str, key: str, compute: Compute) -> Any:
+        CACHE.inc(cache, "miss")
+        value, ttl = await compute()
+        if ttl > 0:
+            await self._store(key, value, ttl)
+        return value
+
+    # ── storage ─────────────────────────────────────────────────────
+    def _client(self):
+        # re‑created when a Celery task runs under a fresh asyncio.run() loop
+        if not VIDEO_CACHE_REDIS_URL:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            import redis.asyncio as aioredis  # optional dependency path
+
+            self._redis = aioredis.from_url(VIDEO_CACHE_REDIS_URL)
+            self._redis_loop = loop
+        return self._redis
+
+    async def _load(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                return entry[1]
+            self._entries.pop(key, None)
+
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(KEY_PREFIX + key)
+            if raw is None:
+                return None
+            ttl_ms = await client.pttl(KEY_PREFIX + key)
+        except Exception:  # noqa: BLE001 – treat as a miss
+            log.warning("video cache read failed", exc_info=True)
+            return None
+        value = orjson.loads(raw)
+        if ttl_ms > 0:
+            self._entries[key] = (time.time() + ttl_ms / 1000, value)
+        return value
+
+    async def _store(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.time() + ttl, value)
+        client = self._client()
+        if client is None:
+            return
+        try:
+            await client.set(KEY_PREFIX + key, orjson.dumps(value), px=max(1, int(ttl * 1000)))
+        except Exception:  # noqa: BLE001 – still cached in this process
+            log.warning("video cache write failed", exc_info=True)
+
+    async def _delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+        client = self._client()
+        if client is None:
+            return
+        try:
+            await client.delete(KEY_PREFIX + key)
+        except Exception:  # noqa: BLE001
+            log.warning("video cache delete failed", exc_info=True)
+
+
+# Singleton instance used across the app
+video_cache = VideoCache()
@@ -0,0 +1,30 @@
+# app/tasks/sweep_orphans.py
+"""
+Periodic maintenance task: resume space deletions that crashed part‑way and
+reclaim the vectors and upload files they left behind (see
+app/services/space_deletion.py).
+Scheduled through Celery beat in app/tasks/ingest_content.py.
+"""
+
+import asyncio
+
+from celery import shared_task
+
+from app.core.database import engine
+from app.services.memory_db import memory_db
+from app.services.space_deletion import sweep_orphans as _sweep
+
+
+@shared_task(name="tasks.sweep_orphans")
+def sweep_orphans() -> dict:
+    """Celery entry point. Runs sync, calls async helper with asyncio."""
+    return asyncio.run(_sweep_async())
+
+
+async def _sweep_async() -> dict:
+    try:
+        return await _sweep()
+    finally:
+        # pooled asyncpg / vector store connections are bound to this task's event loop
+        await engine.dispose()
+        await memory_db.close()
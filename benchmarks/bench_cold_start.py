@@ -0,0 +1,68 @@
+"""
+benchmarks/bench_cold_start.py
+Startup schema cost: ``metadata.create_all`` (old) vs the one‑query
+version check (new).
+
+    DATABASE_URL=postgresql+asyncpg://… python -m benchmarks.bench_cold_start
+
+Defaults to a throw‑away SQLite file; point it at the real (remote)
+database to see the round‑trip savings, which is where they matter.
+Each sample uses a fresh engine so connection setup is included, as it
+is for a booting worker.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{Path(_tmp) / 'cold.db'}")
+
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+import app.core.migrations as migrations  # noqa: E402
+from app.core.database import DATABASE_URL, connect_args  # noqa: E402
+from app.models import content, space, user  # noqa: E402,F401  (register tables)
+
+
+async def _create_all() -> None:
+    eng = create_async_engine(DATABASE_URL, connect_args=connect_args)
+    async with eng.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    await eng.dispose()
+
+
+async def _version_check() -> None:
+    eng = create_async_engine(DATABASE_URL, connect_args=connect_args)
+    migrations.engine = eng
+    await migrations.check_schema_version()
+    await eng.dispose()
+
+
+async def _bench(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main(repeat: int) -> None:
+    await migrations.upgrade()  # bring the DB to head once, untimed
+    print(f"database: {DATABASE_URL.split('@')[-1]}")
+    for name, fn in (("create_all", _create_all), ("version check", _version_check)):
+        s = await _bench(fn, repeat)
+        print(f"{name:>14}: median {statistics.median(s):8.2f} ms   max {max(s):8.2f} ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(ap.parse_args().repeat))
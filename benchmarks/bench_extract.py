@@ -0,0 +1,129 @@
+"""
+benchmarks/bench_extract.py
+Peak memory and time of DOCX / TXT extraction + chunking, streamed vs whole‑file.
+
+    python -m benchmarks.bench_extract --paragraphs 200000 --table-rows 20000
+
+Generates one large DOCX (headings, paragraphs and a big table) and one
+large TXT, then runs each mode in a fresh interpreter and reports its
+wall time, peak RSS (and the interpreter's after imports) and the chunks
+produced:
+
+* ``stream`` – ``chunk_blocks(iter_*_blocks(path))``, what ingest runs
+* ``whole``  – the previous path: python‑docx ``Document`` /
+  ``read_text``, joined into one string, then ``chunk_text``
+
+Chunks are counted, not kept, so the numbers are the extractor's and
+chunker's own footprint (ingest still holds the chunk list it embeds).
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from benchmarks.load import REPO, _WORDS, _env
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+_PROBE = """
+import resource, sys, time
+from app.services import chunking, media_parser
+path, mode = sys.argv[1], sys.argv[2]
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t = time.perf_counter()
+if mode == "stream":
+    blocks = media_parser.BLOCK_PARSERS[path[path.rfind("."):]](path, None)
+    chunks = chunking.chunk_blocks(blocks)
+elif path.endswith(".docx"):
+    from docx import Document
+    chunks = chunking.chunk_text("\\n".join(p.text for p in Document(path).paragraphs))
+else:
+    from pathlib import Path
+    chunks = chunking.chunk_text(Path(path).read_text(encoding="utf-8", errors="ignore"))
+n = chars = 0
+for c in chunks:
+    n += 1
+    chars += len(c)
+print(time.perf_counter() - t, base / 1024, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, n, chars)
+"""
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(30, 90))).capitalize() + "."
+
+
+def _run(rng: random.Random, style: str, text: str) -> str:
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{ppr}<w:r><w:t>{escape(text)}</w:t></w:r></w:p>"
+
+
+def make_docx(path: Path, args) -> None:
+    """A python‑docx template with a generated body, written as a stream."""
+    from docx import Document
+
+    template = path.with_suffix(".template.docx")
+    Document().save(template)
+    rng = random.Random(args.seed)
+    with zipfile.ZipFile(template) as src, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            if item.filename != "word/document.xml":
+                dst.writestr(item, src.read(item))
+        with dst.open("word/document.xml", "w") as out:
+            out.write(f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                      f'<w:document xmlns:w="{_W_NS}"><w:body>'.encode())
+            for i in range(args.paragraphs):
+                if i % 50 == 0:
+                    out.write(_run(rng, "Heading1" if i % 500 == 0 else "Heading2", f"Section {i // 50}").encode())
+                out.write(_run(rng, "", _sentence(rng)).encode())
+                if i == args.paragraphs // 2:
+                    out.write(b"<w:tbl>")
+                    for r in range(args.table_rows):
+                        cells = "".join(f"<w:tc>{_run(rng, '', f'r{r} {rng.choice(_WORDS)}')}</w:tc>" for _ in range(4))
+                        out.write(f"<w:tr>{cells}</w:tr>".encode())
+                    out.write(b"</w:tbl>")
+            out.write(b"<w:sectPr/></w:body></w:document>")
+    template.unlink()
+
+
+def make_txt(path: Path, args) -> None:
+    rng = random.Random(args.seed)
+    with open(path, "w", encoding="utf-8") as out:
+        for i in range(args.paragraphs):
+            out.write(_sentence(rng) + ("\n" if i % 3 else "\n\n"))
+
+
+def measure(path: Path, mode: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE, str(path), mode], cwd=REPO, env=_env(GOOGLE_API_KEY="stub"),
+                         capture_output=True, text=True, check=True).stdout.split()
+    seconds, base_mb, peak_mb = map(float, out[:3])
+    return {"seconds": round(seconds, 2), "baseline_rss_mb": round(base_mb, 1), "peak_rss_mb": round(peak_mb, 1),
+            "chunks": int(out[3]), "chars": int(out[4])}
+
+
+def main(args) -> None:
+    tmp = Path(tempfile.mkdtemp(prefix="spaces-extract-bench-"))
+    try:
+        files = [tmp / "big.docx", tmp / "big.txt"]
+        make_docx(files[0], args)
+        make_txt(files[1], args)
+        for path in files:
+            print(f"{path.suffix:>5} {path.stat().st_size / 2**20:.1f} MiB", file=sys.stderr)
+            for mode in ("whole", "stream"):
+                print(f"{path.suffix:>5} {mode:>6}: {measure(path, mode)}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--paragraphs", type=int, default=200_000)
+    ap.add_argument("--table-rows", type=int, default=20_000)
+    ap.add_argument("--seed", type=int, default=7)
+    main(ap.parse_args())
@@ -0,0 +1,116 @@
+"""
+benchmarks/bench_hedging.py
+Tail latency of ``embed_text`` / ``llm_chat`` with and without hedging,
+and how fast calls fail once the upstream is down.
+
+    python -m benchmarks.bench_hedging --requests 2000 --concurrency 16 --slow-rate 0.03 --slow-ms 1000
+
+Runs :mod:`benchmarks.gemini_stub` with an injected tail (``--slow-rate``
+of calls take ``--slow-ms`` longer) and calls the real client functions
+in this process, first with ``HEDGING`` off, then on.  Each mode starts
+with ``--warmup`` calls so the hedge delay has a p95 to work from.  The
+outage part points the client at a stub answering every call with 503
+and reports per‑call latency before and after the breaker opens.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+os.environ.setdefault("GOOGLE_API_KEY", "stub")
+
+from benchmarks import gemini_stub
+from benchmarks.load import gemini_stub_server, run_closed_loop
+
+
+def _reset(base_url: str) -> None:
+    from app.core import resilience
+    from app.services import config
+
+    resilience._latency.clear()
+    resilience._breakers.clear()
+    config.BASE_URL = base_url
+    config._client = None  # rebuilt against *base_url* on next use
+
+
+async def _run(op: Callable[[int], Awaitable[Any]], args) -> Dict[str, Any]:
+    from app.core.resilience import UpstreamError
+
+    async def call(i: int) -> bool:
+        try:
+            await op(i)
+            return True
+        except UpstreamError:
+            return False
+
+    await run_closed_loop(args.concurrency, args.warmup, call)
+    return await run_closed_loop(args.concurrency, args.requests, call)
+
+
+async def tail(stub_url: str, args) -> None:
+    from app.core import metrics, resilience
+    from app.services import config
+
+    ops = {
+        "embed_text": lambda i: config.embed_text(f"question {i}"),
+        "llm_chat": lambda i: config.llm_chat(f"question {i}", max_tokens=256),
+    }
+    for name, op in ops.items():
+        for hedging in (False, True):
+            _reset(f"{stub_url}/v1beta")
+            resilience.HEDGING = hedging
+            stage = "embed" if name == "embed_text" else name
+            hedges = metrics.RETRIES.values.get((stage,), 0)
+            result = await _run(op, args)
+            result["hedged_calls"] = int(metrics.RETRIES.values.get((stage,), 0) - hedges)
+            print(f"{name:>10} hedging={'on ' if hedging else 'off'}: {result}")
+            await config.get_http_client().aclose()
+
+
+async def outage(stub_url: str, args) -> None:
+    import httpx
+
+    from app.core.resilience import CircuitOpenError, breaker
+    from app.services import config
+
+    _reset(f"{stub_url}/v1beta")
+    failed, fast = [], []
+    for i in range(args.outage_calls):
+        start = time.perf_counter()
+        try:
+            await config.embed_text(f"outage {i}")
+        except CircuitOpenError:
+            fast.append((time.perf_counter() - start) * 1000)
+        except httpx.HTTPStatusError:
+            failed.append((time.perf_counter() - start) * 1000)
+    await config.get_http_client().aclose()
+    print(
+        f"{'outage':>10}: {len(failed)} calls reached the upstream "
+        f"(mean {sum(failed) / max(1, len(failed)):.1f} ms), then {len(fast)} failed fast "
+        f"(mean {sum(fast) / max(1, len(fast)):.3f} ms); breaker {breaker('embed').state}"
+    )
+
+
+async def main(args) -> None:
+    async with gemini_stub_server(args) as stub_url:
+        await tail(stub_url, args)
+    down = argparse.Namespace(**{**vars(args), "fail_rate": 1.0, "slow_rate": 0.0})
+    async with gemini_stub_server(down) as stub_url:
+        await outage(stub_url, args)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--warmup", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--outage-calls", type=int, default=200)
+    gemini_stub.add_arguments(ap)
+    ap.set_defaults(slow_rate=0.03, slow_ms=1000.0)
+    args = ap.parse_args()
+    print(f"stub: {vars(gemini_stub.config_from_args(args))}", file=sys.stderr)
+    asyncio.run(main(args))
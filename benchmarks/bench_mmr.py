@@ -0,0 +1,141 @@
+"""
+benchmarks/bench_mmr.py
+Cost and effect of MMR / near‑duplicate filtering on retrieved context.
+
+    python -m benchmarks.bench_mmr --chunks 5000 --copies 4 --queries 200 --k 5
+
+Builds a throw‑away embedded Chroma store whose chunks are noisy copies
+of topic directions, each stored ``--copies`` times with tiny jitter (the
+same slide in several uploads).  Each query is a noisy topic.  Reported:
+
+* ``mmr_us`` – p50/p99 of :func:`~app.services.diversify.mmr` alone, per
+  candidate count (``k × RETRIEVAL_OVERFETCH`` by default is 20), given
+  the vectors as an array and as Python lists
+* per mode – query latency (the over‑fetch includes vectors), and of the
+  *k* chunks returned: how many are near‑duplicates of another one and
+  how many distinct passages they cover
+
+Modes: ``plain`` (top *k*, what ``retrieve`` returns) and ``mmr`` (what
+``_build_context`` returns).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+os.environ.setdefault("GOOGLE_API_KEY", "stub")  # config needs one; Gemini is never called
+
+from benchmarks.load import _pct
+
+DIM = 768
+OWNER = "bench-owner"
+WHERE = {"$and": [{"user_id": OWNER}, {"visibility": {"$in": ["owner", "public"]}}]}
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def time_mmr(args) -> Dict[int, Dict[str, Dict[str, float]]]:
+    from app.services.diversify import mmr
+
+    rng = np.random.default_rng(args.seed)
+    out = {}
+    for n in (10, 20, 50, 100, 200):
+        vecs = _unit(rng.standard_normal((n, DIM)).astype(np.float32))
+        scores = sorted(rng.random(n).tolist(), reverse=True)
+        # embedded Chroma hands back an array; the HTTP / pgvector stores, JSON lists
+        for kind, arg in (("array", vecs), ("lists", vecs.tolist())):
+            mmr(scores, arg, args.k)  # warm up
+            t = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                mmr(scores, arg, args.k)
+                t.append((time.perf_counter() - t0) * 1e6)
+            t.sort()
+            out.setdefault(n, {})[kind] = {"p50": round(_pct(t, 0.50), 1), "p99": round(_pct(t, 0.99), 1)}
+    return out
+
+
+async def load(db, args) -> np.ndarray:
+    """Adds the corpus; returns the topic directions."""
+    rng = np.random.default_rng(args.seed)
+    topics = _unit(rng.standard_normal((args.topics, DIM)).astype(np.float32))
+    passages = _unit(topics[rng.integers(0, args.topics, args.chunks)]
+                     + args.noise * rng.standard_normal((args.chunks, DIM)).astype(np.float32))
+    for c in range(args.copies):
+        vecs = _unit(passages + 0.002 * rng.standard_normal(passages.shape).astype(np.float32))
+        for i in range(0, args.chunks, 1000):
+            rows = range(i, min(i + 1000, args.chunks))
+            await db._call(
+                "add",
+                ids=[f"p{j}.{c}" for j in rows],
+                embeddings=vecs[i : rows.stop].tolist(),
+                documents=[f"passage {j}" for j in rows],
+                metadatas=[{"user_id": OWNER, "visibility": "owner", "type": "content", "subtype": "bench"}] * len(rows),
+            )
+    return topics
+
+
+def _quality(hits, picks: List[int], threshold: float) -> tuple[int, int]:
+    v = _unit(np.asarray([hits.embeddings[i] for i in picks], dtype=np.float32))
+    sim = v @ v.T
+    np.fill_diagonal(sim, -1)
+    return int((sim.max(axis=1) >= threshold).sum()), len({hits.documents[i] for i in picks})
+
+
+async def main(args) -> None:
+    from app.services import chat, diversify
+    from app.services.memory_db import MemoryDB, Retrieval
+    from app.services.vector_store import EmbeddedChromaStore
+
+    print(f"mmr_us over n candidates (k={args.k}): {time_mmr(args)}")
+    path = tempfile.mkdtemp(prefix="spaces-mmr-bench-")
+    try:
+        db = MemoryDB(store=EmbeddedChromaStore(path=path))
+        topics = await load(db, args)
+        print(f"loaded {args.chunks * args.copies} chunks", file=sys.stderr)
+        rng = np.random.default_rng(args.seed + 1)
+        queries = _unit(topics[rng.integers(0, args.topics, args.queries)]
+                        + args.noise * rng.standard_normal((args.queries, DIM)).astype(np.float32))
+        fetch = args.k * chat.RETRIEVAL_OVERFETCH
+        for mode in ("plain", "mmr"):
+            latencies, dups, distinct = [], 0, 0
+            for q in queries:
+                t0 = time.perf_counter()
+                res = await db._call("query", query_embeddings=[q.tolist()], n_results=fetch, where=WHERE,
+                                     include=["documents", "metadatas", "distances", "embeddings"])
+                hits = Retrieval.from_query(res)
+                picks = list(range(min(args.k, len(hits.ids)))) if mode == "plain" else diversify.mmr(
+                    hits.scores, hits.embeddings, args.k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                d, n = _quality(hits, picks, diversify.RETRIEVAL_DEDUP_THRESHOLD)
+                dups += d
+                distinct += n
+            s = sorted(latencies)
+            print(f"{mode:>5}: {{'p50_ms': {_pct(s, 0.5):.2f}, 'p99_ms': {_pct(s, 0.99):.2f}, "
+                  f"'near_duplicates_per_query': {dups / args.queries:.2f}, "
+                  f"'distinct_passages_per_query': {distinct / args.queries:.2f}}}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=5000, help="distinct passages")
+    ap.add_argument("--copies", type=int, default=4, help="stored copies of each passage")
+    ap.add_argument("--topics", type=int, default=200)
+    ap.add_argument("--noise", type=float, default=0.03, help="per‑dimension noise around a topic")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=2000, help="timed mmr calls per candidate count")
+    ap.add_argument("--seed", type=int, default=11)
+    asyncio.run(main(ap.parse_args()))
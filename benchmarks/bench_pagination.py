@@ -0,0 +1,104 @@
+"""
+benchmarks/bench_pagination.py
+OFFSET vs keyset page latency at increasing scroll depth.
+
+Runs against an on‑disk SQLite file so it needs no services:
+
+    python -m benchmarks.bench_pagination --rows 200000 --page 50
+
+Keyset latency should stay flat while OFFSET grows with depth.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert, select
+from sqlmodel import SQLModel
+
+from app.core.pagination import encode_cursor, paginate
+from app.models.space import Space
+
+COLUMNS = (Space.id, Space.title, Space.description, Space.owner_id, Space.created_at)
+
+
+def _seed(engine, owner: uuid.UUID, n: int) -> None:
+    SQLModel.metadata.create_all(engine, tables=[Space.__table__])
+    t0 = datetime(2024, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(n):
+            batch.append(
+                {
+                    "id": uuid.uuid4(),
+                    "title": f"space {i}",
+                    "description": None,
+                    "owner_id": owner,
+                    "created_at": t0 + timedelta(seconds=i),
+                    "updated_at": t0,
+                }
+            )
+            if len(batch) == 10_000:
+                conn.execute(insert(Space), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(Space), batch)
+
+
+def _time(conn, stmt, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(stmt).all()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--page", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    owner = uuid.uuid4()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        _seed(engine, owner, args.rows)
+
+        base = select(*COLUMNS).where(Space.owner_id == owner)
+        depths = [0, 1_000, 10_000, 50_000, args.rows - args.page]
+        print(f"{'depth':>10} {'offset ms':>12} {'keyset ms':>12}")
+        with engine.connect() as conn:
+            for depth in depths:
+                if depth < 0 or depth >= args.rows:
+                    continue
+                offset_stmt = (
+                    base.order_by(Space.created_at.desc(), Space.id.desc())
+                    .offset(depth)
+                    .limit(args.page)
+                )
+                cursor = None
+                if depth:
+                    # cursor of the row just before the page (computed untimed)
+                    prev = conn.execute(
+                        base.order_by(Space.created_at.desc(), Space.id.desc())
+                        .offset(depth - 1)
+                        .limit(1)
+                    ).one()
+                    cursor = encode_cursor(prev.created_at, prev.id)
+                keyset_stmt = paginate(base, Space.created_at, Space.id, cursor, args.page)
+
+                print(
+                    f"{depth:>10} {_time(conn, offset_stmt, args.repeat):>12.3f}"
+                    f" {_time(conn, keyset_stmt, args.repeat):>12.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+benchmarks/bench_serialization.py
+Serialization cost per 10k rows: Pydantic/json path vs the orjson fast path.
+
+    python -m benchmarks.bench_serialization --rows 10000
+
+"pydantic" mirrors what FastAPI does for ``response_model=List[SpaceOut]``
+(validate from attributes → dump to JSON‑able → json.dumps); "fast" is
+``rows_to_dicts`` + ``FastJSONResponse.render``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.core.serialization import FastJSONResponse, rows_to_dicts
+from app.models.space_schemas import SpaceOut
+
+KEYS = ("id", "title", "description", "owner_id", "created_at")
+Row = namedtuple("Row", KEYS)  # stands in for sqlalchemy Row (tuple + attrs)
+
+
+def _rows(n: int) -> list[Row]:
+    owner, t0 = uuid.uuid4(), datetime(2024, 1, 1)
+    return [
+        Row(uuid.uuid4(), f"space {i}", "lecture notes" if i % 2 else None, owner, t0 + timedelta(seconds=i))
+        for i in range(n)
+    ]
+
+
+def _pydantic(rows, adapter) -> bytes:
+    models = adapter.validate_python(rows, from_attributes=True)
+    return json.dumps(adapter.dump_python(models, mode="json")).encode()
+
+
+def _fast(rows, response) -> bytes:
+    return response.render(rows_to_dicts(rows, KEYS))
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=15)
+    args = ap.parse_args()
+
+    rows = _rows(args.rows)
+    adapter = TypeAdapter(List[SpaceOut])
+    response = FastJSONResponse.__new__(FastJSONResponse)  # render() only
+
+    slow = _time(lambda: _pydantic(rows, adapter), args.repeat)
+    fast = _time(lambda: _fast(rows, response), args.repeat)
+    scale = 10_000 / args.rows
+    print(f"pydantic + json : {slow * scale:8.2f} ms / 10k rows")
+    print(f"orjson fast path: {fast * scale:8.2f} ms / 10k rows  ({slow / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
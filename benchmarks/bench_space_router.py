@@ -0,0 +1,139 @@
+"""
+benchmarks/bench_space_router.py
+Routed cross‑space search vs one owner‑filtered query over every space.
+
+    python -m benchmarks.bench_space_router --spaces 2000 --chunks-per-space 50 --queries 200 --probes 1,2,4,8,16
+
+Builds a throw‑away embedded Chroma store holding ``--spaces`` synthetic
+spaces of one owner.  Each space has ``--topics`` topic directions and
+its chunks are noisy copies of them, so spaces are distinguishable the
+way real course material is.  Queries are noisy copies of a random
+space's topic.  Summaries are built with ``SpaceRouter.update`` (the
+ingest path).  Reported per mode: p50/p95/p99 latency, spaces searched
+and recall@k against exact top‑k over all of the owner's chunks.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+
+os.environ.setdefault("GOOGLE_API_KEY", "stub")  # config needs one; Gemini is never called
+
+from benchmarks.load import _pct
+
+DIM = 768
+OWNER = "bench-owner"
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def make_corpus(args) -> tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """``(space_ids, vectors, space index per vector, topics[space, topic])``."""
+    rng = np.random.default_rng(args.seed)
+    topics = _unit(rng.standard_normal((args.spaces, args.topics, DIM)).astype(np.float32))
+    per = args.chunks_per_space
+    owner = np.repeat(np.arange(args.spaces), per)
+    topic = rng.integers(0, args.topics, len(owner))
+    vecs = _unit(topics[owner, topic] + args.noise * rng.standard_normal((len(owner), DIM)).astype(np.float32))
+    return [str(uuid.UUID(int=i + 1)) for i in range(args.spaces)], vecs, owner, topics
+
+
+async def load(db, router, space_ids, vecs, owner, args) -> float:
+    t0 = time.perf_counter()
+    per = args.chunks_per_space
+    for s, space_id in enumerate(space_ids):
+        rows = slice(s * per, (s + 1) * per)
+        await db._call(
+            "add",
+            ids=[f"c{i}" for i in range(rows.start, rows.stop)],
+            embeddings=vecs[rows].tolist(),
+            documents=[f"chunk {i}" for i in range(rows.start, rows.stop)],
+            metadatas=[{"user_id": OWNER, "type": "content", "subtype": space_id, "space_id": space_id,
+                        "visibility": "owner"}] * per,
+        )
+        await router.update(OWNER, space_id, vecs[rows].tolist(), [])
+        if s % 100 == 99:
+            print(f"\r  loaded {s + 1}/{len(space_ids)} spaces", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    return time.perf_counter() - t0
+
+
+async def run_mode(fn, queries: np.ndarray, exact: List[set]) -> Dict:
+    latencies, hits, searched = [], 0, []
+    for q, truth in zip(queries, exact):
+        t0 = time.perf_counter()
+        ids, n_spaces = await fn(q.tolist())
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += len(set(ids) & truth)
+        searched.append(n_spaces)
+    s = sorted(latencies)
+    return {
+        "p50_ms": round(_pct(s, 0.50), 2),
+        "p95_ms": round(_pct(s, 0.95), 2),
+        "p99_ms": round(_pct(s, 0.99), 2),
+        "spaces_searched": round(float(np.mean(searched)), 1),
+        "recall": round(hits / sum(len(t) for t in exact), 4),
+    }
+
+
+async def main(args) -> None:
+    from app.services.memory_db import MemoryDB
+    from app.services.space_router import SpaceRouter
+    from app.services.vector_store import EmbeddedChromaStore
+
+    path = tempfile.mkdtemp(prefix="spaces-router-bench-")
+    try:
+        db = MemoryDB(store=EmbeddedChromaStore(path=path))
+        router = SpaceRouter(db, reps=args.reps)
+        space_ids, vecs, owner, topics = make_corpus(args)
+        print(f"load + summaries: {await load(db, router, space_ids, vecs, owner, args):.1f}s", file=sys.stderr)
+
+        rng = np.random.default_rng(args.seed + 1)
+        target = rng.integers(0, args.spaces, args.queries)
+        queries = _unit(topics[target, rng.integers(0, args.topics, args.queries)]
+                        + args.noise * rng.standard_normal((args.queries, DIM)).astype(np.float32))
+        top = np.argsort(-(queries @ vecs.T), axis=1)[:, : args.k]
+        exact = [{f"c{i}" for i in row} for row in top]
+
+        async def flat(q):
+            res = await db._call(
+                "query", query_embeddings=[q], n_results=args.k,
+                where={"$and": [{"user_id": OWNER}, {"visibility": {"$in": ["owner", "public"]}}]},
+                include=[],
+            )
+            return res["ids"][0], args.spaces
+
+        print(f"{'flat (user filter)':>20}: {await run_mode(flat, queries, exact)}")
+        for probes in (int(p) for p in args.probes.split(",")):
+            async def routed(q, probes=probes):
+                hits = await router.search_embedding(OWNER, q, k=args.k, probes=probes)
+                return [h["id"] for h in hits], probes
+
+            print(f"{f'routed probes={probes}':>20}: {await run_mode(routed, queries, exact)}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--spaces", type=int, default=2000)
+    ap.add_argument("--chunks-per-space", type=int, default=50)
+    ap.add_argument("--topics", type=int, default=3, help="topic directions per space")
+    ap.add_argument("--noise", type=float, default=0.05, help="per‑dimension noise around a topic")
+    ap.add_argument("--reps", type=int, default=4, help="representatives per space")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--probes", default="1,2,4,8,16")
+    ap.add_argument("--seed", type=int, default=5)
+    asyncio.run(main(ap.parse_args()))
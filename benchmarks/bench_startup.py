@@ -0,0 +1,123 @@
+"""
+benchmarks/bench_startup.py
+Import time of ``app.main`` and cold start of a uvicorn worker, against a budget.
+
+    python -m benchmarks.bench_startup --repeat 5 --import-budget-ms 1500 --ready-budget-ms 4000
+
+* import – fresh interpreter, ``import app.main`` (what every ``--reload``
+  cycle, gunicorn worker and Celery worker pays); also fails if any of the
+  heavy, lazily‑loaded modules (chromadb, parsers, httpx, passlib, boto3) got
+  imported eagerly again
+* ready  – ``uvicorn app.main:app`` spawn → first ``200`` on ``/``
+
+Exits non‑zero when a median is over budget and prints the slowest
+imports (``-X importtime``) to show what to defer.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.load import REPO, _env, _free_port, _stop, _wait_ready
+
+LAZY_MODULES = ("chromadb", "pdfplumber", "pytesseract", "PIL", "docx", "lxml", "httpx", "passlib", "boto3", "numpy")
+
+_IMPORT_PROBE = f"""
+import sys, time
+t = time.perf_counter()
+import app.main
+print((time.perf_counter() - t) * 1000)
+print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))
+"""
+
+
+def _workspace() -> tuple[Path, dict]:
+    workdir = Path(tempfile.mkdtemp(prefix="spaces-startup-"))
+    env = _env(DATABASE_URL=f"sqlite+aiosqlite:///{workdir / 'startup.db'}", GOOGLE_API_KEY="stub")
+    env.pop("METRICS_DIR", None)
+    return workdir, env
+
+
+def measure_import(repeat: int) -> tuple[list[float], list[str]]:
+    workdir, env = _workspace()
+    samples, eager = [], set()
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE], cwd=workdir, env=env, capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        samples.append(float(out[0]))
+        eager.update(m for m in out[1].split(",") if m)
+    return samples, sorted(eager)
+
+
+def slowest_imports(top: int = 10) -> list[tuple[int, str]]:
+    workdir, env = _workspace()
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=workdir, env=env,
+        capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header / non‑importtime output
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:  # direct imports of app.main
+            rows.append((int(parts[1]), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+async def measure_ready(repeat: int) -> list[float]:
+    workdir, env = _workspace()
+    subprocess.run([sys.executable, "-m", "app.core.migrations", "upgrade"], cwd=workdir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    samples = []
+    for _ in range(repeat):
+        port = _free_port()
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=workdir, env=env,
+        )
+        try:
+            await _wait_ready(f"http://127.0.0.1:{port}/", proc, timeout=60)
+            samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            _stop(proc)
+    return samples
+
+
+def main(args: argparse.Namespace) -> int:
+    failed = False
+    imp, eager = measure_import(args.repeat)
+    ready = asyncio.run(measure_ready(args.repeat))
+    for name, samples, budget in (("import", imp, args.import_budget_ms), ("ready", ready, args.ready_budget_ms)):
+        median = statistics.median(samples)
+        over = median > budget
+        failed |= over
+        print(f"{name:>6}: median {median:8.1f} ms   max {max(samples):8.1f} ms   budget {budget:.0f} ms"
+              + ("   OVER BUDGET" if over else ""))
+    if eager:
+        failed = True
+        print(f"eagerly imported (should be lazy): {', '.join(eager)}")
+    if failed:
+        print("\nslowest direct imports of app.main (cumulative):")
+        for cum_us, name in slowest_imports():
+            print(f"  {cum_us / 1000:8.1f} ms  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--import-budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", 1500)))
+    ap.add_argument("--ready-budget-ms", type=float, default=float(os.getenv("READY_BUDGET_MS", 4000)))
+    raise SystemExit(main(ap.parse_args()))
@@ -0,0 +1,188 @@
+"""
+benchmarks/bench_vector_store.py
+Several worker processes sharing one vector index: embedded Chroma
+(one copy of the index per process) vs the Chroma server (one shared copy).
+
+    python -m benchmarks.bench_vector_store --workers 4 --preload 20000 --writes 2000 --queries 500
+
+Starts ``chroma run`` locally for the ``chroma-http`` mode.  Each worker
+process writes ``--writes`` new vectors (in ``VECTOR_WRITE_BATCH`` batches,
+as ingest does) and then runs ``--queries`` filtered top‑k queries against
+an index pre‑loaded with ``--preload`` vectors.  Reported per mode: write
+and query throughput, query p50/p95/p99, errors, the summed peak RSS of
+the workers and, for the server mode, the server's RSS.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+os.environ.setdefault("GOOGLE_API_KEY", "stub")  # config needs one; Gemini is never called
+
+from benchmarks.load import _free_port, _pct, _rss_mb
+
+DIM = 768
+
+
+def _vectors(rng: np.random.Generator, n: int) -> List[List[float]]:
+    v = rng.standard_normal((n, DIM)).astype(np.float32)
+    return (v / np.linalg.norm(v, axis=1, keepdims=True)).tolist()
+
+
+def _env_for(mode: str, path: str, port: int) -> Dict[str, str]:
+    return {"VECTOR_STORE": mode, "MEMORY_DB_PATH": path, "CHROMA_HOST": "127.0.0.1", "CHROMA_PORT": str(port)}
+
+
+async def _preload(n: int, seed: int) -> None:
+    from app.services.memory_db import VECTOR_WRITE_BATCH, memory_db
+
+    rng = np.random.default_rng(seed)
+    for i in range(0, n, VECTOR_WRITE_BATCH):
+        size = min(VECTOR_WRITE_BATCH, n - i)
+        await memory_db._call(
+            "add",
+            ids=[f"pre:{i + j}" for j in range(size)],
+            embeddings=_vectors(rng, size),
+            documents=[f"chunk {i + j}" for j in range(size)],
+            metadatas=[{"user_id": f"u{(i + j) % 16}", "visibility": "owner", "type": "content"} for j in range(size)],
+        )
+    await memory_db.close()
+
+
+async def _work(worker: int, writes: int, queries: int, seed: int) -> Dict:
+    from app.services.memory_db import VECTOR_WRITE_BATCH, memory_db
+
+    rng = np.random.default_rng(seed + worker)
+    errors = 0
+    t0 = time.perf_counter()
+    for i in range(0, writes, VECTOR_WRITE_BATCH):
+        size = min(VECTOR_WRITE_BATCH, writes - i)
+        try:
+            await memory_db._call(
+                "add",
+                ids=[f"w{worker}:{uuid.uuid4().hex}" for _ in range(size)],
+                embeddings=_vectors(rng, size),
+                documents=["new chunk"] * size,
+                metadatas=[{"user_id": f"u{worker}", "visibility": "owner", "type": "content"}] * size,
+            )
+        except Exception:  # noqa: BLE001 – concurrent embedded writers can fail
+            errors += 1
+    write_s = time.perf_counter() - t0
+
+    latencies = []
+    t0 = time.perf_counter()
+    for q in _vectors(rng, queries):
+        start = time.perf_counter()
+        try:
+            await memory_db._call(
+                "query",
+                query_embeddings=[q],
+                n_results=5,
+                where={"$and": [{"user_id": f"u{worker % 16}"}, {"visibility": {"$in": ["owner", "public"]}}]},
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception:  # noqa: BLE001
+            errors += 1
+    query_s = time.perf_counter() - t0
+    await memory_db.close()
+    return {
+        "write_s": write_s,
+        "query_s": query_s,
+        "latencies": latencies,
+        "errors": errors,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _worker_main(env: Dict[str, str], worker: int, args: argparse.Namespace, barrier, out) -> None:
+    os.environ.update(env)  # before the app modules read their config
+    barrier.wait()
+    out.put(asyncio.run(_work(worker, args.writes, args.queries, args.seed)))
+
+
+def _preload_main(env: Dict[str, str], args: argparse.Namespace) -> None:
+    os.environ.update(env)
+    asyncio.run(_preload(args.preload, args.seed))
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="spaces-vec-")
+    port = _free_port()
+    server = None
+    if mode == "chroma-http":
+        server = subprocess.Popen(
+            ["chroma", "run", "--path", str(Path(workdir) / "server"), "--port", str(port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        _wait_port(port)
+    env = _env_for(mode, str(Path(workdir) / "embedded"), port)
+    ctx = mp.get_context("spawn")
+    try:
+        pre = ctx.Process(target=_preload_main, args=(env, args))
+        pre.start()
+        pre.join()
+
+        barrier, out = ctx.Barrier(args.workers), ctx.Queue()
+        procs = [ctx.Process(target=_worker_main, args=(env, w, args, barrier, out)) for w in range(args.workers)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+        server_rss = _rss_mb(server.pid)["rss_mb"] if server else None
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    lat = sorted(x for r in results for x in r["latencies"])
+    writes = args.workers * args.writes
+    return {
+        "write_vps": round(writes / max(r["write_s"] for r in results), 1),
+        "query_qps": round(len(lat) / max(r["query_s"] for r in results), 1),
+        "query_p50_ms": round(_pct(lat, 0.50), 2),
+        "query_p95_ms": round(_pct(lat, 0.95), 2),
+        "query_p99_ms": round(_pct(lat, 0.99), 2),
+        "errors": sum(r["errors"] for r in results),
+        "workers_peak_rss_mb": round(sum(r["peak_rss_mb"] for r in results), 1),
+        "server_rss_mb": server_rss,
+    }
+
+
+def _wait_port(port: int, timeout: float = 30.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/v2/heartbeat").raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("chroma server did not start")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--preload", type=int, default=20000)
+    ap.add_argument("--writes", type=int, default=2000)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--modes", default="chroma-embedded,chroma-http")
+    args = ap.parse_args()
+    for mode in args.modes.split(","):
+        print(f"{mode:>16}: {run_mode(mode, args)}")
@@ -0,0 +1,224 @@
+"""
+benchmarks/gemini_stub.py
+Local stand‑in for the Gemini REST API used by load tests.
+
+    python -m benchmarks.gemini_stub --port 8090 --latency-ms 80 --rate-429 0.02
+
+then run the API with ``GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta``.
+
+Serves the endpoints ``app/services/config.py`` calls – ``embedContent``,
+``batchEmbedContents``, ``generateContent``, ``streamGenerateContent``
+(SSE with ``alt=sse``) and the resumable file upload – with injectable
+latency (``latency_ms`` ± ``jitter_ms``, plus ``per_item_ms`` per text in
+a batch embed), a tail (``slow_rate`` of calls take ``slow_ms`` longer)
+and 429 / 503 rates.  With ``capacity`` set, calls beyond that many in
+flight are answered 429 at once, like a saturated Gemini quota.
+Responses are deterministic: embeddings are derived from a hash of the
+text and the RNG for jitter / 429s is seeded, so two runs with the same
+flags see the same upstream.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+import orjson
+from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+EMBED_DIM = 768
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    per_item_ms: float = 0.5      # extra latency per text in batchEmbedContents
+    rate_429: float = 0.0
+    slow_rate: float = 0.0        # share of calls that hit the tail …
+    slow_ms: float = 0.0          # … and wait this much longer
+    fail_rate: float = 0.0        # share of calls answered 503 (upstream outage)
+    capacity: int = 0             # concurrent calls served; 0 = unlimited
+    answer_tokens: int = 64       # words in a generated answer
+    stream_chunks: int = 8        # SSE events per streamed answer
+    seed: int = 1234
+
+
+def _embedding(text: str) -> List[float]:
+    seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+    vec = np.random.default_rng(seed).standard_normal(EMBED_DIM)
+    return (vec / np.linalg.norm(vec)).round(6).tolist()
+
+
+def _json(data: Any, status: int = 200, headers: Dict[str, str] | None = None) -> Response:
+    return Response(orjson.dumps(data), status, headers, media_type="application/json")
+
+
+def _text_of(body: Dict) -> str:
+    return " ".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+
+
+def _candidate(text: str) -> Dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}]}
+
+
+def create_app(cfg: StubConfig) -> Starlette:
+    rng = random.Random(cfg.seed)
+    stats: Dict[str, int] = {}
+    files: Dict[str, Dict] = {}
+    inflight = 0
+
+    async def _delay(items: int = 1) -> int:
+        """Sleep the configured latency; returns 429 / 503 if this call should fail, else 0."""
+        nonlocal inflight
+        if cfg.capacity and inflight >= cfg.capacity:
+            return 429
+        ms = max(0.0, cfg.latency_ms + rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)) + cfg.per_item_ms * items
+        if rng.random() < cfg.slow_rate:
+            ms += cfg.slow_ms
+        inflight += 1
+        try:
+            await asyncio.sleep(ms / 1000)
+        finally:
+            inflight -= 1
+        if rng.random() < cfg.fail_rate:
+            return 503
+        return 429 if rng.random() < cfg.rate_429 else 0
+
+    def _throttled(kind: str, status: int = 429) -> Response:
+        stats[f"{kind}_{status}"] = stats.get(f"{kind}_{status}", 0) + 1
+        if status == 503:
+            return _json({"error": {"code": 503, "status": "UNAVAILABLE", "message": "stub outage"}}, 503)
+        return _json({"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "message": "stub quota"}}, 429)
+
+    def _answer(prompt: str) -> str:
+        words = (prompt.split() or ["ok"])[-cfg.answer_tokens:]
+        return " ".join(words[i % len(words)] for i in range(cfg.answer_tokens))
+
+    async def models(request: Request) -> Response:
+        target = request.path_params["target"]            # "<model>:<method>"
+        method = target.rsplit(":", 1)[-1]
+        try:
+            body = orjson.loads(await request.body() or b"{}")
+        except ClientDisconnect:  # a hedged duplicate the client already cancelled
+            return Response(status_code=499)
+        stats[method] = stats.get(method, 0) + 1
+
+        if method == "embedContent":
+            if status := await _delay():
+                return _throttled(method, status)
+            return _json({"embedding": {"values": _embedding(_text_of({"contents": [body["content"]]}))}})
+
+        if method == "batchEmbedContents":
+            reqs = body.get("requests", [])
+            if status := await _delay(len(reqs)):
+                return _throttled(method, status)
+            return _json({"embeddings": [{"values": _embedding(_text_of({"contents": [r["content"]]}))} for r in reqs]})
+
+        if method == "generateContent":
+            if status := await _delay():
+                return _throttled(method, status)
+            return _json(_candidate(_answer(_text_of(body))))
+
+        if method == "streamGenerateContent":
+            if status := await _delay():
+                return _throttled(method, status)
+            words = _answer(_text_of(body)).split()
+            step = max(1, len(words) // cfg.stream_chunks)
+
+            async def events():
+                for i in range(0, len(words), step):
+                    await asyncio.sleep(cfg.latency_ms / 1000 / cfg.stream_chunks)
+                    yield b"data: " + orjson.dumps(_candidate(" ".join(words[i : i + step]) + " ")) + b"\r\n\r\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return _json({"error": {"code": 404, "message": f"unknown method {method}"}}, 404)
+
+    async def upload_start(request: Request) -> Response:
+        stats["upload_start"] = stats.get("upload_start", 0) + 1
+        if status := await _delay():
+            return _throttled("upload_start", status)
+        file_id = uuid.uuid4().hex[:12]
+        files[file_id] = {
+            "name": f"files/{file_id}",
+            "uri": f"{request.base_url}v1beta/files/{file_id}",
+            "mimeType": request.headers.get("x-goog-upload-header-content-type", "application/octet-stream"),
+            "state": "PROCESSING",
+            "expirationTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 48 * 3600)),
+        }
+        return _json({}, headers={"X-Goog-Upload-URL": f"{request.base_url}_upload/{file_id}"})
+
+    async def upload_finalize(request: Request) -> Response:
+        stats["upload_finalize"] = stats.get("upload_finalize", 0) + 1
+        size = len(await request.body())
+        if status := await _delay():
+            return _throttled("upload_finalize", status)
+        meta = files.setdefault(request.path_params["file_id"], {"name": "files/unknown", "uri": "", "state": ""})
+        meta.update(state="ACTIVE", sizeBytes=str(size))
+        return _json({"file": meta})
+
+    async def get_file(request: Request) -> Response:
+        meta = files.get(request.path_params["file_id"])
+        return _json(meta) if meta else _json({"error": {"code": 404}}, 404)
+
+    async def get_stats(request: Request) -> Response:
+        return _json({"config": asdict(cfg), "calls": stats})
+
+    return Starlette(
+        routes=[
+            Route("/v1beta/models/{target:path}", models, methods=["POST"]),
+            # config.py posts "/upload/v1beta/files" relative to BASE_URL
+            Route("/v1beta/upload/v1beta/files", upload_start, methods=["POST"]),
+            Route("/upload/v1beta/files", upload_start, methods=["POST"]),
+            Route("/_upload/{file_id}", upload_finalize, methods=["POST", "PUT"]),
+            Route("/v1beta/files/{file_id}", get_file, methods=["GET"]),
+            Route("/_stats", get_stats, methods=["GET"]),
+        ]
+    )
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    ap.add_argument("--jitter-ms", type=float, default=StubConfig.jitter_ms)
+    ap.add_argument("--per-item-ms", type=float, default=StubConfig.per_item_ms)
+    ap.add_argument("--rate-429", type=float, default=StubConfig.rate_429)
+    ap.add_argument("--slow-rate", type=float, default=StubConfig.slow_rate)
+    ap.add_argument("--slow-ms", type=float, default=StubConfig.slow_ms)
+    ap.add_argument("--fail-rate", type=float, default=StubConfig.fail_rate)
+    ap.add_argument("--capacity", type=int, default=StubConfig.capacity)
+    ap.add_argument("--seed", type=int, default=StubConfig.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        per_item_ms=args.per_item_ms,
+        rate_429=args.rate_429,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        fail_rate=args.fail_rate,
+        capacity=args.capacity,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8090)
+    add_arguments(ap)
+    args = ap.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,476 @@
+"""
+benchmarks/load.py
+Load‑test scenarios against a real API process backed by the Gemini stub.
+
+    python -m benchmarks.load chat   --concurrency 16 --requests 400
+    python -m benchmarks.load upload --concurrency 8  --files 200
+    python -m benchmarks.load ingest --concurrency 4  --files 40 --paragraphs 60
+    python -m benchmarks.load all --out benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.load compare base.json head.json --threshold 0.10
+
+Each scenario boots a fresh ``uvicorn app.main:app`` in a throw‑away
+working directory (SQLite DB, Chroma store and uploads all live there;
+set ``BENCH_DATABASE_URL`` to use a local Postgres instead) with
+``GEMINI_BASE_URL`` pointing at :mod:`benchmarks.gemini_stub`, so nothing
+leaves the machine.
+
+* ``chat``   – seed a space, then concurrent ``POST /chat/``
+* ``chat_batch`` – the same questions as one ``POST /chat/batch``
+  (``--concurrency`` LLM calls in flight server‑side)
+* ``upload`` – concurrent ``POST /contents/upload`` of small files
+  (request latency; background ingest still runs, as in production)
+* ``ingest`` – upload larger documents and time upload → ``processed``
+  via the space SSE stream (end‑to‑end ingestion latency, chunks/s)
+
+Reports are JSON with throughput, p50/p95/p99 latency, error counts and
+the API process's RSS / peak RSS, stamped with the git commit.  Inputs
+and the stub are seeded, so runs on the same machine are comparable;
+``compare`` exits non‑zero when a metric regresses past the threshold.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+import httpx
+import orjson
+
+from benchmarks import gemini_stub
+
+REPO = Path(__file__).resolve().parents[1]
+# throughput: higher is better; everything else: lower is better
+_HIGHER_IS_BETTER = {"throughput_rps", "docs_per_s", "chunks_per_s"}
+_COMPARED = ("throughput_rps", "docs_per_s", "chunks_per_s", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+
+_WORDS = (
+    "cell membrane protein energy enzyme reaction gradient equilibrium vector matrix "
+    "theorem proof integral limit series function derivative history empire treaty "
+    "revolution economy market supply demand inflation poem metaphor narrative"
+).split()
+
+
+# ─── Processes ─────────────────────────────────────────────────────────
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _env(**extra: str) -> Dict[str, str]:
+    env = dict(os.environ, PYTHONPATH=str(REPO) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    env.update(extra)
+    return env
+
+
+async def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{proc.args[2:4]} exited with {proc.returncode}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def _stop(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+@asynccontextmanager
+async def gemini_stub_server(args: argparse.Namespace) -> AsyncIterator[str]:
+    """Run the stub in its own process (its CPU/memory is not the API's)."""
+    port = _free_port()
+    cmd = [sys.executable, "-m", "benchmarks.gemini_stub", "--port", str(port),
+           "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+           "--per-item-ms", str(args.per_item_ms), "--rate-429", str(args.rate_429),
+           "--slow-rate", str(args.slow_rate), "--slow-ms", str(args.slow_ms),
+           "--fail-rate", str(args.fail_rate), "--capacity", str(args.capacity), "--seed", str(args.seed)]
+    proc = subprocess.Popen(cmd, cwd=REPO, env=_env())
+    try:
+        await _wait_ready(f"http://127.0.0.1:{port}/_stats", proc)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        _stop(proc)
+
+
+@asynccontextmanager
+async def api_server(stub_url: str, **extra_env: str) -> AsyncIterator[tuple[str, int]]:
+    """Fresh API process in a throw‑away workspace; yields ``(base_url, pid)``."""
+    workdir = Path(tempfile.mkdtemp(prefix="spaces-bench-"))
+    env = _env(
+        DATABASE_URL=os.getenv("BENCH_DATABASE_URL", f"sqlite+aiosqlite:///{workdir / 'bench.db'}"),
+        GEMINI_BASE_URL=f"{stub_url}/v1beta",
+        GOOGLE_API_KEY="stub",
+        **extra_env,
+    )
+    env.pop("METRICS_DIR", None)
+    subprocess.run([sys.executable, "-m", "app.core.migrations", "upgrade"], cwd=workdir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    try:
+        await _wait_ready(f"http://127.0.0.1:{port}/", proc)
+        yield f"http://127.0.0.1:{port}", proc.pid
+    finally:
+        _stop(proc)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _rss_mb(pid: int) -> Dict[str, float | None]:
+    """Current and peak resident set size of *pid* (Linux ``/proc``)."""
+    out: Dict[str, float | None] = {"rss_mb": None, "peak_rss_mb": None}
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                out["rss_mb" if key == "VmRSS" else "peak_rss_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return out
+
+
+# ─── Measurement ───────────────────────────────────────────────────────
+def _pct(sorted_ms: List[float], q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(q * len(sorted_ms)))]
+
+
+def summarize(latencies_ms: List[float], errors: int, elapsed_s: float) -> Dict[str, Any]:
+    s = sorted(latencies_ms)
+    return {
+        "count": len(s),
+        "errors": errors,
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_rps": round(len(s) / elapsed_s, 2) if elapsed_s else 0.0,
+        "mean_ms": round(sum(s) / len(s), 2) if s else 0.0,
+        "p50_ms": round(_pct(s, 0.50), 2),
+        "p95_ms": round(_pct(s, 0.95), 2),
+        "p99_ms": round(_pct(s, 0.99), 2),
+        "max_ms": round(s[-1], 2) if s else 0.0,
+    }
+
+
+async def run_closed_loop(
+    concurrency: int, total: int, op: Callable[[int], Awaitable[bool]]
+) -> Dict[str, Any]:
+    """*concurrency* workers issue *total* calls of ``op(i)`` back to back."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await op(i)
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+# ─── Fixtures ──────────────────────────────────────────────────────────
+def _document(rng: random.Random, paragraphs: int) -> bytes:
+    paras = (
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(40, 120))).capitalize() + "."
+        for _ in range(paragraphs)
+    )
+    return "\n\n".join(paras).encode()
+
+
+async def _create_space(client: httpx.AsyncClient, owner_id: uuid.UUID) -> str:
+    r = await client.post("/spaces/create_space", json={"title": "bench", "owner_id": str(owner_id)})
+    r.raise_for_status()
+    return r.json()["id"]
+
+
+class IngestWatcher:
+    """Follows a space's SSE stream and timestamps terminal ingest events."""
+
+    def __init__(self, client: httpx.AsyncClient, space_id: str) -> None:
+        self.client, self.space_id = client, space_id
+        self.done: Dict[str, tuple[float, Dict]] = {}
+        self._changed = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> "IngestWatcher":
+        self._task = asyncio.create_task(self._follow())
+        await asyncio.wait_for(self._ready.wait(), 10)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+
+    async def _follow(self) -> None:
+        async with self.client.stream("GET", f"/contents/by_space/{self.space_id}/events", timeout=None) as r:
+            async for line in r.aiter_lines():
+                if line.startswith(": subscribed"):
+                    self._ready.set()
+                elif line.startswith("data: "):
+                    event = orjson.loads(line[6:])
+                    if event["status"] in ("processed", "error"):
+                        self.done[event["content_id"]] = (time.perf_counter(), event)
+                        self._changed.set()
+
+    async def wait_for(self, content_ids: List[str], timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while not all(c in self.done for c in content_ids):
+            self._changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+
+async def _upload_all(
+    client: httpx.AsyncClient, space_id: str, owner_id: uuid.UUID, docs: List[bytes], concurrency: int
+) -> tuple[Dict[str, Any], Dict[str, float]]:
+    """Upload *docs*; returns request stats and ``content_id → start time``."""
+    started: Dict[str, float] = {}
+
+    async def op(i: int) -> bool:
+        t0 = time.perf_counter()
+        r = await client.post(
+            "/contents/upload",
+            params={"space_id": space_id, "owner_id": str(owner_id), "title": f"doc {i}"},
+            files={"file": (f"doc{i}.txt", docs[i], "text/plain")},
+        )
+        if r.status_code != 201:
+            return False
+        started[r.json()["id"]] = t0
+        return True
+
+    return await run_closed_loop(concurrency, len(docs), op), started
+
+
+def _ingest_stats(watcher: IngestWatcher, started: Dict[str, float], elapsed: float) -> Dict[str, Any]:
+    latencies, errors, chunks = [], 0, 0
+    for cid, t0 in started.items():
+        if cid not in watcher.done:
+            errors += 1
+            continue
+        t1, event = watcher.done[cid]
+        if event["status"] != "processed":
+            errors += 1
+            continue
+        latencies.append((t1 - t0) * 1000)
+        chunks += event.get("added", 0)
+    stats = summarize(latencies, errors, elapsed)
+    stats["docs_per_s"] = stats.pop("throughput_rps")
+    stats["chunks"] = chunks
+    stats["chunks_per_s"] = round(chunks / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+# ─── Scenarios ─────────────────────────────────────────────────────────
+async def _chat_space(
+    client: httpx.AsyncClient, args: argparse.Namespace
+) -> tuple[uuid.UUID, str, List[str]]:
+    """Seed a space with ``--docs`` documents; returns (owner, space_id, questions)."""
+    rng = random.Random(args.seed)
+    owner = uuid.UUID(int=rng.getrandbits(128))
+    space_id = await _create_space(client, owner)
+    docs = [_document(rng, 20) for _ in range(args.docs)]
+    async with IngestWatcher(client, space_id) as watcher:
+        _, started = await _upload_all(client, space_id, owner, docs, 4)
+        await watcher.wait_for(list(started), args.timeout)
+    questions = [" ".join(rng.choice(_WORDS) for _ in range(8)) + "?" for _ in range(args.requests)]
+    return owner, space_id, questions
+
+
+async def scenario_chat(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    owner, space_id, questions = await _chat_space(client, args)
+
+    async def op(i: int) -> bool:
+        r = await client.post(
+            "/chat/",
+            json={"user_id": str(owner), "space_id": space_id, "message": questions[i], "k": 5},
+        )
+        return r.status_code == 200
+
+    return await run_closed_loop(args.concurrency, args.requests, op)
+
+
+async def scenario_chat_batch(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    owner, space_id, questions = await _chat_space(client, args)
+    latencies, summary = [], {}
+    t0 = time.perf_counter()
+    async with client.stream(
+        "POST",
+        "/chat/batch",
+        json={"user_id": str(owner), "space_id": space_id, "questions": questions, "k": 5,
+              "concurrency": args.concurrency},
+    ) as r:
+        if r.status_code != 200:
+            return summarize([], len(questions), time.perf_counter() - t0)
+        async for line in r.aiter_lines():
+            if not line:
+                continue
+            item = orjson.loads(line)
+            if "summary" in item:
+                summary = item["summary"]
+            elif "error" not in item:
+                latencies.append((time.perf_counter() - t0) * 1000)  # time to this answer
+    # failed items and any missing from a cut‑off stream count as errors
+    stats = summarize(latencies, len(questions) - len(latencies), time.perf_counter() - t0)
+    stats["server_retrieve_ms"] = summary.get("retrieve_ms")
+    stats["server_llm_p95_ms"] = summary.get("p95_ms")
+    return stats
+
+
+async def scenario_upload(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    owner = uuid.UUID(int=rng.getrandbits(128))
+    space_id = await _create_space(client, owner)
+    docs = [_document(rng, 3) for _ in range(args.files)]
+    async with IngestWatcher(client, space_id) as watcher:
+        stats, started = await _upload_all(client, space_id, owner, docs, args.concurrency)
+        t0 = time.perf_counter()
+        await watcher.wait_for(list(started), args.timeout)
+        stats["ingest_drain_s"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+async def scenario_ingest(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    owner = uuid.UUID(int=rng.getrandbits(128))
+    space_id = await _create_space(client, owner)
+    docs = [_document(rng, args.paragraphs) for _ in range(args.files)]
+    async with IngestWatcher(client, space_id) as watcher:
+        t0 = time.perf_counter()
+        _, started = await _upload_all(client, space_id, owner, docs, args.concurrency)
+        await watcher.wait_for(list(started), args.timeout)
+        return _ingest_stats(watcher, started, time.perf_counter() - t0)
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, argparse.Namespace], Awaitable[Dict[str, Any]]]] = {
+    "chat": scenario_chat,
+    "chat_batch": scenario_chat_batch,
+    "upload": scenario_upload,
+    "ingest": scenario_ingest,
+}
+
+
+# ─── Reports ───────────────────────────────────────────────────────────
+def _git(*cmd: str) -> str:
+    try:
+        return subprocess.run(["git", *cmd], cwd=REPO, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _meta(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "database": "postgres" if os.getenv("BENCH_DATABASE_URL") else "sqlite",
+        "stub": vars(gemini_stub.config_from_args(args)),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    report: Dict[str, Any] = {"meta": _meta(args), "scenarios": {}}
+    async with gemini_stub_server(args) as stub_url:
+        for name in names:
+            async with api_server(stub_url) as (base_url, pid):
+                async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+                    before = _rss_mb(pid)["rss_mb"]
+                    result = await SCENARIOS[name](client, args)
+                    result.update(_rss_mb(pid), rss_start_mb=before)
+            report["scenarios"][name] = result
+            print(f"{name:>7}: {result}", file=sys.stderr)
+    return report
+
+
+def compare(base: Dict, head: Dict, threshold: float) -> bool:
+    """Print per‑metric deltas; returns True if anything regressed."""
+    regressed = False
+    print(f"base {base['meta']['commit']}  →  head {head['meta']['commit']}")
+    for name, new in head["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if not old:
+            continue
+        for metric in _COMPARED:
+            a, b = old.get(metric), new.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a
+            worse = -change if metric in _HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            regressed |= bool(flag)
+            print(f"{name:>7} {metric:<15} {a:>10} → {b:<10} {change:+7.1%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="scenario", required=True)
+    for name in (*SCENARIOS, "all"):
+        p = sub.add_parser(name)
+        p.add_argument("--concurrency", type=int, default=8)
+        p.add_argument("--requests", type=int, default=200, help="chat requests")
+        p.add_argument("--docs", type=int, default=10, help="documents seeded before chat")
+        p.add_argument("--files", type=int, default=50, help="documents to upload")
+        p.add_argument("--paragraphs", type=int, default=40, help="paragraphs per ingest document")
+        p.add_argument("--timeout", type=float, default=300.0)
+        p.add_argument("--out", type=Path)
+        gemini_stub.add_arguments(p)
+    cmp = sub.add_parser("compare")
+    cmp.add_argument("base", type=Path)
+    cmp.add_argument("head", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.10)
+    args = ap.parse_args()
+
+    if args.scenario == "compare":
+        bad = compare(orjson.loads(args.base.read_bytes()), orjson.loads(args.head.read_bytes()), args.threshold)
+        raise SystemExit(1 if bad else 0)
+
+    report = asyncio.run(run(args))
+    data = orjson.dumps(report, option=orjson.OPT_INDENT_2)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_bytes(data)
+    print(data.decode())
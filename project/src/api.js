@@ -10,7 +10,10 @@ class ApiError extends Error {
   }
 }
 
-async function request(endpoint, options = {}) {
+// Largest page the list endpoints serve (MAX_PAGE_SIZE in app/core/pagination.py)
+const PAGE_SIZE = 200;
+
+async function send(endpoint, options = {}) {
   const { getAuthHeaders, logout } = useAuthStore.getState();
   
   const config = {
@@ -52,7 +55,7 @@ async function request(endpoint, options = {}) {
       );
     }
     
-    return data;
+    return { data, headers: response.headers };
   } catch (error) {
     if (error instanceof ApiError) {
       throw error;
@@ -61,6 +64,25 @@ async function request(endpoint, options = {}) {
   }
 }
 
+async function request(endpoint, options = {}) {
+  return (await send(endpoint, options)).data;
+}
+
+// Every item of a keyset-paginated list endpoint: follows X-Next-Cursor
+// until the last page (which carries no cursor).
+async function requestAll(endpoint) {
+  const sep = endpoint.includes('?') ? '&' : '?';
+  const items = [];
+  let cursor = null;
+  do {
+    const page = `${endpoint}${sep}limit=${PAGE_SIZE}` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+    const { data, headers } = await send(page);
+    items.push(...data);
+    cursor = headers.get('X-Next-Cursor');
+  } while (cursor);
+  return items;
+}
+
 export const api = {
   // Auth
   register: (data) => request('/auth/register', {
@@ -79,7 +101,7 @@ export const api = {
     body: JSON.stringify(data),
   }),
   
-  listSpaces: (owner_id) => request(`/spaces/list_spaces?owner_id=${owner_id}`),
+  listSpaces: (owner_id) => requestAll(`/spaces/list_spaces?owner_id=${owner_id}`),
   
   getSpace: (space_id) => request(`/spaces/space/${space_id}`),
   
@@ -103,7 +125,10 @@ export const api = {
     });
   },
   
-  getSpaceContents: (space_id) => request(`/contents/by_space/${space_id}`),
+  getSpaceContents: (space_id) => requestAll(`/contents/by_space/${space_id}`),
+
+  // Server-sent ingestion status/progress for every content in a space
+  spaceEvents: (space_id) => new EventSource(`${BASE_URL}/contents/by_space/${space_id}/events`),
   
   // Chat
   sendMessage: (data) => request('/chat/', {
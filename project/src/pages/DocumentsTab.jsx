@@ -256,11 +256,8 @@ export default function DocumentsTab() {
       };
       setContents(prev => [tempContent, ...prev]);
 
-      await api.uploadContent(space.id, file.name, user_id, file);
-      
-      setTimeout(() => {
-        fetchContents();
-      }, 2000);
+      const created = await api.uploadContent(space.id, file.name, user_id, file);
+      setContents(prev => prev.map(c => (c.id === tempContent.id ? created : c)));
       
       showToast('success', 'Document uploaded successfully');
     } catch (error) {
@@ -273,16 +270,17 @@ export default function DocumentsTab() {
     fetchContents();
   }, [space.id]);
 
+  // status updates are pushed by the server – no polling
   useEffect(() => {
-    const interval = setInterval(() => {
-      const hasProcessing = contents.some(c => c.status === 'processing');
-      if (hasProcessing) {
-        fetchContents();
-      }
-    }, 5000);
-
-    return () => clearInterval(interval);
-  }, [contents]);
+    const source = api.spaceEvents(space.id);
+    source.addEventListener('status', (e) => {
+      const event = JSON.parse(e.data);
+      setContents(prev => prev.map(c =>
+        c.id === event.content_id ? { ...c, status: event.status } : c
+      ));
+    });
+    return () => source.close();
+  }, [space.id]);
 
   if (loading) {
     return (
@@ -0,0 +1,163 @@
+"""
+tests/test_storage.py
+S3Storage against moto's in‑process S3, and location routing between backends.
+
+    python -m pytest -q tests/test_storage.py
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import time
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from starlette.datastructures import UploadFile
+
+from app.core import storage
+from app.core.storage import LocalStorage, S3Storage
+
+BUCKET = "test-uploads"
+PART = 5 << 20  # S3's minimum part size
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def upload(data: bytes, filename: str = "doc.pdf") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+async def collect(chunks) -> bytes:
+    return b"".join([b async for b in chunks])
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(var, "testing")
+    monkeypatch.setattr(storage, "S3_PART_SIZE", PART)
+    monkeypatch.setattr(storage, "S3_UPLOAD_CONCURRENCY", 2)
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Storage(bucket=BUCKET, prefix="uploads/")
+
+
+def keys(s3: S3Storage) -> list[str]:
+    return [o["Key"] for o in s3.client.list_objects_v2(Bucket=BUCKET).get("Contents", [])]
+
+
+# ─── save ──────────────────────────────────────────────────────────────
+def test_small_file_is_one_put(s3):
+    stored = run(s3.save(upload(b"hello"), "a.txt"))
+    assert stored == storage.StoredFile(f"s3://{BUCKET}/uploads/a.txt", 5)
+    assert s3.client.get_object(Bucket=BUCKET, Key="uploads/a.txt")["Body"].read() == b"hello"
+
+
+def test_multipart_save_above_part_size(s3):
+    data = os.urandom(2 * PART + 123)  # three parts, the last one short
+    stored = run(s3.save(upload(data), "big.pdf"))
+    assert stored.size == len(data)
+    obj = s3.client.get_object(Bucket=BUCKET, Key="uploads/big.pdf")
+    assert obj["Body"].read() == data
+    assert obj["ETag"].strip('"').endswith("-3")  # multipart ETag: <md5>-<parts>
+
+
+def test_multipart_save_aborts_when_a_part_fails(s3, monkeypatch):
+    client = s3.client
+    real = client.upload_part
+
+    def flaky(**kwargs):
+        if kwargs["PartNumber"] == 2:
+            raise ClientError({"Error": {"Code": "InternalError", "Message": "boom"}}, "UploadPart")
+        return real(**kwargs)
+
+    monkeypatch.setattr(client, "upload_part", flaky)
+    with pytest.raises(ClientError):
+        run(s3.save(upload(os.urandom(2 * PART + 1)), "big.pdf"))
+    assert client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert keys(s3) == []
+
+
+def test_multipart_save_aborts_when_the_source_fails(s3):
+    class Broken(UploadFile):
+        async def read(self, size: int = -1) -> bytes:
+            if self.file.tell() >= PART:
+                raise OSError("client went away")
+            return await super().read(size)
+
+    with pytest.raises(OSError):
+        run(s3.save(Broken(io.BytesIO(os.urandom(2 * PART)), filename="big.pdf"), "big.pdf"))
+    assert s3.client.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+    assert keys(s3) == []
+
+
+# ─── reads ─────────────────────────────────────────────────────────────
+def test_iter_bytes_and_read_range(s3):
+    data = bytes(range(256)) * 40
+    loc = run(s3.save(upload(data), "r.bin")).location
+    assert run(collect(s3.iter_bytes(loc, chunk_size=1000))) == data
+    assert run(collect(s3.iter_bytes(loc, 100, 2100, chunk_size=512))) == data[100:2100]
+    assert run(collect(s3.iter_bytes(loc, 10_000))) == data[10_000:]
+    assert run(s3.read_range(loc, 5, 7)) == data[5:12]
+
+
+def test_local_path_is_a_temporary_copy(s3):
+    loc = run(s3.save(upload(b"%PDF-1.4 body"), "p.pdf")).location
+
+    async def check() -> str:
+        async with s3.local_path(loc) as path:
+            assert path.endswith(".pdf")  # parsers dispatch on the extension
+            with open(path, "rb") as fh:
+                assert fh.read() == b"%PDF-1.4 body"
+            return path
+
+    assert not os.path.exists(run(check()))
+
+
+# ─── deletes and listing ───────────────────────────────────────────────
+def test_delete_many(s3):
+    locs = [run(s3.save(upload(b"x"), f"{i}.txt")).location for i in range(3)]
+    assert run(s3.delete_many(locs[:2])) == 2
+    assert keys(s3) == ["uploads/2.txt"]
+
+
+def test_list_older_than_is_scoped_to_the_prefix(s3):
+    loc = run(s3.save(upload(b"x"), "old.txt")).location
+    s3.client.put_object(Bucket=BUCKET, Key="elsewhere/other.txt", Body=b"y")
+    assert run(s3.list_older_than(time.time() + 60)) == [loc]
+    assert run(s3.list_older_than(time.time() - 60)) == []
+
+
+# ─── Routing by location ───────────────────────────────────────────────
+def test_open_and_delete_route_by_location(s3, tmp_path, monkeypatch):
+    local = LocalStorage(tmp_path)
+    monkeypatch.setattr(storage, "_backends", {"local": local, "s3": s3})
+    on_disk = run(local.save(upload(b"local bytes", "a.txt"), "a.txt")).location
+    in_s3 = run(s3.save(upload(b"s3 bytes", "b.txt"), "b.txt")).location
+    assert storage.storage_for(on_disk) is local and storage.storage_for(in_s3) is s3
+
+    async def read(location: str) -> bytes:
+        async with storage.open_upload(location) as path:
+            with open(path, "rb") as fh:
+                return fh.read()
+
+    assert run(read(on_disk)) == b"local bytes"
+    assert run(read(in_s3)) == b"s3 bytes"
+    assert run(storage.delete_uploads([on_disk, in_s3])) == 2
+    assert not os.path.exists(on_disk)
+    assert keys(s3) == []
+
+
+def test_sweep_covers_the_local_dir_left_by_a_switch(s3, tmp_path, monkeypatch):
+    local = LocalStorage(tmp_path)
+    monkeypatch.setattr(storage, "_backends", {"local": local, "s3": s3})
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "s3")
+    monkeypatch.setattr(storage, "UPLOAD_DIR", tmp_path)
+    assert storage.sweep_storages() == [s3, local]
+    monkeypatch.setattr(storage, "UPLOAD_DIR", tmp_path / "never-created")
+    assert storage.sweep_storages() == [s3]
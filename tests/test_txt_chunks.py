@@ -0,0 +1,43 @@
+"""
+tests/test_txt_chunks.py
+Streamed TXT extraction chunks exactly like read_text + chunk_text, so re‑ingests don't re‑embed.
+
+    python -m pytest -q tests/test_txt_chunks.py
+"""
+from __future__ import annotations
+
+import os
+import random
+
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "stub")  # config needs one; Gemini is never called
+
+from app.services import media_parser
+from app.services.chunking import SEGMENT, chunk_blocks, chunk_text
+
+_PIECES = ["word ", "  ", "\t", "\n", "\n\n", "\n \n", "\x0c", "é", "\r\n", "x" * 400, "y" * 3100]
+
+
+def _texts():
+    rng = random.Random(7)
+    yield "z" * 20_000  # one line, far past the paragraph cap
+    yield "\n".join("line " * rng.randint(1, 400) + "  " for _ in range(300))  # one paragraph of lines
+    yield "   \n  lead\n" + "w" * 5000 + "  \ntail   \n\n \nnext"
+    for _ in range(80):
+        yield "".join(rng.choices(_PIECES, [6, 2, 1, 4, 1, 0.3, 0.2, 1, 0.3, 1, 0.3], k=rng.randint(0, 300)))
+
+
+@pytest.mark.parametrize("read_chars, cap", [(7, 100), (333, 2000), (4096, 3001)])
+def test_streamed_chunks_match_whole_file(tmp_path, monkeypatch, read_chars, cap):
+    monkeypatch.setattr(media_parser, "TXT_READ_CHARS", read_chars)
+    monkeypatch.setattr(media_parser, "TXT_MAX_PARAGRAPH_CHARS", cap)
+    path = tmp_path / "doc.txt"
+    segmented = 0
+    for text in _texts():
+        path.write_text(text, encoding="utf-8", newline="")
+        want = chunk_text(path.read_text(encoding="utf-8", errors="ignore"))
+        assert list(chunk_blocks(media_parser.iter_txt_blocks(str(path)))) == want
+        assert chunk_text(media_parser._txt(str(path))) == want
+        segmented += any(b.kind == SEGMENT for b in media_parser.iter_txt_blocks(str(path)))
+    assert segmented  # the oversized‑paragraph path was exercised